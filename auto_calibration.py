@@ -0,0 +1,236 @@
+import time
+import cv2
+import numpy as np
+from gimbal_control import YAWLIM, PITCHLIM
+from spot_tracker import SpotTracker, frame_array, apply_homography
+from motion_planner import MotionPlanner
+
+COARSE_GRID = 5  # 粗扫描网格（每个方向的点数）
+COARSE_MARGIN = 0.5  # 粗扫描范围相对当前标定范围的外扩比例
+SETTLE = 0.08  # 舵机到位后的额外等待（秒）
+FINE_ITERS = 4  # 每个角点精调的最大次数
+FINE_TOL_PX = 1.0  # 精调收敛阈值（像素）
+RANSAC_PX = 3.0  # 拟合相机模型时的外点阈值（像素）
+MIN_TARGET_AREA = 2000  # 目标框最小面积（像素²）
+GRID_SHAPE = (5, 5)  # 多点标定网格（列数, 行数）
+
+
+def order_corners(corners, src_points):
+    """
+    将检测到的四个角点按src_points的顺序排列
+
+    输入参数:
+        corners: 4x2角点像素坐标（任意顺序）
+        src_points: 归一化屏幕坐标下的四个标定点
+
+    输出: 4x2 float32数组，与src_points一一对应
+
+    角点先按绕中心的角度排成一圈（图像坐标y向下，角度升序为顺时针），
+    再选与左上、右上、右下、左下方向偏差最小的起点；
+    旋转45°的四边形也得到四个不同的角点
+    """
+    corners = np.asarray(corners, dtype=np.float32).reshape(4, 2)
+    center = corners.mean(axis=0)
+    angle = np.arctan2(corners[:, 1] - center[1], corners[:, 0] - center[0])
+    order = np.argsort(angle)
+    ring, angle = corners[order], angle[order]
+    expected = np.radians([-135.0, -45.0, 45.0, 135.0])  # 左上、右上、右下、左下
+    cost = [
+        np.abs(np.angle(np.exp(1j * (np.roll(angle, -k) - expected)))).sum()
+        for k in range(4)
+    ]
+    ring = np.roll(ring, -int(np.argmin(cost)), axis=0)
+    named = {(0, 0): ring[0], (1, 0): ring[1], (1, 1): ring[2], (0, 1): ring[3]}
+    src = np.asarray(src_points, dtype=np.float32)
+    lo, hi = src.min(axis=0), src.max(axis=0)
+    keys = np.rint((src - lo) / np.where(hi > lo, hi - lo, 1)).astype(int)
+    return np.array([named[(k[0], k[1])] for k in keys], dtype=np.float32)
+
+
+def detect_target(img, src_points, min_area=MIN_TARGET_AREA):
+    """
+    检测相机画面中的目标框（浅色背景上的深色四边形边框）
+
+    输入参数:
+        img: 相机帧
+        src_points: 归一化标定点，用于确定角点顺序
+        min_area: 最小面积
+
+    输出: 4x2角点像素坐标（与src_points对应），未检测到返回None
+    """
+    gray = cv2.cvtColor(np.ascontiguousarray(frame_array(img)), cv2.COLOR_RGB2GRAY)
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(bw, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    best = None
+    best_area = min_area
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < best_area:
+            continue
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            best, best_area = approx, area
+    if best is None:
+        return None
+    return order_corners(best, src_points)
+
+
+class AutoCalibrator:
+    """
+    相机自动标定 - 代替手动逐个角点微调
+
+    流程：
+    1. 关闭激光，检测目标框四个角点
+    2. 开启激光，在当前标定范围附近按粗网格扫描，记录角度与光斑像素
+    3. RANSAC拟合角度->像素的相机模型G，剔除误检
+    4. 由G反解角点对应的角度，逐个角点闭环精调
+    5. 得到dst_points并计算透视变换矩阵H
+    """
+
+    def __init__(self, gimbal, grab, planner=None) -> None:
+        """
+        输入参数:
+            gimbal: GIMBAL_CONTROL对象
+            grab: 取帧函数grab(after)，返回在after（time.monotonic()）之后开始采集的帧
+            planner: MotionPlanner，用于估算到位时间
+        """
+        self.gimbal = gimbal
+        self.grab = grab
+        self.planner = planner or MotionPlanner()
+        self.detector = SpotTracker()
+        self.samples = []  # 粗扫描记录 [(yaw, pitch, x, y)]
+        self.corners = None  # 最近一次检测到的目标框角点
+
+    def measure(self, yaw, pitch, cancel=None):
+        """
+        移动到指定角度并检测光斑
+
+        输入参数:
+            yaw, pitch: 目标角度
+            cancel: 可选的取消标志
+
+        输出: 光斑像素坐标，未检测到或已取消返回None
+        """
+        settle = SETTLE + self.planner.move_time(
+            self.gimbal.yaw, self.gimbal.pitch, yaw, pitch
+        )
+        self.gimbal.publish(yaw, pitch)
+        if cancel is not None:
+            if cancel.sleep(settle):
+                return None
+        else:
+            time.sleep(settle)
+        frame = self.grab(time.monotonic())
+        if frame is None:
+            return None
+        self.detector.spot = None
+        return self.detector.detect(frame)
+
+    def sweep(self, dst_points, cancel=None):
+        """在当前标定范围外扩后的区域内按粗网格扫描，返回拟合所得的G"""
+        dst = np.asarray(dst_points, dtype=np.float64)
+        lo, hi = dst.min(axis=0), dst.max(axis=0)
+        pad = (hi - lo) * COARSE_MARGIN
+        lo = np.maximum(lo - pad, [YAWLIM[0], PITCHLIM[0]])
+        hi = np.minimum(hi + pad, [YAWLIM[1], PITCHLIM[1]])
+        self.samples = []
+        for i, pitch in enumerate(np.linspace(lo[1], hi[1], COARSE_GRID)):
+            yaws = np.linspace(lo[0], hi[0], COARSE_GRID)
+            if i % 2:
+                yaws = yaws[::-1]  # 蛇形扫描，减少回程
+            for yaw in yaws:
+                spot = self.measure(yaw, pitch, cancel)
+                if cancel is not None and cancel.cancelled:
+                    return None
+                if spot is not None:
+                    self.samples.append((self.gimbal.yaw, self.gimbal.pitch, *spot))
+        if len(self.samples) < 4:
+            print(f"[AUTOCAL] 检测到的光斑不足: {len(self.samples)}")
+            return None
+        data = np.array(self.samples, dtype=np.float32)
+        G, mask = cv2.findHomography(data[:, :2], data[:, 2:], cv2.RANSAC, RANSAC_PX)
+        if G is None:
+            return None
+        print(f"[AUTOCAL] 相机模型拟合完成，内点 {int(mask.sum())}/{len(data)}")
+        return G
+
+    def refine(self, G, corner, cancel=None):
+        """闭环精调单个角点：按光斑与角点的像素误差，经模型反解修正角度"""
+        Ginv = np.linalg.inv(G)
+        target = np.array(apply_homography(Ginv, *corner))
+        angle = target.copy()
+        for _ in range(FINE_ITERS):
+            spot = self.measure(angle[0], angle[1], cancel)
+            if spot is None:
+                break
+            if np.hypot(corner[0] - spot[0], corner[1] - spot[1]) < FINE_TOL_PX:
+                break
+            angle += target - np.array(apply_homography(Ginv, *spot))
+        return [int(round(angle[0])), int(round(angle[1]))]
+
+    def run(self, src_points, dst_points, cancel=None):
+        """
+        执行自动标定
+
+        输入参数:
+            src_points: 归一化标定点
+            dst_points: 当前标定结果（作为扫描范围的初值）
+            cancel: 可选的取消标志
+
+        输出: (dst_points, H, G)，失败返回None
+
+        调用场景: 校准界面"auto"按钮
+        """
+        start = time.monotonic()
+        self.gimbal.publish(led=False)
+        frame = self.grab(time.monotonic() + SETTLE)
+        corners = None if frame is None else detect_target(frame, src_points)
+        if corners is None:
+            print("[AUTOCAL] 未检测到目标框")
+            return None
+        self.corners = corners
+        self.gimbal.publish(led=True)
+        G = self.sweep(dst_points, cancel)
+        if G is None:
+            return None
+        new_dst = [self.refine(G, corner, cancel) for corner in corners]
+        if cancel is not None and cancel.cancelled:
+            return None
+        H = cv2.getPerspectiveTransform(
+            np.array(src_points, dtype=np.float32), np.array(new_dst, dtype=np.float32)
+        )
+        print(f"[AUTOCAL] 标定完成: {new_dst}，用时{time.monotonic() - start:.1f}s")
+        return new_dst, H, G
+
+    def measure_grid(self, G, src_points, shape=GRID_SHAPE, cancel=None):
+        """
+        在目标框内按NxM网格逐点闭环测量，得到多点标定数据
+
+        输入参数:
+            G: run()得到的相机模型
+            src_points: 归一化标定点
+            shape: 网格（列数, 行数）
+            cancel: 可选的取消标志
+
+        输出: Nx4数组 (u, v, yaw, pitch)，供CalibrationGrid.fit使用；失败返回None
+
+        调用场景: run()成功后，用于拟合舵机非线性
+        """
+        if self.corners is None:
+            return None
+        # 目标框平面 -> 相机像素为精确的透视变换（不含镜头畸变）
+        src = np.asarray(src_points, dtype=np.float32)
+        P = cv2.getPerspectiveTransform(src, self.corners)
+        lo, hi = src.min(axis=0), src.max(axis=0)
+        samples = []
+        for i, v in enumerate(np.linspace(lo[1], hi[1], shape[1])):
+            us = np.linspace(lo[0], hi[0], shape[0])
+            if i % 2:
+                us = us[::-1]
+            for u in us:
+                angle = self.refine(G, apply_homography(P, u, v), cancel)
+                if cancel is not None and cancel.cancelled:
+                    return None
+                samples.append((u, v, angle[0], angle[1]))
+        print(f"[AUTOCAL] 多点标定测量完成: {len(samples)}个点")
+        return np.array(samples, dtype=np.float64)
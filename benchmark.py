@@ -0,0 +1,348 @@
+"""
+控制链路性能测试 - 在模拟硬件上运行，结果以JSON保存便于对比
+
+用法: python benchmark.py [--out bench_output.json] [--quick]
+"""
+
+import os
+
+os.environ.setdefault("GIMBAL_HAL", "sim")
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import hal
+
+hal.install_sim_gimbal_laser()
+
+import trajectory
+import simplify
+import servo_lag
+from motion_planner import MotionPlanner
+from state import STATE
+from gimbal_control import GIMBAL_CONTROL
+from fanout import FanoutController, GimbalUnit
+from frame_pipeline import FramePipeline
+
+SHAPE_BUTTONS = ["sine", "triangle", "rectangle", "circle"]
+POINT_COUNTS = [100, 1000, 10000, 100000]
+
+
+def make_gimbal(state=None):
+    """创建使用模拟串口的云台控制器（启动提示音在后台播放，不等待）"""
+    return GIMBAL_CONTROL(state or STATE(), port="/dev/sim", async_chime=True)
+
+
+def timeit(func, repeat=5):
+    """返回多次运行中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_sendcmd(duration):
+    """sendcmd直接发送模式的帧率与字节率，以及发送线程模式的实际帧率"""
+    gimbal = make_gimbal()
+    ser = gimbal.ser
+    frames = 0
+    start = time.perf_counter()
+    end = start + duration
+    while time.perf_counter() < end:
+        gimbal.publish(4000 + frames % 2000, 5000)
+        frames += 1
+    elapsed = time.perf_counter() - start
+
+    writer_hz = 500
+    before = ser.writes
+    gimbal.start_writer(writer_hz)
+    time.sleep(duration)
+    gimbal.stop_writer()
+    return {
+        "frames_per_sec": frames / elapsed,
+        "bytes_per_sec": frames * 10 / elapsed,
+        "decoded_frames": ser.sim.frames,
+        "writer_hz_target": writer_hz,
+        "writer_hz_achieved": (ser.writes - before) / duration,
+    }
+
+
+def bench_transform(counts):
+    """轨迹生成与透视变换耗时随点数的变化"""
+    H = np.array([[1000.0, 0, 4500], [0, 1000.0, 4500], [0, 0, 1]])
+    lut = trajectory.AngleLUT()
+    lut.update(H)
+    results = []
+    for n in counts:
+        points = trajectory.generate_circle_points(0.5, 0.5, 0.4, n=n)
+        results.append(
+            {
+                "points": n,
+                "generate_s": timeit(
+                    lambda: trajectory.generate_circle_points(0.5, 0.5, 0.4, n=n)
+                ),
+                "transform_s": timeit(lambda: trajectory.transform_points(H, points)),
+                "lut_s": timeit(lambda: lut.lookup(points)),
+            }
+        )
+    return results
+
+
+def bench_playback(duration, period=0.002):
+    """
+    轨迹播放的帧间隔抖动：普通模式与实时模式对比
+
+    后台线程持续制造循环引用垃圾，并保留一个大的常驻堆，使GC停顿明显
+    """
+    n = max(2, int(duration / period))
+    yaw = np.linspace(4000, 6000, n).astype(np.int16)
+    pitch = np.full(n, 5000, dtype=np.int16)
+    t = np.arange(n) * period
+    heap = [[i] for i in range(300000)]  # 常驻对象，使完整回收耗时更长
+    running = [True]
+
+    def churn():
+        while running[0]:
+            junk = []
+            for _ in range(1000):
+                node = {}
+                node["self"] = node
+                junk.append(node)
+
+    results = {"points": n, "period_ms": period * 1e3}
+    for mode in ("normal", "realtime"):
+        gimbal = make_gimbal()
+        stamps = []
+        gimbal.ser.on_write = lambda data: stamps.append(time.perf_counter())
+        running[0] = True
+        worker = threading.Thread(target=churn, daemon=True)
+        worker.start()
+        gimbal.play_trajectory(yaw, pitch, t, realtime=mode == "realtime")
+        running[0] = False
+        worker.join()
+        gaps = np.diff(stamps) * 1e3
+        results[mode] = {
+            "max_gap_ms": float(gaps.max()),
+            "p99_gap_ms": float(np.percentile(gaps, 99)),
+            "gap_std_ms": float(gaps.std()),
+        }
+    del heap
+    return results
+
+
+def bench_fanout(duration, counts=(1, 2, 4), period=0.002):
+    """
+    多云台同步播放的总点速率随串口数的变化
+
+    每个模拟串口按115200波特率阻塞写入时间（写入期间释放GIL），
+    各播放线程轮流绑定到可用的CPU上
+    """
+    n = max(2, int(duration / period))
+    yaw = np.linspace(4000, 6000, n).astype(np.int16)
+    pitch = np.full(n, 5000, dtype=np.int16)
+    t = np.arange(n) * period
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    results = {"points_per_unit": n, "period_ms": period * 1e3, "cpus": len(cpus)}
+    for count in counts:
+        units = []
+        for i in range(count):
+            gimbal = make_gimbal()
+            gimbal.ser.realtime = True
+            cpu = cpus[i % len(cpus)] if cpus else None
+            units.append(GimbalUnit(gimbal, None, name=f"sim{i}", cpu=cpu))
+        report = FanoutController(units).play([(yaw, pitch, t)] * count)
+        results[f"{count}_units"] = {
+            "points_per_sec": report["points_per_sec"],
+            "max_late_ms": report["max_late_ms"],
+            "max_skew_ms": report.get("max_skew_ms", 0.0),
+        }
+    base = results[f"{counts[0]}_units"]["points_per_sec"]
+    results["scaling"] = {
+        f"{count}_units": results[f"{count}_units"]["points_per_sec"] / base
+        for count in counts
+    }
+    return results
+
+
+def bench_simplify():
+    """各图形简化前后的点数、最大偏差与规划的绘制时间"""
+    H = np.array([[1000.0, 0, 4500], [0, 1000.0, 4500], [0, 0, 1]])
+    planner = MotionPlanner()
+    results = {}
+    for name, params in trajectory.SHAPE_PARAMS.items():
+        yaw, pitch = trajectory.map_points(H, trajectory.SHAPES[name](*params))
+        index, dwells = simplify.simplify(yaw, pitch)
+        mask = np.zeros(len(yaw), dtype=bool)
+        mask[index] = True
+        t = planner.plan(yaw[index], pitch[index])
+        results[name] = {
+            "points_before": len(yaw),
+            "points_after": len(index),
+            "max_deviation": simplify.max_deviation(
+                np.column_stack((yaw, pitch)), mask
+            ),
+            "draw_s_before": float(planner.plan(yaw, pitch)[-1]),
+            "draw_s_after": float(simplify.apply_dwells(t, dwells)[-1]),
+        }
+    return results
+
+
+def track(models, yaw, pitch, t, dt=0.001, tail=0.3):
+    """滞后舵机按时间戳执行指令序列（零阶保持）的实际路径"""
+    grid = np.arange(0, t[-1] + tail, dt)
+    idx = np.clip(np.searchsorted(t, grid, "right") - 1, 0, len(t) - 1)
+    commands = (np.asarray(yaw, np.float64), np.asarray(pitch, np.float64))
+    return np.column_stack([m.simulate(c[idx], dt) for m, c in zip(models, commands)])
+
+
+def bench_lag(speedup=2.0, rate=50.0, noise=1.0):
+    """
+    舵机滞后辨识与前馈补偿：模拟滞后舵机上辨识模型，
+    比较原速无补偿与speedup倍速有补偿时的路径几何误差（舵机单位）
+    """
+    true = (
+        servo_lag.LagModel(2, wn=40.0, zeta=0.8, delay=0.02),
+        servo_lag.LagModel(2, wn=34.0, zeta=0.8, delay=0.02),
+    )
+    # 辨识：激励按rate采样并加噪声，相当于状态帧或相机观测
+    yaw, pitch, t = servo_lag.excitation(4.0)
+    response = track(true, yaw, pitch, t)
+    rng = np.random.default_rng(0)
+    t_meas = np.arange(0, t[-1], 1.0 / rate)
+    y_meas = response[np.rint(t_meas * 1000).astype(int)]
+    y_meas += rng.normal(0, noise, y_meas.shape)
+    u, y = servo_lag.resample(t, np.column_stack((yaw, pitch)), t_meas, y_meas)
+    models = tuple(
+        servo_lag.identify(u[:, axis], y[:, axis], servo_lag.LAG_DT, order=2)[0]
+        for axis in range(2)
+    )
+    results = {"true": [repr(m) for m in true], "identified": [repr(m) for m in models]}
+    H = np.array([[1000.0, 0, 4500], [0, 1000.0, 4500], [0, 0, 1]])
+    planner = MotionPlanner()
+    for name, params in trajectory.SHAPE_PARAMS.items():
+        yaw, pitch = trajectory.map_points(H, trajectory.SHAPES[name](*params))
+        index, dwells = simplify.simplify(yaw, pitch)
+        yaw, pitch = yaw[index], pitch[index]
+        t = simplify.apply_dwells(planner.plan(yaw, pitch), dwells)
+        reference = np.column_stack((yaw, pitch))
+        plain = servo_lag.path_deviation(track(true, yaw, pitch, t), reference)
+        fast = servo_lag.feedforward(yaw, pitch, t / speedup, models)
+        compensated = servo_lag.path_deviation(track(true, *fast[:3]), reference)
+        results[name] = {
+            "draw_s": float(t[-1]),
+            "max_error_1x": plain[0],
+            "rms_error_1x": plain[1],
+            f"max_error_{speedup:g}x_ff": compensated[0],
+            f"rms_error_{speedup:g}x_ff": compensated[1],
+        }
+    return results
+
+
+def bench_touch():
+    """按下图形按钮到第一帧串口数据的延迟（冷缓存与热缓存）"""
+    from gimbal_laser_control import GimbalLaserControl
+    from screen_state import SCREEN
+    import trajectory_cache
+
+    state = STATE()
+    gimbal = make_gimbal(state)
+    gimbal_laser = GimbalLaserControl(gimbal)
+    gimbal_laser.H = np.array([[1000.0, 0, 4500], [0, 1000.0, 4500], [0, 0, 1]])
+    screen = SCREEN(state, gimbal_laser, gimbal)
+    screen.trajectory_cache = trajectory_cache.TrajectoryCache(tempfile.mkdtemp())
+
+    first = threading.Event()
+    stamp = [0.0]
+
+    def on_write(data):
+        if not first.is_set():
+            stamp[0] = time.perf_counter()
+            first.set()
+
+    results = {}
+    for name in SHAPE_BUTTONS:
+        but = screen.button_init[name]
+        x, y = but[0] + but[2] // 2, but[1] + but[3] // 2
+        for run in ("cold", "warm"):
+            first.clear()
+            gimbal.ser.on_write = on_write
+            start = time.perf_counter()
+            screen.pressprocess(x, y)
+            first.wait(5)
+            gimbal.ser.on_write = None
+            results[f"{name}_{run}_s"] = stamp[0] - start
+            screen.executor.cancel()
+            while screen.executor.busy:
+                time.sleep(0.01)
+    screen.executor.stop()
+    return results
+
+
+def bench_main_loop(duration):
+    """主循环（采集/渲染/显示流水线）帧率"""
+    from gimbal_laser_control import GimbalLaserControl
+    from screen_state import SCREEN
+
+    state = STATE()
+    gimbal = make_gimbal(state)
+    screen = SCREEN(state, GimbalLaserControl(gimbal), gimbal)
+    results = {}
+    for mode in ("init", "cali"):
+        state.workmode = mode
+        cam = hal.SimCamera(640, 480, fps=0)
+        disp = hal.NullDisplay()
+
+        def render(img, stamp=0.0):
+            img_show = screen.draw_button(img)
+            command = gimbal.command
+            return screen.draw_status(img_show, command.yaw, command.pitch)
+
+        pipeline = FramePipeline(
+            cam, disp, render, needs_camera=lambda: state.workmode == "init"
+        )
+        end = time.monotonic() + duration
+        pipeline.run(lambda: time.monotonic() < end)
+        results[mode] = {
+            "fps": pipeline.fps,
+            "camera_reads": cam.frames,
+            "latency_s": pipeline.latency,
+        }
+    screen.executor.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gimbal control benchmarks")
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--quick", action="store_true", help="缩短测试时间")
+    args = parser.parse_args()
+    duration = 0.3 if args.quick else 1.0
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "simulated": hal.SIMULATED,
+        "sendcmd": bench_sendcmd(duration),
+        "transform": bench_transform(POINT_COUNTS[:3] if args.quick else POINT_COUNTS),
+        "playback_jitter": bench_playback(duration * 3),
+        "fanout": bench_fanout(duration * 3),
+        "simplify": bench_simplify(),
+        "servo_lag": bench_lag(),
+        "touch_to_first_frame": bench_touch(),
+        "main_loop": bench_main_loop(duration),
+    }
+    with open(args.out, "w") as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
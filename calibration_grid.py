@@ -0,0 +1,170 @@
+import os
+import hashlib
+import numpy as np
+from gimbal_control import YAWLIM, PITCHLIM
+
+GRID_LUT_SIZE = 65  # 修正查找表每个维度的网格点数
+POLY_DEGREE = 3  # 多项式模型阶数
+TPS_SMOOTHING = 0.0  # 薄板样条平滑系数，0为严格插值
+
+
+def _poly_terms(u, v, degree=POLY_DEGREE):
+    """二元多项式的所有项 u^i v^j (i + j <= degree)"""
+    return np.column_stack(
+        [u**i * v**j for i in range(degree + 1) for j in range(degree + 1 - i)]
+    )
+
+
+def _tps_kernel(r2):
+    """薄板样条核函数 U(r) = r² log r，以r²为输入"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 0.5 * r2 * np.log(r2)
+    return np.nan_to_num(k)
+
+
+def fit_polynomial(src, dst, grid_uv, degree=POLY_DEGREE):
+    """最小二乘多项式拟合，返回在grid_uv上的取值"""
+    A = _poly_terms(src[:, 0], src[:, 1], degree)
+    coef, *_ = np.linalg.lstsq(A, dst, rcond=None)
+    return _poly_terms(grid_uv[:, 0], grid_uv[:, 1], degree) @ coef
+
+
+def fit_tps(src, dst, grid_uv, smoothing=TPS_SMOOTHING):
+    """薄板样条拟合，返回在grid_uv上的取值"""
+    n = len(src)
+    d2 = ((src[:, None, :] - src[None, :, :]) ** 2).sum(axis=2)
+    K = _tps_kernel(d2) + smoothing * np.eye(n)
+    P = np.column_stack((np.ones(n), src))
+    L = np.zeros((n + 3, n + 3))
+    L[:n, :n] = K
+    L[:n, n:] = P
+    L[n:, :n] = P.T
+    rhs = np.zeros((n + 3, dst.shape[1]))
+    rhs[:n] = dst
+    params = np.linalg.solve(L, rhs)
+    g2 = ((grid_uv[:, None, :] - src[None, :, :]) ** 2).sum(axis=2)
+    Pg = np.column_stack((np.ones(len(grid_uv)), grid_uv))
+    return _tps_kernel(g2) @ params[:n] + Pg @ params[n:]
+
+
+class CalibrationGrid:
+    """
+    多点标定模型 - 用NxM标定网格描述屏幕坐标到舵机角度的非线性映射
+
+    主要功能：
+    - 最小二乘多项式或薄板样条拟合标定点
+    - 烘焙为float32密集查找表，绘制时向量化双线性插值，耗时与模型复杂度无关
+    - 记录拟合时的四角标定点，四角重新手动标定后自动失效（回退到透视变换）
+    """
+
+    def __init__(self, lut, dst_points, lo=(0, 0), hi=(1, 1), samples=None) -> None:
+        """
+        输入参数:
+            lut: 2xSxS float32数组，lut[0]为yaw，lut[1]为pitch，按[v, u]索引
+            dst_points: 拟合时的四角标定点
+            lo, hi: 查找表覆盖的屏幕坐标范围
+            samples: 原始标定数据 Nx4 (u, v, yaw, pitch)
+        """
+        self.lut = np.ascontiguousarray(lut, dtype=np.float32)
+        self.size = self.lut.shape[1]
+        self.lo = np.asarray(lo, dtype=np.float32)
+        self.hi = np.asarray(hi, dtype=np.float32)
+        self.scale = (self.size - 1) / (self.hi - self.lo)
+        self.dst_points = [[int(a), int(b)] for a, b in dst_points]
+        self.samples = None if samples is None else np.asarray(samples, np.float64)
+        self.hash = hashlib.sha1(self.lut.tobytes()).hexdigest()[:16]
+
+    @classmethod
+    def fit(
+        cls, samples, dst_points, model="tps", size=GRID_LUT_SIZE, src_points=None
+    ):
+        """
+        拟合标定网格
+
+        输入参数:
+            samples: Nx4数组 (u, v, yaw, pitch)，u、v与src_points同一坐标系
+            dst_points: 当前四角标定点
+            model: "tps"（薄板样条）或"poly"（多项式）
+            size: 查找表分辨率
+            src_points: 四角标定点的屏幕坐标；给出时查找表覆盖整个标定区域，
+                而不只是测量点的外接矩形（边缘测量点缺失时模型向外延伸）
+
+        输出: CalibrationGrid对象
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        src, dst = samples[:, :2], samples[:, 2:4]
+        box = src if src_points is None else np.vstack((src, src_points))
+        lo, hi = box.min(axis=0), box.max(axis=0)
+        gu, gv = np.meshgrid(
+            np.linspace(lo[0], hi[0], size), np.linspace(lo[1], hi[1], size)
+        )
+        grid_uv = np.column_stack((gu.ravel(), gv.ravel()))
+        if model == "poly":
+            values = fit_polynomial(src, dst, grid_uv)
+        else:
+            values = fit_tps(src, dst, grid_uv)
+        lut = values.T.reshape(2, size, size)
+        return cls(lut, dst_points, lo, hi, samples)
+
+    def matches(self, dst_points):
+        """四角标定点是否与拟合时一致"""
+        return [[int(a), int(b)] for a, b in dst_points] == self.dst_points
+
+    def lookup(self, points):
+        """
+        双线性插值查表
+
+        输入参数:
+            points: Nx2屏幕坐标（超出标定范围的点被限制在边界）
+
+        输出: (yaw, pitch) float32数组
+        """
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        f = np.clip((pts - self.lo) * self.scale, 0, self.size - 1)
+        i = np.minimum(f.astype(np.intp), self.size - 2)
+        t = f - i
+        tx, ty = t[:, 0], t[:, 1]
+        # 展平后按一维下标取四个相邻格点
+        k = i[:, 1] * self.size + i[:, 0]
+        flat = self.lut.reshape(2, -1)
+        top = flat.take(k, axis=1)
+        top += (flat.take(k + 1, axis=1) - top) * tx
+        bottom = flat.take(k + self.size, axis=1)
+        bottom += (flat.take(k + self.size + 1, axis=1) - bottom) * tx
+        out = top
+        out += (bottom - top) * ty
+        return out[0], out[1]
+
+    def transform(self, points):
+        """与trajectory.transform_points相同的输出：已限幅的int16 yaw/pitch数组"""
+        yaw, pitch = self.lookup(points)
+        yaw = np.clip(np.rint(yaw), YAWLIM[0], YAWLIM[1]).astype(np.int16)
+        pitch = np.clip(np.rint(pitch), PITCHLIM[0], PITCHLIM[1]).astype(np.int16)
+        return yaw, pitch
+
+    def save(self, path):
+        """保存为.npz（先写临时文件再重命名）"""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as file:
+            np.savez(
+                file,
+                lut=self.lut,
+                dst_points=np.array(self.dst_points),
+                lo=self.lo,
+                hi=self.hi,
+                samples=np.zeros((0, 4)) if self.samples is None else self.samples,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """从.npz加载，文件不存在返回None"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            samples = data["samples"]
+            if not len(samples):
+                samples = None
+            return cls(
+                data["lut"], data["dst_points"], data["lo"], data["hi"], samples
+            )
@@ -0,0 +1,217 @@
+import time
+import threading
+import numpy as np
+import trajectory
+from motion_planner import MotionPlanner
+
+START_LEAD = 0.02  # 所有云台准备完成后到统一开始的提前量（秒）
+SETTLE = 0.1  # 移动到起点后的额外等待（秒）
+
+
+class GimbalUnit:
+    """一台云台：控制器及其独立的标定"""
+
+    def __init__(self, gimbal, H, grid=None, name=None, cpu=None) -> None:
+        """
+        输入参数:
+            gimbal: GIMBAL_CONTROL对象（各自的串口）
+            H: 该云台的透视变换矩阵
+            grid: 可选的多点标定模型
+            name: 名称，用于报告
+            cpu: 播放线程绑定的CPU编号，None表示不绑定；
+                不使用进程级的GIMBAL_RT_CPU，否则所有播放线程挤在同一个核上
+        """
+        self.gimbal = gimbal
+        self.H = H
+        self.grid = grid
+        self.name = name or getattr(gimbal.ser, "port", "unit")
+        self.cpu = cpu
+
+
+def split_by_arclength(points, parts):
+    """
+    将路径按弧长切成连续的若干段，相邻段共享分界点
+
+    输入参数:
+        points: Nx2点序列
+        parts: 段数
+
+    输出: 各段的点数组列表
+    """
+    pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    seg = np.hypot(*np.diff(pts, axis=0).T)
+    s = np.concatenate(([0.0], np.cumsum(seg)))
+    cuts = np.searchsorted(s, np.linspace(0, s[-1], parts + 1)[1:-1])
+    bounds = [0, *cuts.tolist(), len(pts) - 1]
+    return [pts[a : b + 1] for a, b in zip(bounds, bounds[1:])]
+
+
+class FanoutController:
+    """
+    多云台同步绘制 - 一条轨迹分发到多台云台
+
+    主要功能：
+    - duplicate：每台云台绘制完整图形（各用自己的标定），时间轴取各台所需的最慢者，逐点同步
+    - split：图形按弧长切成连续的若干段，每台绘制一段，同时开始
+    - 每个串口一个播放线程（串口写入时释放GIL，总吞吐随串口数增加），
+      各线程按GimbalUnit.cpu分别绑定CPU或不绑定
+    - 各线程预先生成全部帧后在屏障处会合，从同一绝对时刻开始播放
+    - 记录每帧实际写入时刻，报告各台之间的时间偏差
+    """
+
+    def __init__(self, units, planner=None) -> None:
+        """
+        输入参数:
+            units: GimbalUnit列表
+            planner: MotionPlanner，默认按舵机全行程标定
+        """
+        self.units = list(units)
+        self.planner = planner or MotionPlanner()
+
+    def compile(self, points, mode="duplicate"):
+        """
+        为每台云台生成(yaw, pitch, t)
+
+        输入参数:
+            points: Nx2归一化屏幕坐标
+            mode: "duplicate"或"split"
+
+        输出: 与units对应的[(yaw, pitch, t)]
+        """
+        if mode == "split":
+            parts = split_by_arclength(points, len(self.units))
+        elif mode == "duplicate":
+            parts = [points] * len(self.units)
+        else:
+            raise ValueError(f"unknown fan-out mode: {mode}")
+        plans = []
+        for unit, part in zip(self.units, parts):
+            yaw, pitch = trajectory.map_points(unit.H, part, unit.grid)
+            plans.append((yaw, pitch, self.planner.plan(yaw, pitch)))
+        if mode == "duplicate" and len(plans) > 1:
+            # 每段取各台所需时间的最大值，所有云台共用一条时间轴
+            dt = np.max([np.diff(t) for _, _, t in plans], axis=0)
+            t = np.concatenate(([0.0], np.cumsum(dt)))
+            plans = [(yaw, pitch, t) for yaw, pitch, _ in plans]
+        return plans
+
+    def move_to_start(self, plans, cancel=None):
+        """关闭激光移动到各自起点，等待最慢的一台到位后开启激光"""
+        settle = 0.0
+        for unit, (yaw, pitch, _) in zip(self.units, plans):
+            gimbal = unit.gimbal
+            command = gimbal.command
+            settle = max(
+                settle,
+                self.planner.move_time(command.yaw, command.pitch, yaw[0], pitch[0]),
+            )
+            gimbal.publish(yaw[0], pitch[0], led=False)
+        wait = cancel.sleep if cancel is not None else time.sleep
+        if wait(settle + SETTLE):
+            return False
+        for unit in self.units:
+            unit.gimbal.publish(led=True)
+        return True
+
+    def play(self, plans, cancel=None, start_lead=START_LEAD):
+        """
+        所有云台同步播放
+
+        输入参数:
+            plans: compile的输出
+            cancel: 可选的取消标志
+            start_lead: 屏障会合后到开始播放的提前量（秒）
+
+        输出: 报告字典（是否完成、开始偏差、逐点偏差、滞后、总点速率）
+
+        调用场景: 多投影装置同时绘制
+        """
+        n = len(self.units)
+        start = [0.0]
+        stamps = [np.zeros(len(yaw)) for yaw, _, _ in plans]
+        completed = [False] * n
+
+        def set_start():
+            start[0] = time.monotonic() + start_lead
+
+        barrier = threading.Barrier(n, action=set_start)
+
+        def worker(i):
+            unit = self.units[i]
+            gimbal = unit.gimbal
+            yaw, pitch, t = plans[i]
+            try:
+                prepared = gimbal.prepare_playback(yaw, pitch)
+                barrier.wait()
+                completed[i] = gimbal.play_realtime(
+                    yaw,
+                    pitch,
+                    t,
+                    cancel,
+                    start=start[0],
+                    prepared=prepared,
+                    stamps=stamps[i],
+                    cpu=unit.cpu,
+                )
+            except threading.BrokenBarrierError:
+                pass
+            except Exception as e:
+                print(f"[FANOUT] {unit.name} 播放失败: {e}")
+                barrier.abort()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(plans, stamps, start[0], all(completed))
+
+    def report(self, plans, stamps, start, completed):
+        """由各台的写入时刻统计偏差与吞吐"""
+        late = np.concatenate(
+            [s - (start + t) for s, (_, _, t) in zip(stamps, plans) if s.all()]
+            or [np.zeros(1)]
+        )
+        firsts = [s[0] for s in stamps if len(s) and s[0]]
+        lasts = [s[-1] for s in stamps if len(s) and s[-1]]
+        points = sum(len(s) for s in stamps)
+        result = {
+            "units": len(self.units),
+            "completed": completed,
+            "points": points,
+            "start_skew_ms": (max(firsts) - min(firsts)) * 1e3 if firsts else 0.0,
+            "max_late_ms": float(late.max()) * 1e3,
+            "points_per_sec": points / (max(lasts) - start) if lasts else 0.0,
+        }
+        lengths = {len(s) for s in stamps}
+        if len(lengths) == 1 and completed:
+            # 逐点同步（duplicate模式）：同一点在各台之间的写入时间差
+            skew = np.ptp(np.vstack(stamps), axis=0) * 1e3
+            result["max_skew_ms"] = float(skew.max())
+            result["p99_skew_ms"] = float(np.percentile(skew, 99))
+        return result
+
+    def draw(self, points, mode="duplicate", cancel=None):
+        """
+        在所有云台上绘制图形：规划、移动到起点、同步播放、关闭激光
+
+        输入参数:
+            points: Nx2归一化屏幕坐标
+            mode: "duplicate"或"split"
+            cancel: 可选的取消标志
+
+        输出: play的报告，移动到起点时被取消返回None
+        """
+        plans = self.compile(points, mode)
+        try:
+            if not self.move_to_start(plans, cancel):
+                return None
+            result = self.play(plans, cancel)
+        finally:
+            for unit in self.units:
+                unit.gimbal.publish(led=False)
+        print(
+            f"[FANOUT] {result['units']}台 {result['points']}点，"
+            f"开始偏差{result['start_skew_ms']:.2f}ms"
+        )
+        return result
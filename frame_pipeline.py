@@ -0,0 +1,203 @@
+import threading
+import time
+from telemetry import TELEMETRY, EV_FRAME
+
+IDLE_FPS = 30  # 不使用相机画面时的刷新率
+MAX_LATENCY = 0.1  # 相机帧最大允许延迟（秒），超过则丢弃
+
+
+class LatestSlot:
+    """
+    单槽帧缓冲 - 只保留最新的一帧
+
+    生产者总是覆盖旧帧（旧帧计入丢帧），消费者取走最新帧，
+    两者互不阻塞，配合生产者/消费者各自持有的帧形成三缓冲
+    """
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.item = None
+        self.stamp = 0.0
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.stamp = time.monotonic()
+            self.cond.notify_all()
+
+    def get(self, timeout=None, max_age=None):
+        """
+        取走最新帧
+
+        输入参数:
+            timeout: 最长等待时间（秒）
+            max_age: 帧的最大允许延迟，过期帧被丢弃
+
+        输出: (帧, 入槽时间)，超时返回(None, 0)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while True:
+                if self.item is not None:
+                    item, stamp = self.item, self.stamp
+                    self.item = None
+                    if max_age is None or time.monotonic() - stamp <= max_age:
+                        return item, stamp
+                    self.dropped += 1
+                    continue
+                remain = None if deadline is None else deadline - time.monotonic()
+                if remain is not None and remain <= 0:
+                    return None, 0
+                self.cond.wait(remain)
+
+
+class FramePipeline:
+    """
+    采集/渲染/显示三级流水线
+
+    主要功能：
+    - 采集线程持续读取相机，当前workmode不需要画面时自动暂停采集
+    - 渲染在调用线程执行（按钮、文字叠加）
+    - 显示线程负责disp.show，与下一帧的采集和渲染并行
+    - 各级之间只传递最新帧，过期帧丢弃，保证延迟有上界
+    """
+
+    def __init__(self, cam, disp, render, needs_camera, max_latency=MAX_LATENCY):
+        """
+        输入参数:
+            cam: 相机对象（需有read方法）
+            disp: 显示对象（需有show方法）
+            render: 渲染函数render(img, stamp)，img为相机帧或None，
+                stamp为该帧的采集时刻（time.monotonic()，无画面时为0），返回待显示图像
+            needs_camera: 无参函数，返回当前是否需要相机画面
+            max_latency: 相机帧最大允许延迟（秒）
+        """
+        self.cam = cam
+        self.disp = disp
+        self.render = render
+        self.needs_camera = needs_camera
+        self.max_latency = max_latency
+        self.captured = LatestSlot()
+        self.rendered = LatestSlot()
+        self.running = False
+        self.wake = threading.Event()
+        # 最近采集的一帧，供其他线程按时间取帧
+        self.frame_cond = threading.Condition()
+        self.last_frame = None
+        self.last_start = 0.0
+        self.threads = []
+        # 统计
+        self.shown = 0
+        self.captures = 0
+        self.latency = 0.0  # 最近一帧从采集到显示的延迟
+        self.start_time = 0.0
+        self.stop_time = None
+        self.first_frame = threading.Event()  # 第一帧已显示（用于启动计时）
+
+    def start(self):
+        self.running = True
+        self.start_time = time.monotonic()
+        self.stop_time = None
+        self.threads = [
+            threading.Thread(target=self._capture_loop, daemon=True),
+            threading.Thread(target=self._display_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_time = time.monotonic()
+        self.running = False
+        self.wake.set()
+        for thread in self.threads:
+            thread.join(1)
+
+    def _capture_loop(self):
+        while self.running:
+            if not self.needs_camera():
+                # 不需要画面时暂停采集，定期检查workmode
+                self.wake.wait(0.1)
+                self.wake.clear()
+                continue
+            start = time.monotonic()
+            img = self.cam.read()
+            with self.frame_cond:
+                self.last_frame = img
+                self.last_start = start
+                self.frame_cond.notify_all()
+            self.captured.put(img)
+            self.captures += 1
+
+    def _display_loop(self):
+        while self.running:
+            item, _ = self.rendered.get(0.5)
+            if item is None:
+                continue
+            img, stamp = item
+            self.disp.show(img)
+            if TELEMETRY.enabled:
+                TELEMETRY.mark(EV_FRAME)
+            self.shown += 1
+            self.first_frame.set()
+            if stamp:
+                self.latency = time.monotonic() - stamp
+
+    def run(self, should_run):
+        """
+        渲染循环，在调用线程中运行直到should_run()返回False
+
+        输入参数:
+            should_run: 无参函数，返回是否继续运行
+
+        输出: 无
+        """
+        self.start()
+        period = 1.0 / IDLE_FPS
+        try:
+            while should_run():
+                if self.needs_camera():
+                    self.wake.set()
+                    img, stamp = self.captured.get(0.5, self.max_latency)
+                    if img is None:
+                        continue
+                    self.rendered.put((self.render(img, stamp), stamp))
+                else:
+                    self.rendered.put((self.render(None, 0.0), 0))
+                    time.sleep(period)
+        finally:
+            self.stop()
+
+    def wait_frame(self, after, timeout=1.0, stamped=False):
+        """
+        等待一帧在after之后开始采集的画面
+
+        输入参数:
+            after: time.monotonic()时间点
+            timeout: 最长等待时间（秒）
+            stamped: 为True时同时返回该帧的采集时刻
+
+        输出: 相机帧，超时返回None；stamped为True时返回(相机帧, 采集时刻)，
+            超时返回None
+
+        调用场景: 自动标定等任务在发送指令后取一帧确定反映新状态的画面
+        """
+        deadline = time.monotonic() + timeout
+        with self.frame_cond:
+            while self.last_start <= after:
+                remain = deadline - time.monotonic()
+                if remain <= 0 or not self.running:
+                    return None
+                self.wake.set()
+                self.frame_cond.wait(min(remain, 0.1))
+            if stamped:
+                return self.last_frame, self.last_start
+            return self.last_frame
+
+    @property
+    def fps(self):
+        end = self.stop_time if self.stop_time is not None else time.monotonic()
+        elapsed = end - self.start_time
+        return self.shown / elapsed if elapsed > 0 else 0.0
@@ -1,7 +1,9 @@
-from maix import uart, pinmap
+from hal import uart, pinmap
 import struct, time, threading
 from collections import deque
 from state import *
+from telemetry import TELEMETRY, EV_SENDCMD, EV_UART_WRITE, EV_PLAY_START, EV_POINT
+from realtime import RT_CPU, RealtimeSection, precise_sleep_until
 
 # 舵机运动参数配置
 PGAP = 500  # 俯仰角（pitch）步进值
@@ -9,6 +11,187 @@ YGAP = 20  # 偏航角（yaw）步进值
 YAWLIM = [3000, 7000]  # 偏航角范围
 PITCHLIM = [3000, 7000]  # 俯仰角范围
 
+# 串口帧格式：帧头 + 类型 + yaw + pitch + led + speaker，后接校验和与帧尾
+FRAME_FMT = "<BBHHBB"
+FRAME_LEN = 10
+
+# 轨迹块上传协议：'AA' + '07' + seq + flags + n + n*(dt yaw pitch led) + checksum(2字节) + 'BB'
+BLOCK_TYPE = 0x07
+BLOCK_HEAD_FMT = "<BBBBB"
+BLOCK_HEAD_LEN = 5
+POINT_FMT = "<HHHB"  # dt(毫秒), yaw, pitch, led
+POINT_LEN = 7
+BLOCK_MAXPTS = 32  # 每块最多点数，保证单帧不超过下位机接收缓冲区
+BLOCK_CLEAR = 0x01  # flags: 清空下位机队列后再追加（新轨迹的第一块）
+
+# 下位机应答帧：'AA' + '08' + seq + status + free(2字节) + checksum + 'BB'
+ACK_TYPE = 0x08
+ACK_FMT = "<BBBBH"
+ACK_LEN = 8
+ACK_OK = 0
+ACK_BAD_CHECKSUM = 1
+ACK_BAD_SEQ = 2
+ACK_OVERFLOW = 3
+
+# 下位机状态帧：'AA' + '09' + seq + yaw + pitch + queued + free（各2字节）+ checksum + 'BB'
+# seq为最近接收的块序号，queued/free为轨迹队列已用/剩余点数
+STATUS_TYPE = 0x09
+STATUS_FMT = "<BBBHHHH"
+STATUS_LEN = 13
+
+TARGET_HISTORY = 128  # 名义目标历史记录条数，覆盖相机帧的最大延迟
+TARGET_WINDOW = 0.05  # 估算名义目标速度的时间窗口（秒）
+
+# 接收线程参数
+RX_BUF_SIZE = 4096  # 接收缓冲区大小（字节）
+RX_TIMEOUT_MS = 20  # 单次读串口的超时
+CREDIT_TIMEOUT = 1.0  # 等待下位机队列空间的超时（秒）
+BLOCK_RETRIES = 3  # 同一块被下位机拒绝后的最多重传次数
+
+CHIME_PERIOD = 0.15  # 提示音序列中相邻两次发送的间隔（秒）
+
+
+def encode_point_block(seq, dt_ms, yaw, pitch, led, flags=0) -> bytes:
+    """
+    将一组轨迹点编码为一个块帧
+
+    输入参数:
+        seq: 块序号（0-255循环）
+        dt_ms: 每个点相对上一点的等待时间（毫秒）序列
+        yaw: 偏航角序列（上位机坐标，编码时做反向映射）
+        pitch: 俯仰角序列
+        led: 激光器状态序列
+        flags: 块标志，BLOCK_CLEAR表示新轨迹
+
+    输出: 编码后的帧
+
+    调用场景: 上传轨迹到下位机队列
+    """
+    n = len(yaw)
+    if n > BLOCK_MAXPTS:
+        raise ValueError(f"block too long: {n} > {BLOCK_MAXPTS}")
+    frame = bytearray(BLOCK_HEAD_LEN + n * POINT_LEN + 3)
+    struct.pack_into(BLOCK_HEAD_FMT, frame, 0, 0xAA, BLOCK_TYPE, seq & 0xFF, flags, n)
+    offset = BLOCK_HEAD_LEN
+    for i in range(n):
+        struct.pack_into(
+            POINT_FMT,
+            frame,
+            offset,
+            int(dt_ms[i]),
+            10000 - int(yaw[i]),
+            int(pitch[i]),
+            0x50 if led[i] else 0x00,
+        )
+        offset += POINT_LEN
+    struct.pack_into("<HB", frame, offset, sum(frame[1:offset]) & 0xFFFF, 0xBB)
+    return bytes(frame)
+
+
+def decode_point_block(frame):
+    """
+    解码块帧
+
+    输入参数:
+        frame: 完整的块帧
+
+    输出: (seq, flags, points)，points为(dt_ms, yaw, pitch, led)元组列表，yaw已还原为上位机坐标
+
+    调用场景: 下位机模拟器解析及协议自检；格式或校验错误时抛出ValueError
+    """
+    if len(frame) < BLOCK_HEAD_LEN + 3 or frame[0] != 0xAA or frame[1] != BLOCK_TYPE:
+        raise ValueError("not a point block")
+    _, _, seq, flags, n = struct.unpack_from(BLOCK_HEAD_FMT, frame, 0)
+    end = BLOCK_HEAD_LEN + n * POINT_LEN
+    if len(frame) != end + 3 or frame[-1] != 0xBB:
+        raise ValueError("bad block length")
+    (checksum,) = struct.unpack_from("<H", frame, end)
+    if checksum != sum(frame[1:end]) & 0xFFFF:
+        raise ValueError("bad block checksum")
+    points = []
+    for dt, yaw, pitch, led in struct.iter_unpack(POINT_FMT, frame[BLOCK_HEAD_LEN:end]):
+        points.append((dt, 10000 - yaw, pitch, led != 0))
+    return seq, flags, points
+
+
+def encode_ack(seq, status, free) -> bytes:
+    """编码下位机应答帧：status为ACK_*状态码，free为队列剩余点数"""
+    frame = bytearray(ACK_LEN)
+    struct.pack_into(ACK_FMT, frame, 0, 0xAA, ACK_TYPE, seq & 0xFF, status, free)
+    frame[6] = sum(frame[1:6]) & 0xFF
+    frame[7] = 0xBB
+    return bytes(frame)
+
+
+def decode_ack(frame):
+    """解码应答帧，返回(seq, status, free)；格式或校验错误时抛出ValueError"""
+    if len(frame) != ACK_LEN or frame[0] != 0xAA or frame[1] != ACK_TYPE:
+        raise ValueError("not an ack frame")
+    if frame[7] != 0xBB or frame[6] != sum(frame[1:6]) & 0xFF:
+        raise ValueError("bad ack checksum")
+    _, _, seq, status, free = struct.unpack_from(ACK_FMT, frame, 0)
+    return seq, status, free
+
+
+def encode_status(seq, yaw, pitch, queued, free) -> bytes:
+    """编码下位机状态帧：上报舵机位置（yaw为上位机坐标，编码时反向映射）与队列状态"""
+    frame = bytearray(STATUS_LEN)
+    struct.pack_into(
+        STATUS_FMT,
+        frame,
+        0,
+        0xAA,
+        STATUS_TYPE,
+        seq & 0xFF,
+        10000 - int(yaw),
+        int(pitch),
+        queued,
+        free,
+    )
+    frame[11] = sum(frame[1:11]) & 0xFF
+    frame[12] = 0xBB
+    return bytes(frame)
+
+
+def decode_status(frame):
+    """解码状态帧，返回(seq, yaw, pitch, queued, free)；格式或校验错误时抛出ValueError"""
+    if len(frame) != STATUS_LEN or frame[0] != 0xAA or frame[1] != STATUS_TYPE:
+        raise ValueError("not a status frame")
+    if frame[12] != 0xBB or frame[11] != sum(frame[1:11]) & 0xFF:
+        raise ValueError("bad status checksum")
+    _, _, seq, yaw, pitch, queued, free = struct.unpack_from(STATUS_FMT, frame, 0)
+    return seq, 10000 - yaw, pitch, queued, free
+
+
+def frame_length(buf, start=0, end=None):
+    """
+    根据帧类型计算从start开始的帧长度
+
+    输入参数:
+        buf: 接收缓冲区（buf[start]应为0xAA）
+        start: 帧起始位置
+        end: 有效数据的结束位置，None表示len(buf)
+
+    输出: 帧长度；数据不足以判断时返回0，未知类型返回-1
+
+    调用场景: 在字节流中按0xAA...0xBB分帧
+    """
+    avail = (len(buf) if end is None else end) - start
+    if avail < 2:
+        return 0
+    ftype = buf[start + 1]
+    if ftype == 0x06:
+        return FRAME_LEN
+    if ftype == ACK_TYPE:
+        return ACK_LEN
+    if ftype == STATUS_TYPE:
+        return STATUS_LEN
+    if ftype == BLOCK_TYPE:
+        if avail < BLOCK_HEAD_LEN:
+            return 0
+        return BLOCK_HEAD_LEN + buf[start + 4] * POINT_LEN + 3
+    return -1
+
 
 class GIMBAL_CONTROL:
     """
@@ -28,6 +211,10 @@ class GIMBAL_CONTROL:
         port: str = "/dev/ttyS1",
         baudrate: int = 115200,
         maxlen: int = 8,
+        writer_hz: float = 0,
+        reader: bool = False,
+        async_chime: bool = False,
+        upload: bool = False,
     ) -> None:
         """
         初始化串口控制器
@@ -37,6 +224,11 @@ class GIMBAL_CONTROL:
             port: 串口设备路径，默认"/dev/ttyS1"
             baudrate: 波特率，默认115200
             maxlen: 历史数据队列最大长度，默认8
+            writer_hz: 发送线程频率，大于0时启用定频发送线程模式，默认0（直接发送）
+            reader: 是否启动接收线程，解析下位机应答与状态帧，默认False
+            async_chime: 启动提示音在后台线程播放，不阻塞初始化（约1.8秒），默认False
+            upload: 轨迹以块帧上传到下位机队列播放（需reader=True按队列空间流控），
+                默认False（逐点实时发送）
 
         输出: 无
 
@@ -48,14 +240,21 @@ class GIMBAL_CONTROL:
 
         # 初始化成员变量
         self.STATE = state
-        self.ledstate = False  # 激光器状态
         self.ser = uart.UART(port, baudrate)
+        self.upload = upload  # play_trajectory等是否经下位机队列播放
 
-        # 云台角度控制参数（范围3000-7000，中心5000）
-        self.yaw: int = 5000  # 当前偏航角
-        self.pitch: int = 5000  # 当前俯仰角
+        # 当前指令（yaw, pitch, 激光器, 蜂鸣器），整体替换发布，读者无需加锁
+        # 云台角度范围3000-7000，中心5000
+        self.command = Command(speaker=state.speaker)
+        state.gimbal = self  # STATE.speaker经本对象发布
+        self._cmd_lock = threading.Lock()  # 只串行化写者的读-改-写
         self.oldyaw: int = 5000  # 上一次偏航角
         self.oldpitch: int = 5000  # 上一次俯仰角
+        self.target = (5000, 5000)  # 轨迹播放中的名义目标（未叠加闭环修正）
+        # 名义目标的环形历史记录（时刻, 目标），光斑跟踪按相机帧的采集时刻查找
+        self._target_times = [0.0] * TARGET_HISTORY
+        self._targets = [self.target] * TARGET_HISTORY
+        self._target_index = 0
 
         # 历史数据队列，用于平滑控制
         self.yaw_li = deque(maxlen=maxlen)
@@ -66,18 +265,79 @@ class GIMBAL_CONTROL:
             self.yaw_li.append(5000)
             self.pitch_li.append(5000)
 
+        # 预分配的发送缓冲区，避免每帧重新拼接bytes
+        self._frame = bytearray(FRAME_LEN)
+        # 发送线程模式：调用者只发布最新指令，由单一线程定频发送
+        self._writer = None
+        self._writer_running = False
+        self.writer_period = 0.0
+        self._tx_lock = threading.Lock()
+        self._block_seq = 0
+        if writer_hz > 0:
+            self.start_writer(writer_hz)
+
+        # 接收线程：预分配缓冲区，按0xAA...0xBB分帧，帧数据以memoryview切片解析
+        self._rx = bytearray(RX_BUF_SIZE)
+        self._rx_view = memoryview(self._rx)
+        self._rx_head = 0  # 未解析数据起点
+        self._rx_tail = 0  # 未解析数据终点
+        self._reader = None
+        self._reader_running = False
+        self._rx_cond = threading.Condition()
+        self._inflight = deque()  # 已发送、尚未被下位机确认的块 (seq, 点数, 帧)
+        self._unanswered = 0  # 已发送、尚未收到任何应答的块数
+        self._rejected = None  # 最早一次未处理的拒绝应答状态，None表示无
+        self.feedback = None  # 下位机上报的舵机位置(yaw, pitch)
+        self.feedback_time = 0.0  # 最近一次状态帧的时间（time.monotonic()）
+        self.queue_depth = 0  # 下位机轨迹队列中的点数
+        self.credits = None  # 可继续发送的点数，None表示未知
+        self.rx_frames = 0
+        self.rx_errors = 0  # 校验或格式错误的帧
+        self.rx_resync_bytes = 0  # 重新同步时丢弃的字节数
+        self.nacks = 0  # 非ACK_OK的应答数
+        if reader:
+            self.start_reader()
+
         # 系统启动提示音
-        for i in range(12):
-            if i % 2 == 0 and i > 9:
-                self.STATE.speaker = True
-            else:
-                self.STATE.speaker = False
-            self.sendcmd()
-            time.sleep(0.15)
-        self.STATE.speaker = False
+        self._chime = None
+        self.chime(12, 10, block=not async_chime)
 
         print("Serial is open!")
 
+    def _chime_loop(self, count, beep_from):
+        for i in range(count):
+            self.publish(speaker=i % 2 == 0 and i >= beep_from)
+            time.sleep(CHIME_PERIOD)
+        self.publish(speaker=False)
+
+    def chime(self, count, beep_from, block=True):
+        """
+        按固定间隔重复发送当前指令，最后几次中隔次响蜂鸣器
+
+        输入参数:
+            count: 发送次数
+            beep_from: 从第几次开始响（偶数次）
+            block: 为False时在后台线程执行，立即返回
+
+        输出: 后台线程（block=False时），否则None
+
+        调用场景: 启动提示音、回中提示音；后台执行时其他指令可照常发布，
+        提示音只修改蜂鸣器状态
+        """
+        if block:
+            self._chime_loop(count, beep_from)
+            return None
+        self._chime = threading.Thread(
+            target=self._chime_loop, args=(count, beep_from), daemon=True
+        )
+        self._chime.start()
+        return self._chime
+
+    def wait_chime(self, timeout=None):
+        """等待后台提示音播放结束"""
+        if self._chime is not None:
+            self._chime.join(timeout)
+
     def close(self):
         """
         关闭串口连接
@@ -88,13 +348,409 @@ class GIMBAL_CONTROL:
         调用场景: 程序退出时清理资源
         """
         print("Closing serial!")
+        self.wait_chime()
+        self.stop_writer()
+        self.stop_reader()
         # 复位到中心位置
-        self.yaw = 5000
-        self.pitch = 5500
-        self.ledstate = False
-        self.sendcmd()
+        self.publish(5000, 5500, led=False)
         self.ser.close()
 
+    def start_writer(self, hz: float = 100):
+        """
+        启动定频发送线程
+
+        输入参数:
+            hz: 发送频率（帧/秒），默认100
+
+        输出: 无
+
+        调用场景: 轨迹快速播放时，保证固定的指令速率且串口只由一个线程写入
+        """
+        if self._writer is not None:
+            return
+        self.writer_period = 1.0 / hz
+        self._writer_running = True
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def stop_writer(self):
+        """
+        停止定频发送线程，回到直接发送模式
+
+        输入参数: 无
+        输出: 无
+
+        调用场景: 关闭串口前或需要同步发送时
+        """
+        if self._writer is None:
+            return
+        self._writer_running = False
+        self._writer.join()
+        self._writer = None
+
+    @property
+    def yaw(self) -> int:
+        """当前偏航角"""
+        return self.command.yaw
+
+    @yaw.setter
+    def yaw(self, value):
+        self.update(yaw=value)
+
+    @property
+    def pitch(self) -> int:
+        """当前俯仰角"""
+        return self.command.pitch
+
+    @pitch.setter
+    def pitch(self, value):
+        self.update(pitch=value)
+
+    @property
+    def ledstate(self) -> bool:
+        """激光器状态"""
+        return self.command.led
+
+    @ledstate.setter
+    def ledstate(self, value):
+        self.update(led=value)
+
+    def update(self, yaw=None, pitch=None, led=None, speaker=None):
+        """
+        原子地更新指令记录（不写串口）
+
+        输入参数:
+            yaw: 目标偏航角，None表示保持当前值（超出范围时限幅）
+            pitch: 目标俯仰角，None表示保持当前值（超出范围时限幅）
+            led: 激光器状态，None表示保持当前值
+            speaker: 蜂鸣器状态，None表示保持当前值
+
+        输出: 新的Command记录
+
+        调用场景: 任意线程修改指令，其他线程总能读到完整的一组值
+        """
+        if yaw is not None:
+            yaw = max(YAWLIM[0], min(YAWLIM[1], int(yaw)))
+        if pitch is not None:
+            pitch = max(PITCHLIM[0], min(PITCHLIM[1], int(pitch)))
+        if led is not None:
+            led = bool(led)
+        if speaker is not None:
+            speaker = bool(speaker)
+        with self._cmd_lock:
+            command = self.command.replace(yaw, pitch, led, speaker)
+            self.command = command
+        return command
+
+    def publish(self, yaw=None, pitch=None, led=None, speaker=None):
+        """
+        更新指令并发送
+
+        输入参数:
+            yaw: 目标偏航角，None表示保持当前值
+            pitch: 目标俯仰角，None表示保持当前值
+            led: 激光器状态，None表示保持当前值
+            speaker: 蜂鸣器状态，None表示保持当前值
+
+        输出: 无
+
+        调用场景: 一次性修改多个字段并发送，中间状态不会被发送出去；
+        发送线程模式下不写串口，旧的指令直接被覆盖
+        """
+        self.sendcmd(self.update(yaw, pitch, led, speaker))
+
+    def _record_target(self, target):
+        """记录播放中的名义目标（先写目标再写时刻，读者不会读到不完整的记录）"""
+        i = (self._target_index + 1) % TARGET_HISTORY
+        self._targets[i] = target
+        self._target_times[i] = time.monotonic()
+        self._target_index = i
+        self.target = target
+
+    def target_at(self, stamp, window=TARGET_WINDOW):
+        """
+        查找某一时刻的名义目标
+
+        输入参数:
+            stamp: time.monotonic()时刻（如相机帧的采集时刻）
+            window: 估算速度的时间窗口（秒）
+
+        输出: (目标(yaw, pitch), 此前window秒内的平均速度（舵机单位/秒）)；
+            stamp早于全部记录时返回当前目标与无穷大速度
+
+        调用场景: 光斑跟踪中相机帧有延迟，需与采集时刻的指令比较
+        """
+        times, targets = self._target_times, self._targets
+        head = self._target_index
+        found = None
+        for k in range(TARGET_HISTORY):
+            i = (head - k) % TARGET_HISTORY
+            if times[i] and times[i] <= stamp:
+                found = k
+                break
+        if found is None:
+            return self.target, float("inf")
+        target = targets[(head - found) % TARGET_HISTORY]
+        previous = target
+        for k in range(found, TARGET_HISTORY):
+            i = (head - k) % TARGET_HISTORY
+            if not times[i]:
+                break  # 更早的记录为空：此前云台停在第一个目标上
+            previous = targets[i]
+            if times[i] <= stamp - window:
+                break
+        else:
+            return target, float("inf")
+        dyaw, dpitch = target[0] - previous[0], target[1] - previous[1]
+        return target, (dyaw * dyaw + dpitch * dpitch) ** 0.5 / window
+
+    def _encode(self, command, frame=None):
+        """
+        将指令编码到缓冲区，返回该缓冲区（写串口时转为bytes以兼容maix接口）
+
+        frame为None时使用共享的预分配缓冲区，调用方需持有_tx_lock；
+        其他线程（预生成帧、播放中重新编码）传入自己的缓冲区
+        """
+        if frame is None:
+            frame = self._frame
+        yaw, pitch, led, speaker = command
+        yaw = 10000 - yaw  # yaw需要反向映射
+        led_byte = 0x50 if led else 0x00
+        speaker_byte = 0x01 if speaker else 0x00
+        struct.pack_into(
+            FRAME_FMT, frame, 0, 0xAA, 0x06, yaw, pitch, led_byte, speaker_byte
+        )
+        frame[8] = (
+            0x06
+            + (yaw & 0xFF)
+            + (yaw >> 8)
+            + (pitch & 0xFF)
+            + (pitch >> 8)
+            + led_byte
+            + speaker_byte
+        ) & 0xFF
+        frame[9] = 0xBB
+        return frame
+
+    def _writer_loop(self):
+        """发送线程主循环：按固定周期发送最新指令，落后超过一个周期则重新对齐"""
+        period = self.writer_period
+        next_t = time.monotonic()
+        while self._writer_running:
+            if TELEMETRY.enabled:
+                TELEMETRY.mark(EV_UART_WRITE)
+            with self._tx_lock:
+                self.ser.write(bytes(self._encode(self.command)))
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -period:
+                next_t = time.monotonic()
+
+    def start_reader(self):
+        """
+        启动串口接收线程
+
+        输入参数: 无
+        输出: 无
+
+        调用场景: 需要下位机位置反馈或按队列空间流控上传轨迹时
+        """
+        if self._reader is not None:
+            return
+        self._reader_running = True
+        self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+        self._reader.start()
+
+    def stop_reader(self):
+        """停止串口接收线程"""
+        if self._reader is None:
+            return
+        self._reader_running = False
+        self._reader.join()
+        self._reader = None
+
+    def _reader_loop(self):
+        """接收线程主循环：阻塞读串口（带超时），数据交给feed解析"""
+        while self._reader_running:
+            try:
+                data = self.ser.read(-1, RX_TIMEOUT_MS)
+            except Exception as e:
+                if self._reader_running:
+                    print(f"[UART] 读取失败: {e}")
+                    time.sleep(RX_TIMEOUT_MS / 1000)
+                continue
+            if data:
+                self.feed(data)
+
+    def feed(self, data):
+        """
+        接收一段串口数据并解析其中所有完整帧
+
+        输入参数:
+            data: 收到的字节
+
+        输出: 无
+
+        调用场景: 接收线程调用；测试时也可直接喂入数据
+        """
+        n = len(data)
+        if self._rx_tail + n > RX_BUF_SIZE:
+            # 未解析的数据前移到缓冲区开头
+            pending = self._rx_tail - self._rx_head
+            view = self._rx_view
+            view[:pending] = view[self._rx_head : self._rx_tail]
+            self._rx_head, self._rx_tail = 0, pending
+            if pending + n > RX_BUF_SIZE:
+                # 长时间无法同步，丢弃积压数据
+                self.rx_resync_bytes += pending
+                self._rx_tail = 0
+                data = data[-RX_BUF_SIZE:]
+                n = len(data)
+        self._rx_view[self._rx_tail : self._rx_tail + n] = data
+        self._rx_tail += n
+        self._parse()
+
+    def _parse(self):
+        buf = self._rx
+        i, end = self._rx_head, self._rx_tail
+        while i < end:
+            j = buf.find(0xAA, i, end)
+            if j < 0:
+                self.rx_resync_bytes += end - i
+                i = end
+                break
+            self.rx_resync_bytes += j - i
+            i = j
+            length = frame_length(buf, i, end)
+            if length == 0 or end - i < length:
+                break
+            if length > 0 and buf[i + length - 1] == 0xBB:
+                if self._handle_rx(self._rx_view[i : i + length]):
+                    i += length
+                    continue
+                self.rx_errors += 1
+            # 帧头错位或校验失败，向后重新同步
+            self.rx_resync_bytes += 1
+            i += 1
+        if i == end:
+            i = end = 0
+        self._rx_head, self._rx_tail = i, end
+
+    def _handle_rx(self, frame):
+        """处理一个完整帧（memoryview），格式或校验错误返回False"""
+        try:
+            if frame[1] == ACK_TYPE:
+                seq, status, free = decode_ack(frame)
+                if status != ACK_OK:
+                    self.nacks += 1
+                self._update_credits(seq, free, status)
+            elif frame[1] == STATUS_TYPE:
+                seq, yaw, pitch, queued, free = decode_status(frame)
+                self.feedback = (yaw, pitch)
+                self.feedback_time = time.monotonic()
+                self.queue_depth = queued
+                self._update_credits(seq, free)
+            else:
+                return False
+        except ValueError:
+            return False
+        self.rx_frames += 1
+        return True
+
+    def _update_credits(self, seq, free, status=None):
+        """
+        按下位机上报的剩余空间与已确认的块序号，更新可发送点数
+
+        status为应答帧的状态（状态帧为None）；被拒绝的块不出队，留待重传
+        """
+        with self._rx_cond:
+            inflight = self._inflight
+            if status is not None:
+                self._unanswered = max(self._unanswered - 1, 0)
+            if status not in (None, ACK_OK):
+                if self._rejected is None:
+                    self._rejected = status
+            elif any(s == seq for s, _, _ in inflight):
+                while inflight and inflight.popleft()[0] != seq:
+                    pass
+            # 未确认的块稍后会占用队列空间
+            self.credits = free - sum(n for _, n, _ in inflight)
+            self._rx_cond.notify_all()
+
+    def _wait_paced(self, ready, tries, timeout=CREDIT_TIMEOUT):
+        """
+        等待接收线程的应答使条件成立，期间重传被下位机拒绝的块
+
+        输入参数:
+            ready: 无参条件函数，持有_rx_cond时调用
+            tries: 各块序号的重传次数，见_resend_rejected
+            timeout: 超时（秒）
+
+        输出: 条件是否在超时前成立
+        """
+        while True:
+            with self._rx_cond:
+                done = self._rx_cond.wait_for(
+                    lambda: self._rejected is not None or ready(), timeout
+                )
+                if self._rejected is None:
+                    return done
+            self._resend_rejected(tries)
+
+    def _resend_rejected(self, tries):
+        """
+        重传被拒绝的块及其后已发送的块（下位机只按序号顺序接收）
+
+        输入参数:
+            tries: 各块序号已重传的次数，就地更新
+
+        输出: 无
+
+        异常:
+            TimeoutError: 等不到已发送块的应答或下位机队列空间
+            RuntimeError: 同一块重传BLOCK_RETRIES次仍被拒绝
+        """
+        with self._rx_cond:
+            # 先等已发送的块全部应答，避免其后续的拒绝应答再次触发重传；
+            # 未确认的块全部能放入队列后再发（溢出被拒时等待回放腾出空间）
+            if not self._rx_cond.wait_for(
+                lambda: self._unanswered == 0
+                and self.credits is not None
+                and self.credits >= 0,
+                CREDIT_TIMEOUT,
+            ):
+                raise TimeoutError("等待下位机应答超时")
+            status, self._rejected = self._rejected, None
+            if not self._inflight:
+                return
+            seq = self._inflight[0][0]
+            tries[seq] = tries.get(seq, 0) + 1
+            if tries[seq] > BLOCK_RETRIES:
+                raise RuntimeError(f"块{seq}重传{BLOCK_RETRIES}次仍被拒绝（状态{status}）")
+            frames = [frame for _, _, frame in self._inflight]
+            self._unanswered += len(frames)
+        print(f"[UART] 块{seq}被拒绝（状态{status}），重传{len(frames)}块")
+        with self._tx_lock:
+            for frame in frames:
+                self.ser.write(frame)
+
+    def wait_credits(self, n, timeout=CREDIT_TIMEOUT):
+        """
+        等待下位机队列至少有n个点的空间
+
+        输入参数:
+            n: 需要的点数
+            timeout: 超时（秒）
+
+        输出: 是否等到
+        """
+        with self._rx_cond:
+            return self._rx_cond.wait_for(
+                lambda: self.credits is not None and self.credits >= n, timeout
+            )
+
     def set(self, yaw, pitch):
         """
         设置云台目标角度
@@ -107,68 +763,523 @@ class GIMBAL_CONTROL:
 
         调用场景: 根据视觉检测结果调整云台指向
         """
-        # 限制角度范围，防止超出机械极限
-        self.yaw = max(YAWLIM[0], min(YAWLIM[1], int(yaw)))
-        self.pitch = max(PITCHLIM[0], min(PITCHLIM[1], int(pitch)))
+        # 限制角度范围，防止超出机械极限（在update中完成），yaw与pitch同时生效
+        self.update(yaw, pitch)
 
-    def sendcmd(self):
+    def sendcmd(self, command=None):
         """
         发送控制命令到下位机
 
-        输入参数: 无
+        输入参数:
+            command: 要发送的Command记录，None表示当前指令
         输出: 无
 
         调用场景: 每次需要更新云台状态时调用
 
-        协议格式: 'AA' + yaw(2字节) + pitch(2字节) + led(1字节) + light(1字节) + speaker(1字节) + checksum(1字节)
-        """
-        # 创建数据帧 - yaw需要反向映射
-        yaw_bytes = struct.pack("<H", -(self.yaw - 5000) + 5000)
-        pitch_bytes = struct.pack("<H", self.pitch)
-
-        # 激光器控制
-        if self.ledstate:
-            led_byte = 0x50.to_bytes(1, "big")  # 开启
-        else:
-            led_byte = 0x00.to_bytes(1, "big")
+        协议格式: 'AA' + '06' + yaw(2字节) + pitch(2字节) + led(1字节) + speaker(1字节) + checksum(1字节) + 'BB'
 
-        # 蜂鸣器控制
-        if self.STATE.speaker:
-            speaker_byte = 0x01.to_bytes(1, "big")  # 开启
-        else:
-            speaker_byte = 0x00.to_bytes(1, "big")
-        # 组装数据帧
-        frame = 0xAA.to_bytes(1, "big") + 0x06.to_bytes(1, "big")
-        frame += yaw_bytes + pitch_bytes + led_byte + speaker_byte
-
-        # 计算校验和
-        checksum = 0
-        checksum = sum(frame[1:8]) & 0xFF
-        frame += struct.pack("B", checksum) + 0xBB.to_bytes(1, "big")
-        # 发送数据帧
-        self.ser.write(frame)
+        发送线程模式下指令已由update发布，由发送线程负责写串口
+        """
+        if TELEMETRY.enabled:
+            TELEMETRY.mark(EV_SENDCMD)
+        if command is None:
+            command = self.command  # 只读取一次，保证发送的是一致的一组值
+        if self._writer is None:
+            with self._tx_lock:
+                self.ser.write(bytes(self._encode(command)))
         # 更新历史数据
-        self.yaw_li.append(self.yaw)
-        self.pitch_li.append(self.pitch)
+        self.yaw_li.append(command.yaw)
+        self.pitch_li.append(command.pitch)
 
-    def gomid(self):
+    def gomid(self, block=True):
         """
         云台回到中心位置
 
-        输入参数: 无
+        输入参数:
+            block: 为False时重复发送与提示音在后台进行，立即返回
+
         输出: 无
 
         调用场景: 复位云台到初始位置
         """
-        self.yaw = 5000  # 中心偏航角
-        self.pitch = 5000  # 中心俯仰角
+        self.update(5000, 5000)  # 中心位置
 
         # 执行5次命令确保到位，最后一次有提示音
-        for i in range(5):
-            if i == 4:
-                self.STATE.speaker = True
+        self.chime(5, 4, block)
+
+    def play_trajectory(
+        self, yaw, pitch, t, cancel=None, correction=None, realtime=False, led=None
+    ):
+        """
+        按时间戳逐点发送轨迹
+
+        输入参数:
+            yaw: 偏航角序列
+            pitch: 俯仰角序列
+            t: 各点相对起点的发送时间（秒），通常由MotionPlanner.plan给出
+            cancel: 可选的取消标志（需有cancelled属性），每点之间检查
+            correction: 可选的闭环修正源（如SpotTracker），其offset叠加到每个指令上
+            realtime: 实时播放模式，见play_realtime
+            led: 可选的逐点激光器状态序列（子路径之间关闭激光），None表示保持当前状态
+
+        输出: 是否完整播放（被取消返回False）
+
+        调用场景: 绘制图形，按绝对截止时间对齐，循环抖动不会累积；
+        上传模式（upload=True）下整条轨迹交给下位机按时间戳回放，闭环修正不生效
+        """
+        if self.upload:
+            return self.play_queued(yaw, pitch, t, cancel, led)
+        if realtime:
+            return self.play_realtime(yaw, pitch, t, cancel, correction, led=led)
+        start = time.monotonic()
+        if TELEMETRY.enabled:
+            TELEMETRY.mark(EV_PLAY_START)
+        for i in range(len(yaw)):
+            if cancel is not None and cancel.cancelled:
+                return False
+            delay = start + t[i] - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if TELEMETRY.enabled:
+                TELEMETRY.mark(EV_POINT, int(t[i] * 1e9))
+            self._record_target((yaw[i], pitch[i]))
+            on = None if led is None else bool(led[i])
+            if correction is not None:
+                dyaw, dpitch = correction.offset
+                self.publish(yaw[i] + dyaw, pitch[i] + dpitch, on)
             else:
-                self.STATE.speaker = False
-            self.sendcmd()
-            time.sleep(0.15)
-        self.STATE.speaker = False
+                self.publish(yaw[i], pitch[i], on)
+        return True
+
+    def prepare_playback(self, yaw, pitch, led=None):
+        """
+        预先生成整条轨迹的指令记录与串口帧
+
+        输入参数:
+            yaw: 偏航角序列
+            pitch: 俯仰角序列
+            led: 可选的逐点激光器状态序列，None表示保持当前状态
+
+        输出: (commands, frames)，逐点的Command记录与编码好的bytes帧
+
+        调用场景: 实时播放前，把所有分配和编码移出发送循环
+        """
+        base = self.command
+        commands = []
+        frames = []
+        buffer = bytearray(FRAME_LEN)  # 不使用共享缓冲区，发送线程可能同时在编码
+        seq = base.seq
+        if led is None:
+            led = [base.led] * len(yaw)
+        for y, p, on in zip(yaw, pitch, led):
+            seq += 1
+            command = Command(
+                max(YAWLIM[0], min(YAWLIM[1], int(y))),
+                max(PITCHLIM[0], min(PITCHLIM[1], int(p))),
+                bool(on),
+                base.speaker,
+                seq,
+            )
+            commands.append(command)
+            frames.append(bytes(self._encode(command, buffer)))
+        return commands, frames
+
+    def play_realtime(
+        self,
+        yaw,
+        pitch,
+        t,
+        cancel=None,
+        correction=None,
+        start=None,
+        prepared=None,
+        stamps=None,
+        led=None,
+        cpu=RT_CPU,
+    ):
+        """
+        实时模式播放轨迹
+
+        输入参数:
+            yaw, pitch, t, cancel, correction: 同play_trajectory
+            start: 起点的绝对时刻（time.monotonic()），None表示立即开始；
+                多台云台同步播放时使用同一个start
+            prepared: prepare_playback的结果，None时在此生成
+            stamps: 可选的预分配浮点数组（长度不小于点数），记录每帧写入串口后的时刻
+            led: 可选的逐点激光器状态序列，None表示保持当前状态
+            cpu: 播放线程绑定的CPU编号，None表示不绑定，默认取GIMBAL_RT_CPU；
+                多个播放线程同时运行时应各用一个CPU或不绑定
+
+        输出: 是否完整播放（被取消返回False）
+
+        调用场景: 对抖动敏感的绘制；播放期间关闭循环GC并按RealtimeSection配置
+        绑定CPU/提高优先级，循环内只索引预先生成的记录和帧，不分配新对象、不编码；
+        有闭环修正量或蜂鸣器状态被其他线程改变时才在本线程的缓冲区中重新编码
+        """
+        if prepared is None:
+            prepared = self.prepare_playback(yaw, pitch, led)
+        commands, frames = prepared
+        targets = [(command.yaw, command.pitch) for command in commands]
+        n = len(commands)
+        write = self.ser.write
+        direct = self._writer is None
+        tx_lock = self._tx_lock
+        cmd_lock = self._cmd_lock
+        buffer = bytearray(FRAME_LEN)  # 重新编码用，不与其他线程共享
+        telemetry = TELEMETRY
+        with RealtimeSection(cpu):
+            if start is None:
+                start = time.monotonic()
+            deadlines = [start + float(ti) for ti in t]
+            if telemetry.enabled:
+                telemetry.mark(EV_PLAY_START)
+            for i in range(n):
+                if cancel is not None and cancel.cancelled:
+                    return False
+                precise_sleep_until(deadlines[i])
+                if telemetry.enabled:
+                    telemetry.mark(EV_POINT, int((deadlines[i] - start) * 1e9))
+                self._record_target(targets[i])
+                command = commands[i]
+                frame = frames[i]
+                if correction is not None:
+                    dyaw, dpitch = correction.offset
+                    if dyaw or dpitch:
+                        command = self.update(
+                            command.yaw + dyaw, command.pitch + dpitch, command.led
+                        )
+                        frame = bytes(self._encode(command, buffer))
+                with cmd_lock:
+                    # 蜂鸣器由其他线程控制（如提示音），以当前状态为准
+                    speaker = self.command.speaker
+                    if command.speaker != speaker:
+                        command = command.replace(speaker=speaker)
+                        frame = bytes(self._encode(command, buffer))
+                    self.command = command
+                if direct:
+                    with tx_lock:
+                        write(frame)
+                if stamps is not None:
+                    stamps[i] = time.monotonic()
+        if n:
+            self.yaw_li.append(commands[-1].yaw)
+            self.pitch_li.append(commands[-1].pitch)
+        return True
+
+    def upload_trajectory(
+        self, yaw, pitch, dt_ms, led=None, append=False, cancel=None
+    ):
+        """
+        以块帧形式上传整条轨迹到下位机队列
+
+        输入参数:
+            yaw: 偏航角序列
+            pitch: 俯仰角序列
+            dt_ms: 每个点相对上一点的等待时间（毫秒），可为单个数值
+            led: 激光器状态序列，None表示全程开启
+            append: 为True时追加到下位机队列末尾，否则先清空队列
+            cancel: 可选的取消标志（需有cancelled属性），每块之间检查
+
+        输出: 发送的块数（被取消时只含已发送的块）
+
+        异常:
+            TimeoutError: 流控时等不到下位机队列空间或应答
+            RuntimeError: 某块重传BLOCK_RETRIES次仍被下位机拒绝
+
+        调用场景: 绘制图形时由下位机按时间戳回放，不受上位机循环抖动影响
+
+        接收线程运行时按下位机上报的队列空间发送，队列满时等待而不是溢出，
+        被拒绝的块从该块起按序重传，返回前等待全部块被确认；
+        若一直收不到应答（下位机不支持），退回直接发送。
+        命令镜像只更新到实际发送的最后一点
+        """
+        n = len(yaw)
+        if isinstance(dt_ms, (int, float)):
+            dt_ms = [dt_ms] * n
+        if led is None:
+            led = [True] * n
+        yaw = [max(YAWLIM[0], min(YAWLIM[1], int(v))) for v in yaw]
+        pitch = [max(PITCHLIM[0], min(PITCHLIM[1], int(v))) for v in pitch]
+
+        blocks = 0
+        sent = 0
+        tries = {}  # 各块序号的重传次数
+        paced = self._reader is not None
+        try:
+            for start in range(0, n, BLOCK_MAXPTS):
+                if cancel is not None and cancel.cancelled:
+                    break
+                end = min(start + BLOCK_MAXPTS, n)
+                count = end - start
+                clear = start == 0 and not append
+                if paced and clear:
+                    # 新轨迹清空下位机队列，等待该块的应答得到新的空间
+                    with self._rx_cond:
+                        self._inflight.clear()
+                        self.credits = None
+                        self._unanswered = 0
+                        self._rejected = None
+                elif paced and not self._wait_paced(
+                    lambda: self.credits is not None and self.credits >= count, tries
+                ):
+                    if self.rx_frames == 0:
+                        print("[UART] 未收到下位机应答，不再流控")
+                        paced = False
+                    else:
+                        raise TimeoutError("等待下位机队列空间超时")
+                frame = encode_point_block(
+                    self._block_seq,
+                    dt_ms[start:end],
+                    yaw[start:end],
+                    pitch[start:end],
+                    led[start:end],
+                    BLOCK_CLEAR if clear else 0,
+                )
+                if paced:
+                    tries.pop(self._block_seq, None)
+                    with self._rx_cond:
+                        self._inflight.append((self._block_seq, count, frame))
+                        self._unanswered += 1
+                        if self.credits is not None:
+                            self.credits -= count
+                with self._tx_lock:
+                    self.ser.write(frame)
+                self._block_seq = (self._block_seq + 1) & 0xFF
+                blocks += 1
+                sent = end
+            if paced and not self._wait_paced(
+                lambda: not self._inflight and self._unanswered == 0, tries
+            ):
+                raise TimeoutError("等待下位机确认轨迹块超时")
+        finally:
+            if sent:
+                self.update(yaw[sent - 1], pitch[sent - 1])
+        return blocks
+
+    def queue_trajectory(
+        self, yaw, pitch, t, led=None, cancel=None, append=False, delay=0.0
+    ):
+        """
+        按规划的时间戳把轨迹上传到下位机队列
+
+        输入参数:
+            yaw, pitch, t: 轨迹与各点相对起点的时间（秒）
+            led: 可选的逐点激光器状态序列，None表示保持当前状态
+            cancel: 可选的取消标志
+            append: 为True时接在队列中已有的轨迹之后，否则先清空队列
+            delay: 第一点相对队列中上一点的等待时间（秒），append时使用
+
+        输出: 是否全部上传（被取消返回False）
+
+        调用场景: 上传模式播放；队列满时按下位机应答等待，上传本身即按回放速度节流
+        """
+        ms = [int(round((float(ti) + delay) * 1000)) for ti in t]
+        dt_ms = [b - a for a, b in zip([0] + ms, ms)]  # 累计取整，误差不累积
+        if led is None:
+            led = [self.command.led] * len(ms)
+        self.upload_trajectory(yaw, pitch, dt_ms, led, append, cancel)
+        return cancel is None or not cancel.cancelled
+
+    def wait_queue(self, duration, cancel=None):
+        """
+        等待下位机队列回放完毕
+
+        输入参数:
+            duration: 从现在起预计的剩余回放时间（秒）
+            cancel: 可选的取消标志，取消时清空下位机队列
+
+        输出: 是否回放完毕（被取消返回False）
+
+        调用场景: 上传完成后等待绘制结束；有状态帧时以队列清空为准
+        """
+        end = time.monotonic() + duration
+        deadline = end + CREDIT_TIMEOUT
+        while True:
+            if cancel is not None and cancel.cancelled:
+                self.clear_queue()
+                return False
+            now = time.monotonic()
+            if now >= end and (
+                self._reader is None
+                or (self.feedback_time > end and self.queue_depth == 0)
+                or now >= deadline
+            ):
+                return True
+            time.sleep(0.01)
+
+    def clear_queue(self):
+        """清空下位机队列并停在当前位置、关闭激光"""
+        yaw, pitch = self.feedback or (self.command.yaw, self.command.pitch)
+        self.upload_trajectory([yaw], [pitch], 0, [False])
+        self.update(led=False)
+
+    def play_queued(self, yaw, pitch, t, cancel=None, led=None):
+        """
+        上传模式播放轨迹：整条轨迹交给下位机按时间戳回放
+
+        输入参数:
+            yaw, pitch, t, cancel, led: 同play_trajectory
+
+        输出: 是否完整播放（被取消返回False）
+
+        调用场景: upload=True时的play_trajectory；回放不受上位机循环抖动影响，
+        每点7字节，比逐点发送的10字节帧少头部开销
+        """
+        if not len(yaw):
+            return True
+        start = time.monotonic()
+        if not self.queue_trajectory(yaw, pitch, t, led, cancel):
+            self.clear_queue()
+            return False
+        remain = start + float(t[-1]) - time.monotonic()
+        if not self.wait_queue(max(remain, 0.0), cancel):
+            return False
+        self._record_target((int(yaw[-1]), int(pitch[-1])))
+        return True
+
+
+class LowerControllerSim:
+    """
+    下位机参考模拟器 - 在无硬件时验证串口协议
+
+    主要功能：
+    - 按0xAA...0xBB分帧解析单点帧与轨迹块帧
+    - 校验序号与校验和，并生成应答帧
+    - 维护轨迹队列，按每点dt回放并记录舵机位置
+    - 按status_period周期上报舵机位置与队列状态
+    - 可选的舵机滞后仿真（servo，如servo_lag.LaggingServo），上报滞后后的实际位置
+    可直接替代GIMBAL_CONTROL.ser使用（提供write/read/close）
+    """
+
+    def __init__(
+        self, capacity: int = 256, status_period: int = 20, servo=None
+    ) -> None:
+        self.capacity = capacity  # 队列容量（点数）
+        self.status_period = status_period  # 状态帧上报周期（模拟毫秒），0为不上报
+        self.servo = servo  # 舵机滞后仿真，None表示立即到位
+        self.since_status = 0
+        self.rx = bytearray()  # 未解析的接收数据
+        self.tx = bytearray()  # 待上位机读取的应答数据
+        self.queue = deque()
+        self.expect_seq = None  # 期望的下一个块序号
+        self.yaw: int = 5000
+        self.pitch: int = 5000
+        self.led: bool = False
+        self.speaker: bool = False
+        self.elapsed = 0  # 队首点已等待的时间（毫秒）
+        self.clock = 0  # 模拟时钟（毫秒）
+        self.trace = []  # 回放记录 (clock, yaw, pitch, led)
+        self.frames = 0
+        self.checksum_errors = 0
+        self.seq_errors = 0
+        self.overflows = 0
+
+    def write(self, data):
+        """接收上位机数据并解析其中所有完整帧"""
+        self.rx += data
+        buf = self.rx
+        i = 0
+        while True:
+            i = buf.find(0xAA, i)
+            if i < 0:
+                i = len(buf)
+                break
+            length = frame_length(buf, i)
+            if length == 0 or len(buf) - i < length:
+                break
+            if length < 0 or buf[i + length - 1] != 0xBB:
+                i += 1  # 帧头错位，向后重新同步
+                continue
+            self._handle(bytes(buf[i : i + length]))
+            i += length
+        del buf[:i]
+        return len(data)
+
+    def read(self, *args, **kwargs):
+        """返回并清空待发送的应答数据"""
+        data = bytes(self.tx)
+        self.tx.clear()
+        return data
+
+    def close(self):
+        pass
+
+    def _handle(self, frame):
+        ftype = frame[1]
+        if ftype == 0x06:
+            if frame[8] != sum(frame[1:8]) & 0xFF:
+                self.checksum_errors += 1
+                return
+            _, _, yaw, pitch, led, speaker = struct.unpack_from(FRAME_FMT, frame, 0)
+            self.yaw, self.pitch = 10000 - yaw, pitch
+            self.led, self.speaker = led != 0, speaker != 0
+            self.frames += 1
+        elif ftype == BLOCK_TYPE:
+            seq = frame[2]
+            try:
+                seq, flags, points = decode_point_block(frame)
+            except ValueError:
+                self.checksum_errors += 1
+                self.tx += encode_ack(seq, ACK_BAD_CHECKSUM, self.free)
+                return
+            if flags & BLOCK_CLEAR:
+                self.queue.clear()
+                self.elapsed = 0
+            elif self.expect_seq is not None and seq == (self.expect_seq - 1) & 0xFF:
+                # 重传的上一块，已接收过，直接应答
+                self.tx += encode_ack(seq, ACK_OK, self.free)
+                return
+            elif seq != self.expect_seq:
+                self.seq_errors += 1
+                self.tx += encode_ack(seq, ACK_BAD_SEQ, self.free)
+                return
+            if len(points) > self.free:
+                self.overflows += 1
+                self.tx += encode_ack(seq, ACK_OVERFLOW, self.free)
+                return
+            self.queue.extend(points)
+            self.expect_seq = (seq + 1) & 0xFF
+            self.frames += 1
+            self.tx += encode_ack(seq, ACK_OK, self.free)
+
+    @property
+    def free(self):
+        return self.capacity - len(self.queue)
+
+    def status(self) -> bytes:
+        """当前状态帧：最近接收的块序号、舵机位置与队列状态"""
+        seq = 0xFF if self.expect_seq is None else (self.expect_seq - 1) & 0xFF
+        yaw, pitch = self.yaw, self.pitch
+        if self.servo is not None:
+            yaw, pitch = (int(round(v)) for v in self.servo.position)
+        return encode_status(seq, yaw, pitch, len(self.queue), self.free)
+
+    def step(self, ms: int):
+        """
+        推进模拟时钟并回放到期的轨迹点
+
+        输入参数:
+            ms: 推进的时间（毫秒）
+
+        输出: 本次回放的点数
+        """
+        played = 0
+        self.elapsed += ms
+        self.clock += ms
+        while self.queue and self.elapsed >= self.queue[0][0]:
+            dt, self.yaw, self.pitch, self.led = self.queue.popleft()
+            self.elapsed -= dt
+            self.trace.append(
+                (self.clock - self.elapsed, self.yaw, self.pitch, self.led)
+            )
+            played += 1
+        if not self.queue:
+            self.elapsed = 0
+        if self.servo is not None:
+            self.servo.advance(self.yaw, self.pitch, ms)
+        if self.status_period:
+            self.since_status += ms
+            if self.since_status >= self.status_period:
+                self.since_status = 0
+                self.tx += self.status()
+        return played
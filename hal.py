@@ -0,0 +1,326 @@
+"""
+硬件抽象层 - 统一提供uart/camera/display/touchscreen/image/app接口
+
+在MaixCAM上直接使用maix模块；在普通Linux上（或设置环境变量GIMBAL_HAL=sim时）
+使用进程内模拟实现，便于离线测试和性能测试：
+- SimUART: 环回串口，由LowerControllerSim解析帧
+- PtyUART: 基于pty的串口，下位机模拟器运行在独立线程
+- SimCamera: 合成画面相机
+- NullDisplay: 空显示
+- ScriptedTouchScreen: 按脚本回放的触摸屏
+- SimGimbalLaser: 激光绘制控制（gimbal_laser_control）的最小替代
+"""
+
+import os
+import sys
+import threading
+import time
+import types
+import numpy as np
+
+try:
+    if os.environ.get("GIMBAL_HAL") == "sim":
+        raise ImportError("simulation requested")
+    from maix import uart, pinmap, camera, display, touchscreen, image, app, nn
+
+    SIMULATED = False
+except ImportError:
+    SIMULATED = True
+
+
+class SimImage:
+    """maix.image.Image的最小替代，像素保存在HxWx3的numpy数组中"""
+
+    def __init__(self, width, height, format=None, data=None):
+        if data is None:
+            data = np.zeros((height, width, 3), dtype=np.uint8)
+        self.data = data
+
+    def width(self):
+        return self.data.shape[1]
+
+    def height(self):
+        return self.data.shape[0]
+
+    def draw_rect(self, x, y, w, h, color, thickness=1):
+        if thickness < 0:
+            self.data[max(y, 0) : y + h, max(x, 0) : x + w] = color[:3]
+        else:
+            t = thickness
+            self.data[max(y, 0) : y + t, max(x, 0) : x + w] = color[:3]
+            self.data[max(y + h - t, 0) : y + h, max(x, 0) : x + w] = color[:3]
+            self.data[max(y, 0) : y + h, max(x, 0) : x + t] = color[:3]
+            self.data[max(y, 0) : y + h, max(x + w - t, 0) : x + w] = color[:3]
+        return self
+
+    def draw_string(self, x, y, text, color=None, scale=1, thickness=1):
+        return self  # 模拟环境不渲染文字
+
+    def draw_circle(self, x, y, r, color, thickness=1):
+        yy, xx = np.ogrid[: self.height(), : self.width()]
+        self.data[(xx - x) ** 2 + (yy - y) ** 2 <= r * r] = color[:3]
+        return self
+
+    def draw_image(self, x, y, img):
+        h = min(img.height(), self.height() - y)
+        w = min(img.width(), self.width() - x)
+        self.data[y : y + h, x : x + w] = img.data[:h, :w]
+        return self
+
+    def copy(self):
+        return SimImage(0, 0, data=self.data.copy())
+
+
+class SimUART:
+    """
+    进程内环回串口
+
+    写入的数据交给LowerControllerSim解析，可选按波特率模拟线路耗时
+    """
+
+    def __init__(self, port="/dev/sim", baudrate=115200, realtime=False):
+        from gimbal_control import LowerControllerSim
+
+        self.port = port
+        self.baudrate = baudrate
+        self.realtime = realtime  # 是否按波特率阻塞写入时间
+        self.sim = LowerControllerSim()
+        self.bytes_written = 0
+        self.writes = 0
+        self.on_write = None  # 可选回调on_write(data)，用于测量时间戳
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        with self.lock:
+            if self.on_write is not None:
+                self.on_write(data)
+            self.sim.write(data)
+            self.bytes_written += len(data)
+            self.writes += 1
+        if self.realtime:
+            time.sleep(len(data) * 10 / self.baudrate)  # 8N1每字节10位
+        return len(data)
+
+    def read(self, length=-1, timeout=0):
+        with self.lock:
+            data = self.sim.read()
+        if not data and timeout > 0:
+            time.sleep(timeout / 1000)  # 与真实串口一样，无数据时等待超时
+        return data
+
+    def close(self):
+        pass
+
+
+class PtyUART:
+    """
+    基于pty的串口：上位机写入从端，下位机模拟器在独立线程中读写主端
+
+    与真实串口一样经过内核缓冲和线程切换，适合测试接收线程与流控；
+    模拟器按实际时间推进，回放队列中的轨迹点并周期上报状态帧
+    """
+
+    def __init__(self, port="/dev/pty", baudrate=115200, sim=None):
+        import tty
+        from gimbal_control import LowerControllerSim
+
+        self.port = port
+        self.baudrate = baudrate
+        self.sim = sim or LowerControllerSim()
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.running = True
+        self.thread = threading.Thread(target=self._controller_loop, daemon=True)
+        self.thread.start()
+
+    def _controller_loop(self):
+        import select
+
+        last = time.monotonic()
+        while self.running:
+            try:
+                ready, _, _ = select.select([self.master], [], [], 0.002)
+                if ready:
+                    self.sim.write(os.read(self.master, 4096))
+                ms = int((time.monotonic() - last) * 1000)
+                if ms:
+                    self.sim.step(ms)
+                    last += ms / 1000
+                reply = self.sim.read()
+                if reply:
+                    os.write(self.master, reply)
+            except (OSError, ValueError):
+                return
+
+    def write(self, data):
+        return os.write(self.slave, bytes(data))
+
+    def read(self, length=-1, timeout=0):
+        import select
+
+        ready, _, _ = select.select([self.slave], [], [], max(timeout, 0) / 1000)
+        if not ready:
+            return b""
+        return os.read(self.slave, 4096 if length < 0 else length)
+
+    def close(self):
+        self.running = False
+        os.close(self.slave)
+        os.close(self.master)
+
+
+class SimCamera:
+    """合成画面相机：灰度渐变背景，按fps限制读取速度"""
+
+    def __init__(self, width=640, height=480, fps=60, **kwargs):
+        self.w = width
+        self.h = height
+        self.period = 1.0 / fps if fps else 0
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.frame[:] = np.linspace(0, 64, width, dtype=np.uint8)[None, :, None]
+        self.render = None  # 可选回调render(img)，在每帧上绘制（如激光光斑）
+        self.frames = 0
+        self.next_t = time.monotonic()
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def read(self):
+        if self.period:
+            delay = self.next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_t = max(self.next_t + self.period, time.monotonic())
+        img = SimImage(0, 0, data=self.frame.copy())
+        if self.render is not None:
+            self.render(img)
+        self.frames += 1
+        return img
+
+    def close(self):
+        pass
+
+
+class NullDisplay:
+    """空显示：只统计显示次数"""
+
+    def __init__(self, *args, **kwargs):
+        self.shown = 0
+        self.last = None
+
+    def show(self, img, *args, **kwargs):
+        self.shown += 1
+        self.last = img
+
+
+class ScriptedTouchScreen:
+    """
+    按脚本回放的触摸屏
+
+    script为[(x, y, pressed)]列表，读完后保持未按下状态
+    """
+
+    def __init__(self, script=None):
+        self.script = list(script or [])
+        self.lock = threading.Lock()
+
+    def press(self, x, y):
+        """追加一次点击（按下后抬起）"""
+        with self.lock:
+            self.script += [(x, y, 1), (x, y, 0)]
+
+    def read(self):
+        with self.lock:
+            if self.script:
+                return self.script.pop(0)
+        return 0, 0, 0
+
+
+class SimGimbalLaser:
+    """
+    激光绘制控制的最小替代
+
+    只提供屏幕、参数模块用到的标定数据与标定接口，
+    由install_sim_gimbal_laser注册，只供离线测试、性能测试使用
+    """
+
+    def __init__(self, gimbal=None):
+        self.gimbal = gimbal
+        self.src_points = [[0, 0], [1, 0], [1, 1], [0, 1]]  # 归一化屏幕四角
+        self.dst_points = [[0, 0], [0, 0], [0, 0], [0, 0]]  # 对应的云台角度
+        self.H = np.zeros((3, 3))
+        self.calibration_step = "First"
+        self.calibration_mode = False
+
+    def calibrate_gimbal(self):
+        """由四角标定点计算透视变换矩阵"""
+        from trajectory import perspective_transform
+
+        self.H = perspective_transform(self.src_points, self.dst_points)
+        self.calibration_mode = False
+
+
+def install_sim_gimbal_laser():
+    """
+    gimbal_laser_control不可导入时，以SimGimbalLaser注册为该模块
+
+    调用场景: 性能测试与测试在导入屏幕、参数模块之前调用；
+    生产代码直接导入真实模块，缺失时照常报错
+    """
+    try:
+        import gimbal_laser_control  # noqa: F401
+    except ImportError:
+        module = types.ModuleType("gimbal_laser_control")
+        module.GimbalLaserControl = SimGimbalLaser
+        sys.modules.setdefault("gimbal_laser_control", module)
+
+
+class _SimColor:
+    @staticmethod
+    def from_rgb(r, g, b):
+        return (r, g, b)
+
+
+class _SimApp:
+    exit_flag = False
+
+    @classmethod
+    def need_exit(cls):
+        return cls.exit_flag
+
+    @classmethod
+    def set_exit_flag(cls, exit=True):
+        cls.exit_flag = exit
+
+
+def _sim_uart(port="/dev/sim", baudrate=115200, **kwargs):
+    """模拟串口：端口名以/dev/pty开头时使用PtyUART，否则使用进程内SimUART"""
+    if port.startswith("/dev/pty"):
+        return PtyUART(port, baudrate)
+    return SimUART(port, baudrate, **kwargs)
+
+
+if SIMULATED:
+    uart = types.SimpleNamespace(UART=_sim_uart)
+    pinmap = types.SimpleNamespace(set_pin_function=lambda *args: None)
+    camera = types.SimpleNamespace(Camera=SimCamera)
+    display = types.SimpleNamespace(Display=NullDisplay)
+    touchscreen = types.SimpleNamespace(TouchScreen=ScriptedTouchScreen)
+    image = types.SimpleNamespace(
+        Image=SimImage,
+        Color=_SimColor,
+        image2cv=lambda img, ensure_bgr=True, copy=True: (
+            img.data.copy() if copy else img.data
+        ),
+        COLOR_WHITE=(255, 255, 255),
+        COLOR_BLACK=(0, 0, 0),
+        COLOR_RED=(255, 0, 0),
+        COLOR_GREEN=(0, 255, 0),
+        COLOR_BLUE=(0, 0, 255),
+    )
+    app = _SimApp
+    nn = None
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+
+
+class CancelToken:
+    """协作式取消标志，由任务在点与点之间检查"""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def sleep(self, seconds) -> bool:
+        """可被取消打断的等待，返回是否已取消"""
+        if seconds > 0:
+            return self._event.wait(seconds)
+        return self._event.is_set()
+
+
+class JobExecutor:
+    """
+    后台任务执行器 - 在单一工作线程中执行绘制任务
+
+    主要功能：
+    - 触摸线程只提交任务，立即返回继续响应输入
+    - 任务队列，支持抢占（取消当前任务并清空队列）
+    - 任务被取消或异常退出后调用on_cancel（如强制关闭激光器）
+    """
+
+    def __init__(self, on_cancel=None) -> None:
+        """
+        输入参数:
+            on_cancel: 任务被取消或出错后在工作线程中调用的回调
+        """
+        self.on_cancel = on_cancel
+        self.jobs = deque()
+        self.cond = threading.Condition()
+        self.token = None  # 当前任务的取消标志
+        self.running = True
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args, preempt: bool = True):
+        """
+        提交任务，任务以func(*args, cancel=token)形式调用
+
+        输入参数:
+            func: 任务函数
+            args: 任务参数
+            preempt: 是否抢占当前任务及排队任务
+
+        输出: 该任务的CancelToken
+        """
+        token = CancelToken()
+        with self.cond:
+            if preempt:
+                self._cancel_locked()
+            self.jobs.append((func, args, token))
+            self.cond.notify()
+        return token
+
+    def cancel(self):
+        """取消当前任务并清空队列"""
+        with self.cond:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        for _, _, token in self.jobs:
+            token.cancel()
+        self.jobs.clear()
+        if self.token is not None:
+            self.token.cancel()
+
+    @property
+    def busy(self) -> bool:
+        return self.token is not None or bool(self.jobs)
+
+    def stop(self):
+        """取消所有任务并结束工作线程"""
+        with self.cond:
+            self._cancel_locked()
+            self.running = False
+            self.cond.notify()
+        self.thread.join()
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while self.running and not self.jobs:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                func, args, token = self.jobs.popleft()
+                self.token = token
+            failed = False
+            start = time.monotonic()
+            try:
+                func(*args, cancel=token)
+            except Exception as e:
+                print(f"[JOB] 任务执行失败: {e}")
+                failed = True
+            with self.cond:
+                self.token = None
+            if (failed or token.cancelled) and self.on_cancel is not None:
+                print(f"[JOB] 任务已中止，用时{time.monotonic() - start:.2f}s")
+                self.on_cancel()
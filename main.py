@@ -1,53 +1,144 @@
-from maix import camera, display, image, nn, app
-from state import STATE
-from screen_state import SCREEN
-import threading, time
-from gimbal_control import GIMBAL_CONTROL
-from gimbal_laser_control import GimbalLaserControl
-from parameter_control import ParameterController
+from startup import StartupTimer, run_parallel
+
+# 启动计时从这里开始，各阶段耗时在第一帧显示后打印
+timer = StartupTimer()
+
+with timer.phase("import"):
+    from hal import camera, display, image, nn, app
+    from state import STATE
+    import threading, time
+    from gimbal_control import GIMBAL_CONTROL
+    from frame_pipeline import FramePipeline
+    from telemetry import TELEMETRY
+    import os
 
 CAMSIZE = [640, 480]
+TELEMETRY_FILE = "/root/user/telemetry.csv"
+
+# 设置环境变量GIMBAL_TELEMETRY=1开启时间戳记录，退出时导出
+if os.environ.get("GIMBAL_TELEMETRY") == "1":
+    TELEMETRY.enable()
 
-# 初始化
 state = STATE()
-cam = camera.Camera(
-    CAMSIZE[0],
-    CAMSIZE[1],
+screen = None
+gimbal = None
+param_controller = None
+ready = threading.Event()  # 云台、参数与触摸屏均已就绪
+bringup_error = []
+
+
+def bring_up():
+    """
+    后台初始化云台、参数与触摸屏，与相机、显示屏的初始化并行
+
+    屏幕模块（numpy、轨迹等）也在这里导入；启动提示音在后台播放，不等待
+    """
+    global screen, gimbal, param_controller
+    try:
+        with timer.phase("gimbal"):
+            # 初始化云台控制
+            gimbal = GIMBAL_CONTROL(
+                state,
+                port="/dev/ttyS0",
+                baudrate=115200,
+                maxlen=8,
+                reader=True,
+                async_chime=True,
+                # GIMBAL_UPLOAD=1时轨迹上传到下位机队列回放，不逐点发送
+                upload=os.environ.get("GIMBAL_UPLOAD") == "1",
+            )
+        with timer.phase("screen"):
+            from gimbal_laser_control import GimbalLaserControl
+            from parameter_control import ParameterController
+            from screen_state import SCREEN
+
+            # 初始化激光绘制
+            gimbal_laser = GimbalLaserControl(gimbal)
+            # 初始化参数控制器，环境变量GIMBAL_PROFILE可指定标定配置名
+            param_controller = ParameterController(
+                gimbal_laser=gimbal_laser, profile=os.environ.get("GIMBAL_PROFILE")
+            )
+            screen = SCREEN(state, gimbal_laser, gimbal, param_controller)
+            # 自动标定取帧；pipeline在主线程创建，调用时一定已存在
+            screen.frame_source = lambda after, timeout=1.0, stamped=False: (
+                pipeline.wait_frame(after, timeout, stamped)
+            )
+        with timer.phase("params"):
+            # 加载参数
+            param_controller.load_parameters()
+            if param_controller.camera_model is not None:
+                screen.tracker.set_camera_model(param_controller.camera_model)
+        # 启动屏幕监听线程
+        thread_screen = threading.Thread(target=screen.listen)
+        thread_screen.daemon = True
+        thread_screen.start()
+        timer.mark("ready")
+        ready.set()
+    except Exception as e:
+        print(f"[STARTUP] 初始化失败: {e}")
+        bringup_error.append(e)
+        state.running = False
+
+
+thread_bringup = threading.Thread(target=bring_up, name="bringup", daemon=True)
+thread_bringup.start()
+devices = run_parallel(
+    timer,
+    {
+        "camera": lambda: camera.Camera(CAMSIZE[0], CAMSIZE[1]),
+        "display": display.Display,
+    },
 )
-disp = display.Display()
-# 初始化云台控制
-gimbal = GIMBAL_CONTROL(state, port="/dev/ttyS0", baudrate=115200, maxlen=8)
-# 初始化激光绘制
-gimbal_laser = GimbalLaserControl(gimbal)
-screen = SCREEN(state, gimbal_laser, gimbal)
-# 启动屏幕监听线程
-thread_screen = threading.Thread(target=screen.listen)
-thread_screen.daemon = True
-thread_screen.start()
-
-# 初始化参数控制器
-param_controller = ParameterController(gimbal_laser=gimbal_laser)
-# 加载参数
-param_controller.load_parameters()
-
-# 主循环
-while state.running and not app.need_exit():
-    img = cam.read()
+cam, disp = devices["camera"], devices["display"]
+
+
+def render(img, stamp=0.0):
+    """
+    渲染一帧：init模式叠加在相机画面上，其余模式使用缓存的整帧
+
+    stamp为相机帧的采集时刻，光斑跟踪按该时刻的名义目标计算误差
+    """
+    if not ready.is_set():
+        # 云台与触摸屏尚未就绪：先直接显示相机画面
+        return img
     if state.workmode == "init":
+        # 绘制中用相机画面跟踪激光光斑，修正开环误差（需在叠加按钮之前）
+        if gimbal.ledstate and screen.executor.busy:
+            target, speed = gimbal.target_at(stamp)
+            screen.tracker.update(img, target, speed)
         img_show = screen.draw_button(img)
-    elif state.workmode == "cali":
-        img_show = screen.draw_button()
-    elif state.workmode == "setp":
+    else:
         img_show = screen.draw_button()
-    # 将yaw和pitch显示在屏幕上
-    img_show.draw_string(
-        340,
-        10,
-        f"Yaw: {gimbal.yaw}, Pitch: {gimbal.pitch}",
-        color=image.Color.from_rgb(0, 0, 255),
-        scale=2,
-        thickness=1,
-    )
-    disp.show(img_show)
-# 退出时保存参数
-param_controller.save_parameters()
+    # 将yaw和pitch显示在屏幕上（读取一次指令快照，两个值来自同一次发布）
+    command = gimbal.command
+    return screen.draw_status(img_show, command.yaw, command.pitch)
+
+
+# 主循环：采集、渲染、显示流水线，只有init模式和自动标定需要相机画面
+pipeline = FramePipeline(
+    cam,
+    disp,
+    render,
+    needs_camera=lambda: not ready.is_set()
+    or state.workmode == "init"
+    or screen.need_camera,
+)
+
+
+def report_startup():
+    """第一帧显示且初始化完成后打印启动报告"""
+    if pipeline.first_frame.wait(10):
+        timer.mark("first_frame")
+    ready.wait(10)
+    timer.report()
+
+
+threading.Thread(target=report_startup, daemon=True).start()
+pipeline.run(lambda: state.running and not app.need_exit())
+thread_bringup.join()
+if bringup_error:
+    raise bringup_error[0]
+# 退出时保存参数（只在标定结果有改动时写入新版本）
+param_controller.save_if_changed()
+if TELEMETRY.enabled:
+    TELEMETRY.dump(TELEMETRY_FILE)
@@ -0,0 +1,175 @@
+import math
+import numpy as np
+from gimbal_control import YAWLIM, PITCHLIM
+
+# 舵机运动能力（按YAWLIM/PITCHLIM的全行程标定）
+SWEEP_TIME = 0.6  # 全行程最短时间（秒）
+ACCEL_TIME = 0.1  # 从静止加速到最大速度的时间（秒）
+JERK_TIME = 0.05  # 加速度从0升到最大值的时间（秒）
+PEAK_ITERATIONS = 30  # 二分求线段最高速度的迭代次数
+
+
+def axis_limits(lim, sweep_time=SWEEP_TIME, accel_time=ACCEL_TIME, jerk_time=JERK_TIME):
+    """
+    由舵机行程计算单轴速度、加速度、加加速度上限
+
+    输入参数:
+        lim: 角度范围[min, max]
+        sweep_time: 全行程最短时间
+        accel_time: 加速到最大速度的时间
+        jerk_time: 加速度建立时间
+
+    输出: (vmax, amax, jmax)，单位为舵机单位/秒、/秒²、/秒³
+    """
+    vmax = (lim[1] - lim[0]) / sweep_time
+    amax = vmax / accel_time
+    jmax = amax / jerk_time
+    return vmax, amax, jmax
+
+
+def ramp_time(dv, a, j):
+    """
+    S形速度曲线中速度改变dv（>=0）所需的时间
+
+    加加速度为±j、加速度不超过a；dv不足a²/j时加速度达不到a（无匀加速段）
+    """
+    full = dv >= a * a / j
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(full, dv / a + a / j, 2 * np.sqrt(dv / j))
+
+
+def ramp_distance(v0, v1, a, j):
+    """S形曲线从v0变速到v1经过的距离；速度曲线中心对称，平均速度为(v0+v1)/2"""
+    return (v0 + v1) / 2 * ramp_time(np.abs(v1 - v0), a, j)
+
+
+def ramp_gain(v0, length, a, j):
+    """
+    从速度v0出发、在length距离内按S形曲线能增加的最大速度（标量）
+
+    无匀加速段时解 j·s³ + 2·v0·s = length（dv = j·s²），
+    有匀加速段时解 dv²/(2a) + dv·(v0/a + a/(2j)) + v0·a/j = length
+    """
+    p = 2 * v0 / j
+    q = length / j
+    A = math.cbrt(q / 2 + math.sqrt(q * q / 4 + p**3 / 27))
+    s = A - p / (3 * A)  # 卡尔达诺公式，避免两项相减的抵消误差
+    dv = j * s * s
+    if dv < a * a / j:
+        return dv
+    b = 2 * v0 + a * a / j
+    c = 2 * a * (v0 * a / j - length)
+    return (-b + math.sqrt(b * b - 4 * c)) / 2
+
+
+class MotionPlanner:
+    """
+    时间最优轨迹规划器 - 在各轴速度/加速度/加加速度约束下为yaw/pitch路径分配时间戳
+
+    主要功能：
+    - 按线段方向把单轴约束换算为路径速度、加速度上限
+    - 按拐角方向变化限制拐角通过速度，避免过冲
+    - 前向/后向两遍扫描得到各点速度，再按S形（加加速度受限）速度曲线计算时间
+    """
+
+    def __init__(self, yaw_limits=None, pitch_limits=None) -> None:
+        """
+        输入参数:
+            yaw_limits: 偏航轴(vmax, amax, jmax)，默认按YAWLIM标定
+            pitch_limits: 俯仰轴(vmax, amax, jmax)，默认按PITCHLIM标定
+        """
+        yaw_limits = yaw_limits or axis_limits(YAWLIM)
+        pitch_limits = pitch_limits or axis_limits(PITCHLIM)
+        self.vmax = np.array([yaw_limits[0], pitch_limits[0]], dtype=np.float64)
+        self.amax = np.array([yaw_limits[1], pitch_limits[1]], dtype=np.float64)
+        self.jmax = np.array([yaw_limits[2], pitch_limits[2]], dtype=np.float64)
+
+    def plan(self, yaw, pitch):
+        """
+        为路径分配时间戳
+
+        输入参数:
+            yaw: 偏航角序列
+            pitch: 俯仰角序列
+
+        输出: float64数组，各点相对起点的时间（秒），首点为0
+
+        调用场景: 绘制图形前规划，播放时按时间戳发送
+        """
+        p = np.column_stack((yaw, pitch)).astype(np.float64)
+        n = len(p)
+        if n < 2:
+            return np.zeros(n)
+        d = np.diff(p, axis=0)
+        length = np.hypot(d[:, 0], d[:, 1])
+        moving = length > 0
+        u = np.zeros_like(d)
+        u[moving] = d[moving] / length[moving, None]
+        au = np.abs(u)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 线段上路径速度上限：各轴速度分量不超限
+            vseg = np.min(np.where(au > 0, self.vmax / au, np.inf), axis=1)
+            # 路径加速度、加加速度上限
+            aseg = np.min(np.where(au > 0, self.amax / au, np.inf), axis=1)
+            jseg = np.min(np.where(au > 0, self.jmax / au, np.inf), axis=1)
+            # 拐角速度上限：方向突变带来的单轴速度跳变须在一个加速度建立时间内完成
+            du = np.abs(np.diff(u, axis=0))
+            vcorner = np.min(
+                np.where(du > 0, self.amax * (self.amax / self.jmax) / du, np.inf),
+                axis=1,
+            )
+        aseg[~moving] = 1.0
+        jseg[~moving] = 1.0
+
+        vlim = np.empty(n)
+        vlim[0] = vlim[-1] = 0.0  # 起止点静止
+        vlim[1:-1] = np.minimum(np.minimum(vseg[:-1], vseg[1:]), vcorner)
+
+        # 前向/后向扫描，满足加速度与加加速度约束
+        v = vlim.tolist()
+        lengths, alist, jlist = length.tolist(), aseg.tolist(), jseg.tolist()
+        for i in range(n - 1):
+            if moving[i]:
+                gain = ramp_gain(v[i], lengths[i], alist[i], jlist[i])
+                v[i + 1] = min(v[i + 1], v[i] + gain)
+            else:
+                v[i + 1] = min(v[i + 1], v[i])
+        for i in range(n - 2, -1, -1):
+            if moving[i]:
+                gain = ramp_gain(v[i + 1], lengths[i], alist[i], jlist[i])
+                v[i] = min(v[i], v[i + 1] + gain)
+            else:
+                v[i] = min(v[i], v[i + 1])
+        v = np.array(v)
+
+        # S形速度曲线：加速 -> 匀速 -> 减速，二分求线段内能达到的最高速度
+        v0, v1 = v[:-1], v[1:]
+        lo = np.maximum(v0, v1)
+        hi = np.maximum(vseg, lo)
+        for _ in range(PEAK_ITERATIONS):
+            mid = (lo + hi) / 2
+            fits = ramp_distance(v0, mid, aseg, jseg) + ramp_distance(
+                mid, v1, aseg, jseg
+            )
+            fits = fits <= length
+            lo = np.where(fits, mid, lo)
+            hi = np.where(fits, hi, mid)
+        vpeak = lo
+        cruise = (
+            length
+            - ramp_distance(v0, vpeak, aseg, jseg)
+            - ramp_distance(vpeak, v1, aseg, jseg)
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dt = (
+                ramp_time(vpeak - v0, aseg, jseg)
+                + ramp_time(vpeak - v1, aseg, jseg)
+                + np.maximum(cruise, 0) / vpeak
+            )
+        dt[~moving] = 0.0
+        return np.concatenate(([0.0], np.cumsum(dt)))
+
+    def move_time(self, yaw0, pitch0, yaw1, pitch1):
+        """计算从静止点到另一静止点的最短运动时间（秒）"""
+        return float(self.plan([yaw0, yaw1], [pitch0, pitch1])[-1])
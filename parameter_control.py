@@ -1,45 +1,197 @@
 import os
 from gimbal_laser_control import GimbalLaserControl
-import cv2
 import numpy as np
+import trajectory
+from calibration_grid import CalibrationGrid
+from servo_lag import LagModel
+from profile_store import ProfileStore, PROFILE_DIR
 
 
 class ParameterController:
-    """参数控制器类，管理摄像头参数调节"""
+    """
+    参数控制器类，管理标定参数的加载与保存
+
+    标定结果保存在ProfileStore的命名配置中（断电安全，带校验和历史版本），
+    透视变换矩阵、相机模型与多点标定查找表直接以二进制保存，启动时内存映射加载；
+    旧版文本参数文件只在没有配置时读取，并同步写出以兼容旧程序
+    """
 
     def __init__(
         self,
         param_file_path="/root/user/2025projection.txt",
         gimbal_laser: GimbalLaserControl = None,
+        profile_dir=PROFILE_DIR,
+        profile=None,
     ):
         self.param_file_path = param_file_path
         self.gimbal_laser = gimbal_laser
+        # 旧版多点标定模型文件，仅在迁移时读取
+        self.grid_file_path = os.path.splitext(param_file_path)[0] + "_grid.npz"
+        self.grid = None
+        self.camera_model = None  # 自动标定得到的相机模型G（舵机角度 -> 像素）
+        self.lag = None  # 辨识得到的舵机滞后模型(yaw, pitch)，用于前馈补偿
+        self.store = ProfileStore(profile_dir)
+        self.profile = profile or self.store.get_active()
+        self.generation = 0  # 当前配置已保存的版本号
+        self.stored = None  # 最近加载或保存的配置段副本，用于判断是否有改动
 
-    def load_parameters(self):
-        """从文件加载参数"""
+    def active_grid(self):
+        """返回与当前四角标定点一致的多点标定模型，没有或已失效时返回None"""
+        if self.grid is not None and self.grid.matches(self.gimbal_laser.dst_points):
+            return self.grid
+        return None
+
+    def load_grid(self):
+        """从文件加载多点标定模型"""
+        try:
+            self.grid = CalibrationGrid.load(self.grid_file_path)
+        except Exception as e:
+            print(f"[PARAM] 读取多点标定模型失败: {e}")
+            self.grid = None
+        if self.grid is not None:
+            print(f"[PARAM] 多点标定模型已加载: {self.grid_file_path}")
+        return self.grid is not None
+
+    def compute_homography(self):
+        """
+        由四角标定点重新计算透视变换矩阵
+
+        标定点退化（未标定、重合）时为全零矩阵，屏幕按未标定处理
+        """
         try:
-            if os.path.exists(self.param_file_path):
-                with open(self.param_file_path, "r") as file:
-                    content = file.read().strip()
-                    if content:
-                        parts = content.split(",")
-                        for i, part in enumerate(parts):
-                            self.gimbal_laser.dst_points[i // 2][i % 2] = part
-                        print(
-                            f"[PARAM] 标定点坐标参数已加载: {self.gimbal_laser.dst_points}"
-                        )
-                        self.gimbal_laser.H = cv2.getPerspectiveTransform(
-                            np.array(self.gimbal_laser.src_points, dtype=np.float32),
-                            np.array(self.gimbal_laser.dst_points, dtype=np.float32),
-                        )
-                        print("[PARAM] 透视变换矩阵已计算")
-                        return True
-
-                    else:
-                        print("[PARAM] 文件为空，使用默认值")
-            else:
-                print("[PARAM] 参数文件不存在，使用默认值")
+            self.gimbal_laser.H = trajectory.perspective_transform(
+                self.gimbal_laser.src_points, self.gimbal_laser.dst_points
+            )
+        except np.linalg.LinAlgError:
+            print("[PARAM] 标定点退化，透视变换矩阵无效")
+            self.gimbal_laser.H = np.zeros((3, 3))
+
+    def profile_arrays(self):
+        """当前标定结果 -> 配置段"""
+        arrays = {
+            "dst": np.array(self.gimbal_laser.dst_points, dtype=np.int32),
+            "H": np.asarray(self.gimbal_laser.H, dtype=np.float64),
+        }
+        if self.camera_model is not None:
+            arrays["G"] = np.asarray(self.camera_model, dtype=np.float64)
+        if self.lag is not None:
+            arrays["lag"] = np.array([m.to_row() for m in self.lag], dtype=np.float64)
+        grid = self.grid
+        if grid is not None:
+            arrays["grid_lut"] = grid.lut.reshape(-1, grid.size)
+            arrays["grid_box"] = np.concatenate((grid.lo, grid.hi))[None]
+            arrays["grid_dst"] = np.array(grid.dst_points, dtype=np.int32)
+            if grid.samples is not None:
+                arrays["grid_smp"] = grid.samples
+        return arrays
+
+    def apply_profile(self, arrays):
+        """
+        配置段 -> 当前标定结果（查找表保持内存映射，不复制）
+
+        透视变换矩阵总是由标定点重新计算：保存的H只是缓存，
+        首次启动未标定时保存的是全零矩阵
+        """
+        self.gimbal_laser.dst_points = arrays["dst"].tolist()
+        self.compute_homography()
+        self.camera_model = np.array(arrays["G"]) if "G" in arrays else None
+        self.lag = None
+        if "lag" in arrays:
+            self.lag = tuple(LagModel.from_row(row) for row in np.array(arrays["lag"]))
+        self.grid = None
+        if "grid_lut" in arrays:
+            lut = arrays["grid_lut"]
+            size = lut.shape[1]
+            box = arrays["grid_box"][0]
+            self.grid = CalibrationGrid(
+                lut.reshape(2, size, size),
+                arrays["grid_dst"],
+                box[:2],
+                box[2:],
+                arrays.get("grid_smp"),
+            )
 
+    def load_profile(self):
+        """从配置存储加载当前配置，成功返回True"""
+        try:
+            result = self.store.load(self.profile)
+        except Exception as e:
+            print(f"[PARAM] 读取配置{self.profile}失败: {e}")
+            return False
+        if result is None:
+            return False
+        self.generation, arrays = result
+        self.apply_profile(arrays)
+        self.remember(self.profile_arrays())
+        print(
+            f"[PARAM] 配置{self.profile}第{self.generation}版已加载: "
+            f"{self.gimbal_laser.dst_points}"
+        )
+        return True
+
+    def save_profile(self):
+        """保存当前标定结果为当前配置的新版本"""
+        arrays = self.profile_arrays()
+        self.generation = self.store.save(self.profile, arrays)
+        self.remember(arrays)
+        print(f"[PARAM] 配置{self.profile}第{self.generation}版已保存")
+
+    def remember(self, arrays):
+        """记录已落盘的配置段（复制，不受之后原地修改影响）"""
+        self.stored = {name: np.array(arr) for name, arr in arrays.items()}
+
+    def changed(self):
+        """当前标定结果是否与最近加载或保存的版本不同"""
+        if self.stored is None:
+            return True
+        arrays = self.profile_arrays()
+        if arrays.keys() != self.stored.keys():
+            return True
+        return any(not np.array_equal(arrays[k], self.stored[k]) for k in arrays)
+
+    def use_profile(self, name):
+        """
+        切换到指定配置并加载
+
+        输入参数:
+            name: 配置名
+
+        输出: 是否加载成功（配置不存在时保持当前标定，下次保存时创建）
+
+        调用场景: 更换屏幕或场地
+        """
+        self.store.check_name(name)
+        self.profile = name
+        self.store.set_active(name)
+        return self.load_profile()
+
+    def load_legacy(self):
+        """从旧版文本参数文件加载，成功后迁移到配置存储"""
+        if not os.path.exists(self.param_file_path):
+            print("[PARAM] 参数文件不存在，使用默认值")
+            return False
+        with open(self.param_file_path, "r") as file:
+            content = file.read().strip()
+        if not content:
+            print("[PARAM] 文件为空，使用默认值")
+            return False
+        parts = content.split(",")
+        for i, part in enumerate(parts):
+            self.gimbal_laser.dst_points[i // 2][i % 2] = int(part)
+        print(f"[PARAM] 标定点坐标参数已加载: {self.gimbal_laser.dst_points}")
+        self.compute_homography()
+        print("[PARAM] 透视变换矩阵已计算")
+        self.load_grid()
+        self.save_profile()
+        return True
+
+    def load_parameters(self):
+        """从配置存储加载参数，没有配置时读取旧版参数文件"""
+        if self.load_profile():
+            return True
+        try:
+            if self.load_legacy():
+                return True
         except Exception as e:
             print(f"[PARAM] 读取参数文件失败: {e}，使用默认值")
 
@@ -52,14 +204,36 @@ class ParameterController:
         ]
         return False
 
+    def save_if_changed(self):
+        """
+        标定结果有改动时才保存
+
+        调用场景: 程序退出时；未重新标定的重启不产生新版本，
+        不会把较早的标定挤出保留的历史版本
+        """
+        if not self.changed():
+            print(f"[PARAM] 配置{self.profile}无改动，不保存")
+            return True
+        return self.save_parameters()
+
     def save_parameters(self):
-        """保存参数到文件"""
+        """
+        保存参数：写入配置存储的新版本，并同步写出旧版文本参数文件
+
+        调用场景: 每次标定成功后立即调用
+        """
+        try:
+            self.save_profile()
+        except Exception as e:
+            print(f"[PARAM] 保存配置失败: {e}")
+            return False
         try:
             # 确保目录存在
             os.makedirs(os.path.dirname(self.param_file_path), exist_ok=True)
 
-            # 写入分辨率参数
-            with open(self.param_file_path, "w") as file:
+            # 写入标定点坐标，先写临时文件再重命名
+            tmp = self.param_file_path + ".tmp"
+            with open(tmp, "w") as file:
                 content = ",".join(
                     [
                         str(coord)
@@ -68,7 +242,10 @@ class ParameterController:
                     ]
                 )
                 file.write(content)
-                print(f"[PARAM] 标定点坐标参数已保存: {self.gimbal_laser.dst_points}")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp, self.param_file_path)
+            print(f"[PARAM] 标定点坐标参数已保存: {self.gimbal_laser.dst_points}")
             return True
 
         except Exception as e:
@@ -0,0 +1,237 @@
+import time
+import numpy as np
+import trajectory
+import point_file
+import svg_path
+import simplify
+from motion_planner import MotionPlanner
+
+BLANK_HOLD = 0.02  # 图形最后一点发出后保持激光开启的时间（秒），等舵机走完
+BLANK_SETTLE = 0.05  # 空行程到位后的额外等待（秒），再开启激光
+
+
+def retime_blanks(t, yaw, pitch, led, planner):
+    """
+    调整空行程（激光关闭的点）的时间戳
+
+    输入参数:
+        t: 规划器给出的时间戳（已加入停留）
+        yaw, pitch: 角度序列
+        led: 逐点激光器状态
+        planner: MotionPlanner，估算空行程的到位时间
+
+    输出: 调整后的时间戳
+
+    规划器按几何长度分配时间，原地关闭激光的点与到位后开启激光的点间隔为0，
+    空行程中激光仍亮着；这里与compile中项与项之间的空行程一致：
+    上一笔画末点保持BLANK_HOLD后关闭激光并发出目标，到位后再等BLANK_SETTLE开启
+    """
+    led = np.asarray(led, dtype=bool)
+    dt = np.diff(np.asarray(t, dtype=np.float64))
+    n = len(led)
+    for i in np.flatnonzero(led[:-1] & ~led[1:]) + 1:
+        end = i
+        while end < n and not led[end]:
+            end += 1
+        dt[i - 1] = BLANK_HOLD
+        dt[i : end - 1] = 0.0  # 关闭激光的点同时发出
+        if end < n:
+            j = end - 1  # 空行程的目标点
+            move = planner.move_time(yaw[i - 1], pitch[i - 1], yaw[j], pitch[j])
+            dt[j] = move + BLANK_SETTLE
+    return np.concatenate(([0.0], np.cumsum(dt)))
+
+
+def clip_cycle(yaw, pitch, led, t, cycle):
+    """
+    去掉时间戳不早于cycle的点，使循环播放的每一轮都在cycle内发完
+
+    输入参数:
+        yaw, pitch, led, t: 前馈补偿后的轨迹（led可为None）
+        cycle: 一轮的时长（compile的输出，closed=True）
+
+    输出: (yaw, pitch, led, t)
+
+    前馈补偿在末尾追加舵机到位所需的保持点，时间戳会越过cycle，
+    与下一轮开头重叠。closed轨迹的最后一段是回到起点的空行程，
+    越界的点都保持在起点，由下一轮开头同值的保持点接替，截掉后循环无缝
+    """
+    n = int(np.searchsorted(t, cycle, "left"))
+    if n == len(t):
+        return yaw, pitch, led, t
+    n = max(n, 1)
+    return yaw[:n], pitch[:n], None if led is None else led[:n], t[:n]
+
+
+def item_name(item):
+    """播放列表项的显示名称"""
+    return item[1] if item[0] == "shape" else str(item[1]).rsplit("/", 1)[-1]
+
+
+class PlaylistScheduler:
+    """
+    图形播放列表 - 将多个图形/文件编译为一条连续轨迹
+
+    主要功能：
+    - 列表项为("shape", 名称, 参数)、("svg", 路径)或("file", 点文件路径)
+    - 每项独立简化并规划时间，项与项之间插入激光关闭的空行程，
+      按运动规划器估算的到位时间衔接，无需每个图形重新初始化（提示音、固定等待）
+    - 循环播放时预先生成的帧重复使用，每一轮按绝对时间接续
+    """
+
+    def __init__(self, planner=None, cache=None) -> None:
+        """
+        输入参数:
+            planner: MotionPlanner
+            cache: 可选的TrajectoryCache，用于图形项
+        """
+        self.planner = planner or MotionPlanner()
+        self.cache = cache
+
+    def item_angles(self, item, H, grid=None):
+        """
+        单个列表项 -> (yaw, pitch, led)
+
+        异常: ValueError，未知的列表项类型
+        """
+        kind = item[0]
+        if kind == "shape":
+            name, params = item[1], item[2]
+            if self.cache is not None:
+                yaw, pitch = self.cache.shape(name, params, H, grid)
+            else:
+                points = trajectory.SHAPES[name](*params)
+                yaw, pitch = trajectory.map_points(H, points, grid)
+            return yaw, pitch, np.ones(len(yaw), dtype=bool)
+        if kind == "svg":
+            return svg_path.compile_paths(svg_path.load_svg(item[1]), H, grid)
+        if kind == "file":
+            chunks = list(point_file.iter_angle_chunks(item[1], H, grid=grid))
+            if not chunks:
+                empty = np.zeros(0, dtype=np.int16)
+                return empty, empty, np.zeros(0, dtype=bool)
+            yaw = np.concatenate([c[0] for c in chunks])
+            pitch = np.concatenate([c[1] for c in chunks])
+            return yaw, pitch, np.ones(len(yaw), dtype=bool)
+        raise ValueError(f"unknown playlist item: {kind}")
+
+    def _plan_item(self, yaw, pitch, led):
+        """简化（保留激光开关切换处）并规划时间"""
+        change = np.diff(np.asarray(led, dtype=np.int8)) != 0
+        keep = np.zeros(len(led), dtype=bool)
+        keep[1:] |= change
+        keep[:-1] |= change
+        index, dwells = simplify.simplify(yaw, pitch, keep=keep)
+        yaw, pitch, led = yaw[index], pitch[index], led[index]
+        t = simplify.apply_dwells(self.planner.plan(yaw, pitch), dwells)
+        return yaw, pitch, led, retime_blanks(t, yaw, pitch, led, self.planner)
+
+    def compile(self, items, H, grid=None, closed=False):
+        """
+        编译播放列表
+
+        输入参数:
+            items: 列表项序列
+            H: 3x3透视变换矩阵
+            grid: 可选的多点标定模型
+            closed: 是否在末尾加入回到第一项起点的空行程（循环/重复播放时需要）
+
+        输出: (yaw, pitch, led, t, cycle)；cycle为一轮的时长，
+            下一轮第一点应在cycle时刻发出。空列表返回None
+
+        调用场景: 连续展示多个图形
+        """
+        parts = []
+        offset = 0.0
+        blank = 0.0
+        last = None
+        for item in items:
+            yaw, pitch, led = self.item_angles(item, H, grid)
+            if not len(yaw):
+                print(f"[PLAYLIST] {item_name(item)} 没有点，跳过")
+                continue
+            yaw, pitch, led, t = self._plan_item(yaw, pitch, led)
+            if last is not None:
+                # 空行程：保持片刻后关闭激光移动到下一项起点，到位后再开启
+                move = self.planner.move_time(last[0], last[1], yaw[0], pitch[0])
+                off = offset + BLANK_HOLD
+                offset = off + move + BLANK_SETTLE
+                blank += offset - off
+                parts.append(([yaw[0]], [pitch[0]], [False], [off]))
+            parts.append((yaw, pitch, led, t + offset))
+            offset += t[-1]
+            last = (yaw[-1], pitch[-1])
+        if not parts:
+            return None
+        cycle = offset
+        if closed:
+            first_yaw, first_pitch = parts[0][0][0], parts[0][1][0]
+            move = self.planner.move_time(last[0], last[1], first_yaw, first_pitch)
+            off = offset + BLANK_HOLD
+            cycle = off + move + BLANK_SETTLE
+            blank += cycle - off
+            parts.append(([first_yaw], [first_pitch], [False], [off]))
+        yaw = np.concatenate([np.asarray(p[0], dtype=np.int16) for p in parts])
+        pitch = np.concatenate([np.asarray(p[1], dtype=np.int16) for p in parts])
+        led = np.concatenate([np.asarray(p[2], dtype=bool) for p in parts])
+        t = np.concatenate([np.asarray(p[3], dtype=np.float64) for p in parts])
+        print(
+            f"[PLAYLIST] {len(items)}项 {len(yaw)}点，"
+            f"每轮{cycle:.2f}s（空行程{blank:.2f}s）"
+        )
+        return yaw, pitch, led, t, cycle
+
+    def play(
+        self, gimbal, compiled, cancel=None, repeat=1, loop=False, correction=None
+    ):
+        """
+        播放编译好的播放列表
+
+        输入参数:
+            gimbal: GIMBAL_CONTROL对象（已移动到第一点并开启激光）
+            compiled: compile的输出
+            cancel: 可选的取消标志
+            repeat: 播放轮数
+            loop: 为True时一直循环直到取消
+            correction: 可选的闭环修正源
+
+        输出: 完整播放的轮数
+        """
+        yaw, pitch, led, t, cycle = compiled
+        if gimbal.upload:
+            return self._play_queued(gimbal, compiled, cancel, repeat, loop)
+        prepared = gimbal.prepare_playback(yaw, pitch, led)
+        start = time.monotonic()
+        rounds = 0
+        while loop or rounds < repeat:
+            ok = gimbal.play_realtime(
+                yaw,
+                pitch,
+                t,
+                cancel,
+                correction,
+                start=start + rounds * cycle,
+                prepared=prepared,
+            )
+            if not ok:
+                break
+            rounds += 1
+        return rounds
+
+    def _play_queued(self, gimbal, compiled, cancel, repeat, loop):
+        """上传模式：逐轮追加到下位机队列，轮与轮之间按cycle衔接"""
+        yaw, pitch, led, t, cycle = compiled
+        start = time.monotonic()
+        rounds = 0
+        while loop or rounds < repeat:
+            delay = cycle - float(t[-1]) if rounds else 0.0
+            if not gimbal.queue_trajectory(
+                yaw, pitch, t, led, cancel, append=rounds > 0, delay=delay
+            ):
+                gimbal.clear_queue()
+                return int((time.monotonic() - start) // cycle)
+            rounds += 1
+        end = start + (rounds - 1) * cycle + float(t[-1])
+        if not gimbal.wait_queue(max(end - time.monotonic(), 0.0), cancel):
+            return int((time.monotonic() - start) // cycle)
+        return rounds
@@ -0,0 +1,270 @@
+import os
+import struct
+import threading
+import time
+import queue
+import numpy as np
+import trajectory
+
+# 二进制点文件格式：头部 + 定长记录
+# 头部: magic(4字节) + version(1字节) + kind(1字节) + 保留(2字节) + count(4字节)
+HEADER_FMT = "<4sBBHI"
+HEADER_LEN = struct.calcsize(HEADER_FMT)
+MAGIC = b"PTS1"
+VERSION = 1
+KIND_NORM = 0  # float32 x, y（归一化屏幕坐标，需经H变换）
+KIND_ANGLE = 1  # int16 yaw, pitch（已是云台角度）
+RECORD_DTYPE = {KIND_NORM: np.float32, KIND_ANGLE: np.int16}
+
+CHUNK_POINTS = 1024  # 每块点数
+READ_BYTES = 64 * 1024  # 文本文件每次读取的字节数
+
+
+def write_header(file, kind, count):
+    """在文件当前位置写入二进制点文件头部"""
+    file.write(struct.pack(HEADER_FMT, MAGIC, VERSION, kind, 0, count))
+
+
+def read_header(path):
+    """
+    读取二进制点文件头部
+
+    输入参数:
+        path: 文件路径
+
+    输出: (kind, count)，不是二进制点文件时返回None
+    """
+    with open(path, "rb") as file:
+        head = file.read(HEADER_LEN)
+    if len(head) < HEADER_LEN or head[:4] != MAGIC:
+        return None
+    _, version, kind, _, count = struct.unpack(HEADER_FMT, head)
+    if version != VERSION or kind not in RECORD_DTYPE:
+        raise ValueError(f"unsupported point file: version {version}, kind {kind}")
+    return kind, count
+
+
+def iter_text_chunks(path, chunk_points=CHUNK_POINTS):
+    """
+    分块解析文本点文件（每行"x,y"或"x y"）
+
+    输入参数:
+        path: 文件路径
+        chunk_points: 每块点数（近似）
+
+    输出: 生成器，逐块产出float32 Nx2数组
+
+    异常: 某行不是两个数值时抛出ValueError（含行号）；空行与#开头的注释行跳过
+
+    调用场景: 大文件边读边画，内存占用与文件大小无关
+    """
+    rest = b""
+    pending = []
+    lineno = 0
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(READ_BYTES)
+            if data:
+                data = rest + data
+                cut = data.rfind(b"\n") + 1
+                text, rest = data[:cut], data[cut:]
+            else:
+                text, rest = rest, b""
+            for line in text.splitlines():
+                lineno += 1
+                fields = line.replace(b",", b" ").split()
+                if not fields or fields[0].startswith(b"#"):
+                    continue
+                try:
+                    if len(fields) != 2:
+                        raise ValueError(f"需要2个数值，实际{len(fields)}个")
+                    pending.append((float(fields[0]), float(fields[1])))
+                except ValueError as e:
+                    raise ValueError(f"{path}第{lineno}行格式错误: {e}") from None
+            if len(pending) >= chunk_points or (not data and pending):
+                yield np.array(pending, dtype=np.float32)
+                pending = []
+            if not data:
+                break
+
+
+def iter_binary_chunks(path, chunk_points=CHUNK_POINTS):
+    """
+    内存映射方式分块读取二进制点文件
+
+    输入参数:
+        path: 文件路径
+        chunk_points: 每块点数
+
+    输出: 生成器，逐块产出Nx2数组视图（float32或int16，取决于文件类型）
+    """
+    kind, count = read_header(path)
+    if count == 0:
+        return
+    records = np.memmap(
+        path, dtype=RECORD_DTYPE[kind], mode="r", offset=HEADER_LEN, shape=(count, 2)
+    )
+    for start in range(0, count, chunk_points):
+        yield records[start : start + chunk_points]
+
+
+def iter_angle_chunks(path, H, chunk_points=CHUNK_POINTS, lut=None, grid=None):
+    """
+    分块读取点文件并变换为云台角度
+
+    输入参数:
+        path: 文本或二进制点文件路径（按文件头自动识别）
+        H: 透视变换矩阵
+        chunk_points: 每块点数
+        lut: 可选的trajectory.AngleLUT，给出时用查表代替矩阵运算
+        grid: 可选的多点标定模型，给出时优先使用
+
+    输出: 生成器，逐块产出(yaw, pitch) int16数组
+    """
+    header = read_header(path)
+    if header is None:
+        chunks = iter_text_chunks(path, chunk_points)
+    else:
+        chunks = iter_binary_chunks(path, chunk_points)
+        if header[0] == KIND_ANGLE:
+            for chunk in chunks:
+                yield chunk[:, 0], chunk[:, 1]
+            return
+    for chunk in chunks:
+        if grid is None and lut is not None:
+            yield lut.lookup(chunk, H)
+        else:
+            yield trajectory.map_points(H, chunk, grid)
+
+
+def convert_text_to_binary(src, dst, H=None, chunk_points=CHUNK_POINTS):
+    """
+    将文本点文件转换为二进制点文件
+
+    输入参数:
+        src: 文本点文件路径
+        dst: 输出的二进制文件路径
+        H: 给出时预先变换为云台角度（KIND_ANGLE），否则保存归一化坐标
+        chunk_points: 每块点数
+
+    输出: 写入的点数
+
+    调用场景: 离线预处理大文件，之后加载无需文本解析
+    """
+    kind = KIND_NORM if H is None else KIND_ANGLE
+    count = 0
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as file:
+        write_header(file, kind, 0)
+        for chunk in iter_text_chunks(src, chunk_points):
+            if H is not None:
+                chunk = np.column_stack(trajectory.transform_points(H, chunk))
+            file.write(np.ascontiguousarray(chunk, dtype=RECORD_DTYPE[kind]).tobytes())
+            count += len(chunk)
+        file.seek(0)
+        write_header(file, kind, count)
+    os.replace(tmp, dst)
+    return count
+
+
+def play_file(
+    gimbal,
+    path,
+    H,
+    period=0.01,
+    on_first=None,
+    queue_chunks=4,
+    cancel=None,
+    grid=None,
+):
+    """
+    流式播放点文件：解析与变换在后台线程进行，同时逐点发送
+
+    输入参数:
+        gimbal: GIMBAL_CONTROL对象
+        path: 点文件路径
+        H: 透视变换矩阵
+        period: 相邻点的发送间隔（秒）
+        on_first: 收到第一个点时的回调on_first(yaw, pitch)，用于移动到起点并开启激光
+        queue_chunks: 解析线程最多领先的块数，限制内存占用
+        cancel: 可选的取消标志（需有cancelled属性），每点之间检查
+        grid: 可选的多点标定模型
+
+    输出: 发送的点数
+
+    调用场景: 屏幕"file"按钮，无需等待整个文件解析完成即可开始绘制；
+    上传模式（gimbal.upload）下逐块追加到下位机队列，由下位机按period回放
+    """
+    chunks = queue.Queue(maxsize=queue_chunks)
+    stop = threading.Event()  # 播放结束或取消后通知解析线程退出
+
+    def put(item):
+        """放入队列，队列满时等待，收到stop后放弃"""
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        source = iter_angle_chunks(path, H, grid=grid)
+        try:
+            for chunk in source:
+                if not put(chunk):
+                    return
+        except Exception as e:
+            print(f"[FILE] 读取点文件失败: {e}")
+        finally:
+            source.close()  # 关闭生成器，释放打开的文件
+        put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    sent = 0
+    next_t = None
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if gimbal.upload:
+                yaw, pitch = chunk
+                if not sent:
+                    if on_first is not None:
+                        on_first(yaw[0], pitch[0])
+                    next_t = time.monotonic()  # 第一块上传后下位机即开始回放
+                t = np.arange(len(yaw)) * period
+                if not gimbal.queue_trajectory(
+                    yaw,
+                    pitch,
+                    t,
+                    cancel=cancel,
+                    append=sent > 0,
+                    delay=period if sent else 0.0,
+                ):
+                    gimbal.clear_queue()
+                    return sent
+                sent += len(yaw)
+                continue
+            for yaw, pitch in zip(*chunk):
+                if cancel is not None and cancel.cancelled:
+                    return sent
+                if next_t is None:
+                    if on_first is not None:
+                        on_first(yaw, pitch)
+                    next_t = time.monotonic()
+                gimbal.publish(yaw, pitch)
+                sent += 1
+                next_t += period
+                delay = next_t - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        if gimbal.upload and sent:
+            remain = next_t + sent * period - time.monotonic()
+            gimbal.wait_queue(max(remain, 0.0), cancel)
+    finally:
+        stop.set()
+        producer.join()
+    return sent
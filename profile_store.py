@@ -0,0 +1,217 @@
+import os
+import re
+import mmap
+import struct
+import zlib
+import numpy as np
+
+PROFILE_DIR = "/root/user/profiles"
+KEEP_GENERATIONS = 3  # 每个配置保留的历史版本数
+ACTIVE_FILE = "active"  # 记录当前使用的配置名
+
+# 文件头: 魔数, 格式版本, 段数, 版本号(generation), 数据长度, 数据CRC32
+HEADER_FMT = "<4sHHQII"
+HEADER_LEN = struct.calcsize(HEADER_FMT)
+MAGIC = b"GPRF"
+FORMAT_VERSION = 1
+# 段头: 段名, dtype, 行数, 列数；每段数据按8字节对齐，可直接内存映射
+SECTION_FMT = "<8s4sII"
+SECTION_LEN = struct.calcsize(SECTION_FMT)
+ALIGN = 8
+NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+def _padded(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def encode_profile(arrays, generation):
+    """
+    将若干二维数组编码为配置文件内容
+
+    输入参数:
+        arrays: {段名: 数组}，段名不超过8字节，数组按二维保存
+        generation: 版本号
+
+    输出: bytes
+    """
+    parts = []
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        if arr.dtype.byteorder == ">":
+            arr = arr.astype(arr.dtype.newbyteorder("<"))
+        rows = arr.shape[0] if arr.ndim else 1
+        cols = arr.size // rows if rows else 0
+        data = arr.tobytes()
+        dtype = arr.dtype.str.encode()
+        parts.append(struct.pack(SECTION_FMT, name.encode(), dtype, rows, cols))
+        parts.append(data + bytes(_padded(len(data)) - len(data)))
+    payload = b"".join(parts)
+    header = struct.pack(
+        HEADER_FMT,
+        MAGIC,
+        FORMAT_VERSION,
+        len(arrays),
+        generation,
+        len(payload),
+        zlib.crc32(payload),
+    )
+    return header + payload
+
+
+def decode_profile(buf):
+    """
+    解析配置文件内容（不复制数据，返回的数组直接引用buf）
+
+    输入参数:
+        buf: bytes或mmap
+
+    输出: (generation, {段名: 二维数组})
+
+    异常: ValueError，文件头、长度或校验和不正确
+    """
+    if len(buf) < HEADER_LEN:
+        raise ValueError("文件过短")
+    magic, version, count, generation, length, crc = struct.unpack_from(
+        HEADER_FMT, buf, 0
+    )
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"未知格式 {magic!r} v{version}")
+    if HEADER_LEN + length > len(buf):
+        raise ValueError("文件不完整")
+    view = memoryview(buf)[HEADER_LEN : HEADER_LEN + length]
+    if zlib.crc32(view) != crc:
+        raise ValueError("校验和错误")
+    arrays = {}
+    offset = HEADER_LEN
+    for _ in range(count):
+        name, dtype, rows, cols = struct.unpack_from(SECTION_FMT, buf, offset)
+        offset += SECTION_LEN
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        arr = np.frombuffer(buf, dtype=dtype, count=rows * cols, offset=offset)
+        arrays[name.rstrip(b"\0").decode()] = arr.reshape(rows, cols)
+        offset += _padded(rows * cols * dtype.itemsize)
+    return generation, arrays
+
+
+class ProfileStore:
+    """
+    标定配置存储 - 断电安全、带版本的二进制配置
+
+    主要功能：
+    - 多个命名配置（不同屏幕/场地），记录当前使用的配置
+    - 每次保存写入新版本文件：先写临时文件并fsync，再原子重命名
+    - 文件带CRC32校验，读取时从最新版本开始，跳过损坏的版本
+    - 数组按8字节对齐保存，加载时内存映射，无需解析和重新计算
+    """
+
+    def __init__(self, root: str = PROFILE_DIR, keep: int = KEEP_GENERATIONS):
+        self.root = root
+        self.keep = keep
+
+    @staticmethod
+    def check_name(name):
+        if not NAME_RE.match(name):
+            raise ValueError(f"配置名只能包含字母、数字、下划线和减号: {name!r}")
+
+    def generations(self, name):
+        """返回配置的所有版本号（从新到旧）"""
+        prefix = name + "."
+        found = []
+        try:
+            for entry in os.listdir(self.root):
+                if entry.startswith(prefix) and entry.endswith(".prof"):
+                    gen = entry[len(prefix) : -len(".prof")]
+                    if gen.isdigit():
+                        found.append(int(gen))
+        except OSError:
+            pass
+        return sorted(found, reverse=True)
+
+    def names(self):
+        """返回所有配置名"""
+        try:
+            entries = os.listdir(self.root)
+        except OSError:
+            return []
+        return sorted({e.split(".")[0] for e in entries if e.endswith(".prof")})
+
+    def _path(self, name, generation):
+        return os.path.join(self.root, f"{name}.{generation:08d}.prof")
+
+    def _write(self, path, data):
+        """写临时文件、fsync、原子重命名，再fsync目录使重命名落盘"""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+        try:
+            fd = os.open(self.root, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def save(self, name, arrays):
+        """
+        保存配置的新版本
+
+        输入参数:
+            name: 配置名
+            arrays: {段名: 数组}
+
+        输出: 新的版本号
+
+        调用场景: 每次标定成功后立即调用，旧版本保留作为损坏时的回退
+        """
+        self.check_name(name)
+        os.makedirs(self.root, exist_ok=True)
+        gens = self.generations(name)
+        generation = gens[0] + 1 if gens else 1
+        self._write(self._path(name, generation), encode_profile(arrays, generation))
+        for old in gens[self.keep - 1 :]:
+            try:
+                os.remove(self._path(name, old))
+            except OSError:
+                pass
+        return generation
+
+    def load(self, name):
+        """
+        加载配置的最新有效版本
+
+        输入参数:
+            name: 配置名
+
+        输出: (generation, {段名: 数组})，数组为只读内存映射；没有有效版本返回None
+        """
+        self.check_name(name)
+        for generation in self.generations(name):
+            path = self._path(name, generation)
+            try:
+                with open(path, "rb") as file:
+                    buf = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                return decode_profile(buf)
+            except (OSError, ValueError) as e:
+                print(f"[PROFILE] 配置{name}第{generation}版损坏，尝试上一版本: {e}")
+        return None
+
+    def get_active(self, default="default"):
+        """返回当前使用的配置名"""
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as file:
+                name = file.read().strip()
+            self.check_name(name)
+            return name
+        except (OSError, ValueError):
+            return default
+
+    def set_active(self, name):
+        """设置当前使用的配置名"""
+        self.check_name(name)
+        os.makedirs(self.root, exist_ok=True)
+        self._write(os.path.join(self.root, ACTIVE_FILE), name.encode())
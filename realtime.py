@@ -0,0 +1,123 @@
+import gc
+import os
+import sys
+import time
+import threading
+
+# 可通过环境变量配置实时播放线程的CPU绑定与调度优先级（不设置则不修改）
+RT_CPU = os.environ.get("GIMBAL_RT_CPU")
+RT_CPU = int(RT_CPU) if RT_CPU else None
+RT_PRIORITY = os.environ.get("GIMBAL_RT_PRIORITY")
+RT_PRIORITY = int(RT_PRIORITY) if RT_PRIORITY else None
+SPIN_TIME = 0.0005  # 截止时间前最后一段改为忙等（秒），避免sleep的唤醒延迟
+SWITCH_INTERVAL = 0.0005  # 实时区段内的GIL切换间隔（秒），缩短其他线程占用GIL的时间
+
+_gc_lock = threading.Lock()
+_gc_depth = 0  # 嵌套或并发的实时区段数，全部退出后才恢复
+_gc_was_enabled = False
+_switch_interval = None
+
+
+def precise_sleep_until(deadline, spin=SPIN_TIME):
+    """
+    等待到指定时刻：先sleep到截止时间前spin秒，再忙等
+
+    输入参数:
+        deadline: 截止时刻（time.monotonic()）
+        spin: 忙等时长（秒）
+
+    输出: 无
+    """
+    delay = deadline - time.monotonic() - spin
+    if delay > 0:
+        time.sleep(delay)
+    while time.monotonic() < deadline:
+        pass
+
+
+class RealtimeSection:
+    """
+    实时区段 - with语句期间关闭循环GC，可选绑定CPU与提高调度优先级
+
+    主要功能：
+    - 关闭gc并缩短GIL切换间隔（进程级，嵌套/多线程同时使用时计数，最后一个退出时恢复）
+    - 将当前线程绑定到指定CPU（os.sched_setaffinity，Linux下作用于调用线程）
+    - 提高当前线程的调度优先级（SCHED_FIFO需要权限，失败时退回nice值，再失败则忽略）
+    - 退出时恢复原来的设置；applied记录实际生效的项
+    """
+
+    def __init__(self, cpu=RT_CPU, priority=RT_PRIORITY) -> None:
+        """
+        输入参数:
+            cpu: 绑定的CPU编号，None表示不绑定
+            priority: SCHED_FIFO优先级（1-99），None表示不修改
+        """
+        self.cpu = cpu
+        self.priority = priority
+        self.applied = []
+        self._affinity = None
+        self._policy = None
+        self._nice = None
+
+    def __enter__(self):
+        global _gc_depth, _gc_was_enabled, _switch_interval
+        with _gc_lock:
+            if _gc_depth == 0:
+                _gc_was_enabled = gc.isenabled()
+                gc.disable()
+                _switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(_switch_interval, SWITCH_INTERVAL))
+            _gc_depth += 1
+        self.applied.append("gc")
+        if self.cpu is not None:
+            try:
+                self._affinity = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, {self.cpu})
+                self.applied.append(f"cpu{self.cpu}")
+            except (AttributeError, OSError, ValueError) as e:
+                print(f"[RT] 无法绑定CPU{self.cpu}: {e}")
+        if self.priority is not None:
+            self._raise_priority()
+        return self
+
+    def _raise_priority(self):
+        try:
+            self._policy = os.sched_getscheduler(0)
+            param = os.sched_param(self.priority)
+            os.sched_setscheduler(0, os.SCHED_FIFO, param)
+            self.applied.append(f"fifo{self.priority}")
+            return
+        except (AttributeError, OSError):
+            self._policy = None
+        try:
+            self._nice = os.getpriority(os.PRIO_PROCESS, 0)
+            os.setpriority(os.PRIO_PROCESS, 0, -10)
+            self.applied.append("nice-10")
+        except (AttributeError, OSError) as e:
+            self._nice = None
+            print(f"[RT] 无法提高调度优先级: {e}")
+
+    def __exit__(self, *exc):
+        global _gc_depth
+        if self._policy is not None:
+            try:
+                os.sched_setscheduler(0, self._policy, os.sched_param(0))
+            except OSError:
+                pass
+        if self._nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, 0, self._nice)
+            except OSError:
+                pass
+        if self._affinity is not None:
+            try:
+                os.sched_setaffinity(0, self._affinity)
+            except OSError:
+                pass
+        with _gc_lock:
+            _gc_depth -= 1
+            if _gc_depth == 0:
+                sys.setswitchinterval(_switch_interval)
+                if _gc_was_enabled:
+                    gc.enable()
+        return False
@@ -1,17 +1,37 @@
-from maix import touchscreen, app, image
+from hal import touchscreen, app, image
 from state import *
 import time
 from gimbal_laser_control import GimbalLaserControl
 from gimbal_control import GIMBAL_CONTROL
 import numpy as np
+from functools import partial
+from trajectory import SHAPE_PARAMS
+from trajectory_cache import TrajectoryCache
+import point_file
+import svg_path
+import simplify
+import servo_lag
+from motion_planner import MotionPlanner
+from playlist import PlaylistScheduler, clip_cycle, retime_blanks
+from job_executor import JobExecutor
+from telemetry import TELEMETRY, EV_TOUCH, EV_JOB_START
+from spot_tracker import SpotTracker
+from calibration_grid import CalibrationGrid
 
 SCR_SIZE = (640, 480)
 BUT_SIZE = (80, 60)
+GRID_CELL = 40  # 点击检测网格的格子边长
+CALI_STEPS = ["First", "Second", "Third", "Fourth"]
+LABEL_RECT = (340, 10, SCR_SIZE[0] - 340, 30)  # yaw/pitch文字区域
+LABEL_COLOR = image.Color.from_rgb(0, 0, 255)
+# "list"按钮循环播放的图形
+PLAYLIST = [("shape", name, params) for name, params in SHAPE_PARAMS.items()]
 
 
 class SCREEN:
     button_init = {
         "exit": [10, 10, BUT_SIZE[0], BUT_SIZE[1]],
+        "stop": [100, 10, BUT_SIZE[0], BUT_SIZE[1]],
         "cali": [10, 100, BUT_SIZE[0], BUT_SIZE[1]],
         "sine": [10, 200, BUT_SIZE[0], BUT_SIZE[1]],
         "triangle": [10, 300, BUT_SIZE[0], BUT_SIZE[1]],
@@ -19,6 +39,7 @@ class SCREEN:
         "circle": [100, 300, BUT_SIZE[0], BUT_SIZE[1]],
         # 五角星
         "file": [200, 200, BUT_SIZE[0], BUT_SIZE[1]],
+        "list": [200, 300, BUT_SIZE[0], BUT_SIZE[1]],
     }
     button_cali = {
         "back": [10, 10, BUT_SIZE[0], BUT_SIZE[1]],
@@ -30,6 +51,8 @@ class SCREEN:
         "go2": [200, 300, BUT_SIZE[0], BUT_SIZE[1]],
         "go3": [350, 300, BUT_SIZE[0], BUT_SIZE[1]],
         "go4": [500, 300, BUT_SIZE[0], BUT_SIZE[1]],
+        "auto": [500, 400, BUT_SIZE[0], BUT_SIZE[1]],
+        "lag": [350, 400, BUT_SIZE[0], BUT_SIZE[1]],
     }
     button_setp = {
         "back": [10, 10, BUT_SIZE[0], BUT_SIZE[1]],
@@ -60,7 +83,11 @@ class SCREEN:
             return False
 
     def __init__(
-        self, state: STATE, gimbal_laser: GimbalLaserControl, gimbal: GIMBAL_CONTROL
+        self,
+        state: STATE,
+        gimbal_laser: GimbalLaserControl,
+        gimbal: GIMBAL_CONTROL,
+        param_controller=None,
     ) -> None:
         self.ts = touchscreen.TouchScreen()
         self.state = state
@@ -69,26 +96,227 @@ class SCREEN:
         self.img_null = image.Image(SCR_SIZE[0], SCR_SIZE[1])
         self.gimbal_laser = gimbal_laser
         self.gimbal = gimbal
+        self.param_controller = param_controller
+        # 取帧函数frame_source(after, timeout, stamped)，由主循环在流水线创建后设置
+        self.frame_source = None
+        self.need_camera = False  # 非init模式下是否需要相机画面（自动标定）
+        self.trajectory_cache = TrajectoryCache()
+        self.planner = MotionPlanner()
+        self.scheduler = PlaylistScheduler(self.planner, self.trajectory_cache)
+        # 激光光斑闭环修正，相机模型标定后生效
+        self.tracker = SpotTracker()
         self.img_null.draw_rect(
             0, 0, SCR_SIZE[0], SCR_SIZE[1], image.COLOR_WHITE, thickness=-1
         )
+        # 绘制任务在后台线程执行，取消或出错时强制关闭激光器
+        self.executor = JobExecutor(on_cancel=self.laser_off)
+        # 按钮分发表：workmode -> 按钮名 -> 处理函数
+        self.actions = {
+            "init": {
+                "exit": self.on_exit,
+                "cali": self.on_cali,
+                "stop": self.on_stop,
+                "sine": partial(self.start_shape, "sine", SHAPE_PARAMS["sine"]),
+                "triangle": partial(
+                    self.start_shape, "triangle", SHAPE_PARAMS["triangle"]
+                ),
+                "rectangle": partial(
+                    self.start_shape, "rectangle", SHAPE_PARAMS["rectangle"]
+                ),
+                "circle": partial(self.start_shape, "circle", SHAPE_PARAMS["circle"]),
+                "file": partial(self.start_file, "/root/user/et41.txt"),
+                "list": partial(self.start_playlist, PLAYLIST, loop=True),
+            },
+            "cali": {
+                "back": self.on_cali_back,
+                "set1": partial(self.on_set, "First"),
+                "set2": partial(self.on_set, "Second"),
+                "set3": partial(self.on_set, "Third"),
+                "set4": partial(self.on_set, "Fourth"),
+                "go1": partial(self.on_go, 0),
+                "go2": partial(self.on_go, 1),
+                "go3": partial(self.on_go, 2),
+                "go4": partial(self.on_go, 3),
+                "auto": self.on_auto,
+                "lag": self.on_lag,
+            },
+            "setp": {
+                "back": self.on_setp_back,
+                "save": self.on_save,
+                "x-100": partial(self.on_nudge, -100, 0),
+                "x-10": partial(self.on_nudge, -10, 0),
+                "x-1": partial(self.on_nudge, -1, 0),
+                "x+1": partial(self.on_nudge, 1, 0),
+                "x+10": partial(self.on_nudge, 10, 0),
+                "x+100": partial(self.on_nudge, 100, 0),
+                "y+100": partial(self.on_nudge, 0, 100),
+                "y+10": partial(self.on_nudge, 0, 10),
+                "y+1": partial(self.on_nudge, 0, 1),
+                "y-1": partial(self.on_nudge, 0, -1),
+                "y-10": partial(self.on_nudge, 0, -10),
+                "y-100": partial(self.on_nudge, 0, -100),
+            },
+        }
+        self.buttons = {
+            "init": self.button_init,
+            "cali": self.button_cali,
+            "setp": self.button_setp,
+        }
+        # 预计算的按钮绘制参数与复用的整帧图像
+        self.overlays = {}
+        self.frames = {}
+        self.frame_labels = {}
+        self.label_value = None
+        self.label_text = ""
+        # 每种workmode预先计算的点击网格
+        self.grids = {mode: self.build_grid(b) for mode, b in self.buttons.items()}
 
-    def gimbal_laser_init(self, theta_first, phi_first):
-        self.state.speaker = True
-        # 发送第一个点
-        self.gimbal.set(theta_first, phi_first)
-        self.gimbal.sendcmd()
-        time.sleep(0.1)
-        self.state.speaker = False
-        self.gimbal.sendcmd()
-        time.sleep(1)
-        self.gimbal.ledstate = True  # 开启激光器
-        self.gimbal.sendcmd()
+    def build_grid(self, buttons):
+        """将屏幕划分为GRID_CELL大小的格子，记录与每个格子重叠的按钮"""
+        cols = SCR_SIZE[0] // GRID_CELL + 1
+        rows = SCR_SIZE[1] // GRID_CELL + 1
+        grid = [[] for _ in range(cols * rows)]
+        for name, but in buttons.items():
+            gx0, gx1 = but[0] // GRID_CELL, (but[0] + but[2]) // GRID_CELL
+            gy0, gy1 = but[1] // GRID_CELL, (but[1] + but[3]) // GRID_CELL
+            for gy in range(gy0, min(gy1, rows - 1) + 1):
+                for gx in range(gx0, min(gx1, cols - 1) + 1):
+                    grid[gy * cols + gx].append((name, but))
+        return cols, rows, grid
+
+    def hit_test(self, x, y):
+        """返回当前workmode下被点击的按钮名，未命中返回None"""
+        cols, rows, grid = self.grids[self.state.workmode]
+        gx, gy = int(x) // GRID_CELL, int(y) // GRID_CELL
+        if not (0 <= gx < cols and 0 <= gy < rows):
+            return None
+        for name, but in grid[gy * cols + gx]:
+            if self.inbutton(x, y, but):
+                return name
+        return None
+
+    def calibrated(self):
+        return not np.array_equal(self.gimbal_laser.H, np.zeros((3, 3)))
+
+    def calibration_grid(self):
+        """当前有效的多点标定模型，没有时返回None（使用透视变换）"""
+        if self.param_controller is None:
+            return None
+        return self.param_controller.active_grid()
+
+    def laser_off(self):
+        self.gimbal.publish(led=False)
+
+    def gimbal_laser_init(self, theta_first, phi_first, cancel=None):
+        # 按当前位置到起点的距离估算到位时间，代替固定等待
+        settle = self.planner.move_time(
+            self.gimbal.yaw, self.gimbal.pitch, theta_first, phi_first
+        )
+        wait = cancel.sleep if cancel is not None else time.sleep
+        # 发送第一个点，同时响一声提示
+        self.gimbal.publish(theta_first, phi_first, speaker=True)
+        wait(0.1)
+        self.gimbal.publish(speaker=False)
+        wait(max(0, settle - 0.1))
+        if cancel is not None and cancel.cancelled:
+            return
+        self.gimbal.publish(led=True)  # 开启激光器
+
+    def compensate(self, theta_list, phi_list, t, led=None):
+        """有舵机滞后模型时做前馈补偿，否则原样返回"""
+        lag = self.param_controller.lag if self.param_controller else None
+        if lag is None:
+            return theta_list, phi_list, t, led
+        return servo_lag.feedforward(theta_list, phi_list, t, lag, led)
+
+    def play_angles(self, theta_list, phi_list, cancel, led=None):
+        """简化轨迹、规划时间并播放（移动到起点开启激光，结束后关闭）"""
+        keep = None
+        if led is not None:
+            # 激光开关切换处的点必须保留
+            change = np.diff(np.asarray(led, dtype=np.int8)) != 0
+            keep = np.zeros(len(led), dtype=bool)
+            keep[1:] |= change
+            keep[:-1] |= change
+        index, dwells = simplify.simplify(theta_list, phi_list, keep=keep)
+        theta_list, phi_list = theta_list[index], phi_list[index]
+        t = simplify.apply_dwells(self.planner.plan(theta_list, phi_list), dwells)
+        if led is not None:
+            led = led[index]
+            t = retime_blanks(t, theta_list, phi_list, led, self.planner)
+        theta_list, phi_list, t, led = self.compensate(theta_list, phi_list, t, led)
+        self.gimbal_laser_init(theta_list[0], phi_list[0], cancel)
+        self.tracker.reset()
+        self.gimbal.play_trajectory(
+            theta_list, phi_list, t, cancel, self.tracker, realtime=True, led=led
+        )
+        # 关闭激光器
+        self.laser_off()
+
+    def draw_shape(self, shape, params, cancel):
+        if TELEMETRY.enabled:
+            TELEMETRY.mark(EV_JOB_START)
+        theta_list, phi_list = self.trajectory_cache.shape(
+            shape, params, self.gimbal_laser.H, self.calibration_grid()
+        )
+        self.play_angles(theta_list, phi_list, cancel)
+
+    def draw_file(self, path, cancel):
+        if TELEMETRY.enabled:
+            TELEMETRY.mark(EV_JOB_START)
+        if path.lower().endswith(".svg"):
+            self.draw_svg(path, cancel)
+            return
+        point_file.play_file(
+            self.gimbal,
+            path,
+            self.gimbal_laser.H,
+            on_first=partial(self.gimbal_laser_init, cancel=cancel),
+            cancel=cancel,
+            grid=self.calibration_grid(),
+        )
+        # 关闭激光器
+        self.laser_off()
+
+    def draw_svg(self, path, cancel):
+        """矢量图形：自适应展平并排好子路径顺序，子路径之间关闭激光移动"""
+        theta_list, phi_list, led = svg_path.compile_svg(
+            path,
+            self.gimbal_laser.H,
+            self.calibration_grid(),
+            start=(self.gimbal.yaw, self.gimbal.pitch),
+        )
+        if len(theta_list):
+            self.play_angles(theta_list, phi_list, cancel, led)
+
+    def draw_playlist(self, items, repeat, loop, cancel):
+        """播放列表：编译为一条连续轨迹，只在开始时初始化一次"""
+        if TELEMETRY.enabled:
+            TELEMETRY.mark(EV_JOB_START)
+        compiled = self.scheduler.compile(
+            items,
+            self.gimbal_laser.H,
+            self.calibration_grid(),
+            closed=loop or repeat > 1,
+        )
+        if compiled is None:
+            return
+        yaw, pitch, led, t, cycle = compiled
+        yaw, pitch, t, led = self.compensate(yaw, pitch, t, led)
+        if loop or repeat > 1:
+            yaw, pitch, led, t = clip_cycle(yaw, pitch, led, t, cycle)
+        compiled = yaw, pitch, led, t, cycle
+        self.gimbal_laser_init(yaw[0], pitch[0], cancel)
+        self.tracker.reset()
+        self.scheduler.play(self.gimbal, compiled, cancel, repeat, loop, self.tracker)
+        self.laser_off()
 
     def listen(self):
         while self.state.running:
             x, y, pressed = self.ts.read()
             if (x != self.last_x or y != self.last_y) and pressed == 1:
+                if TELEMETRY.enabled:
+                    TELEMETRY.mark(EV_TOUCH)
                 self.last_x = x
                 self.last_y = y
                 self.pressprocess(x, y)
@@ -96,264 +324,233 @@ class SCREEN:
             time.sleep(0.01)
 
     def pressprocess(self, x, y):
-        if self.state.workmode == "init":
-            if self.inbutton(x, y, self.button_init["exit"]):
-                print("exit")
-                self.state.running = False
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_init["cali"]):
-                print("cali")
-                self.state.workmode = "cali"
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_init["sine"]):
-                if not np.array_equal(self.gimbal_laser.H, np.zeros((3, 3))):
-                    print("sine")
-                    points = self.gimbal_laser.generate_sine_wave_points(0.5, 0.5, 1)
-                    theta_list, phi_list = (
-                        self.gimbal_laser.execute_perspective_transform(points)
-                    )
-                    self.gimbal_laser_init(theta_list[0], phi_list[0])
-                    self.gimbal_laser.execute_gimbal_action(theta_list, phi_list)
-                    # 关闭激光器
-                    self.gimbal.ledstate = False
-                    self.gimbal.sendcmd()
-                    time.sleep(0.05)
-                else:
-                    print("calibration not done")
-            elif self.inbutton(x, y, self.button_init["triangle"]):
-                if not np.array_equal(self.gimbal_laser.H, np.zeros((3, 3))):
-                    print("triangle")
-                    points = self.gimbal_laser.generate_triangle_points(
-                        0.2, 0.2, 0.8, 0.2, 0.5, 0.8
-                    )
-                    theta_list, phi_list = (
-                        self.gimbal_laser.execute_perspective_transform(points)
-                    )
-                    self.gimbal_laser_init(theta_list[0], phi_list[0])
-                    self.gimbal_laser.execute_gimbal_action(theta_list, phi_list)
-                    # 关闭激光器
-                    self.gimbal.ledstate = False
-                    self.gimbal.sendcmd()
-                    time.sleep(0.05)
-                else:
-                    print("calibration not done")
-            elif self.inbutton(x, y, self.button_init["rectangle"]):
-                if not np.array_equal(self.gimbal_laser.H, np.zeros((3, 3))):
-                    print("rectangle")
-                    points = self.gimbal_laser.generate_rectangle_points(
-                        0.2, 0.2, 0.8, 0.8
-                    )
-                    theta_list, phi_list = (
-                        self.gimbal_laser.execute_perspective_transform(points)
-                    )
-                    self.gimbal_laser_init(theta_list[0], phi_list[0])
-                    self.gimbal_laser.execute_gimbal_action(theta_list, phi_list)
-                    # 关闭激光器
-                    self.gimbal.ledstate = False
-                    self.gimbal.sendcmd()
-                    time.sleep(0.05)
-                else:
-                    print("calibration not done")
-            elif self.inbutton(x, y, self.button_init["circle"]):
-                if not np.array_equal(self.gimbal_laser.H, np.zeros((3, 3))):
-                    print("circle")
-                    points = self.gimbal_laser.generate_circle_points(0.5, 0.5, 0.4)
-                    theta_list, phi_list = (
-                        self.gimbal_laser.execute_perspective_transform(points)
-                    )
-                    self.gimbal_laser_init(theta_list[0], phi_list[0])
-                    self.gimbal_laser.execute_gimbal_action(theta_list, phi_list)
-                    # 关闭激光器
-                    self.gimbal.ledstate = False
-                    self.gimbal.sendcmd()
-                    time.sleep(0.05)
-                else:
-                    print("calibration not done")
-            elif self.inbutton(x, y, self.button_init["file"]):
-                if not np.array_equal(self.gimbal_laser.H, np.zeros((3, 3))):
-                    print("file")
-                    # while True:
-                    self.gimbal_laser.read_point_from_file("/root/user/et41.txt")
-                    time.sleep(0.05)
-                else:
-                    print("calibration not done")
-        elif self.state.workmode == "cali":
-            self.gimbal.ledstate = True  # 开启激光器
-            self.gimbal.sendcmd()
-            if self.inbutton(x, y, self.button_cali["back"]):
-                print("back")
-                self.state.workmode = "init"
-                self.gimbal_laser.calibration_step = (
-                    "Finished"  # 退回主界面时说明校正完成
+        if self.state.workmode == "cali":
+            self.gimbal.publish(led=True)  # 开启激光器
+        name = self.hit_test(x, y)
+        if name is not None:
+            self.actions[self.state.workmode][name]()
+
+    def on_exit(self):
+        print("exit")
+        self.executor.cancel()
+        self.state.running = False
+
+    def on_cali(self):
+        print("cali")
+        self.executor.cancel()
+        self.state.workmode = "cali"
+
+    def on_stop(self):
+        print("stop")
+        self.executor.cancel()
+
+    def start_shape(self, shape, params):
+        if self.calibrated():
+            print(shape)
+            self.executor.submit(self.draw_shape, shape, params)
+        else:
+            print("calibration not done")
+
+    def start_file(self, path):
+        if self.calibrated():
+            print("file")
+            self.executor.submit(self.draw_file, path)
+        else:
+            print("calibration not done")
+
+    def start_playlist(self, items, repeat=1, loop=False):
+        if self.calibrated():
+            print("playlist")
+            self.executor.submit(self.draw_playlist, items, repeat, loop)
+        else:
+            print("calibration not done")
+
+    def on_cali_back(self):
+        print("back")
+        self.state.workmode = "init"
+        self.gimbal_laser.calibration_step = "Finished"  # 退回主界面时说明校正完成
+
+    def on_set(self, step):
+        print(f"set{CALI_STEPS.index(step) + 1}")
+        self.gimbal_laser.calibration_step = step
+        self.state.workmode = "setp"
+
+    def on_go(self, index):
+        if self.gimbal_laser.dst_points[index] != [0, 0]:
+            print(f"go{index + 1}")
+            self.gimbal.publish(
+                self.gimbal_laser.dst_points[index][0],
+                self.gimbal_laser.dst_points[index][1],
+            )
+        else:
+            print(f"go{index + 1} not set")
+
+    def on_auto(self):
+        if self.frame_source is None:
+            print("auto calibration unavailable")
+            return
+        print("auto")
+        self.executor.submit(self.auto_calibrate)
+
+    def auto_calibrate(self, cancel):
+        self.need_camera = True
+        # 自动标定依赖OpenCV，首次使用时才导入，不拖慢启动
+        from auto_calibration import AutoCalibrator
+
+        calibrator = AutoCalibrator(self.gimbal, self.frame_source, self.planner)
+        samples = None
+        try:
+            result = calibrator.run(
+                self.gimbal_laser.src_points, self.gimbal_laser.dst_points, cancel
+            )
+            if result is not None and self.param_controller is not None:
+                samples = calibrator.measure_grid(
+                    result[2], self.gimbal_laser.src_points, cancel=cancel
                 )
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["set1"]):
-                print("set1")
-                self.gimbal_laser.calibration_step = "First"
-                self.state.workmode = "setp"
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["set2"]):
-                print("set2")
-                self.gimbal_laser.calibration_step = "Second"
-                self.state.workmode = "setp"
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["set3"]):
-                print("set3")
-                self.gimbal_laser.calibration_step = "Third"
-                self.state.workmode = "setp"
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["set4"]):
-                print("set4")
-                self.gimbal_laser.calibration_step = "Fourth"
-                self.state.workmode = "setp"
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["go1"]):
-                if self.gimbal_laser.dst_points[0] != [0, 0]:
-                    print("go1")
-                    self.gimbal.set(
-                        self.gimbal_laser.dst_points[0][0],
-                        self.gimbal_laser.dst_points[0][1],
-                    )
-                    self.gimbal.sendcmd()
-                else:
-                    print("go1 not set")
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["go2"]):
-                if self.gimbal_laser.dst_points[1] != [0, 0]:
-                    print("go2")
-                    self.gimbal.set(
-                        self.gimbal_laser.dst_points[1][0],
-                        self.gimbal_laser.dst_points[1][1],
-                    )
-                    self.gimbal.sendcmd()
-                else:
-                    print("go2 not set")
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["go3"]):
-                if self.gimbal_laser.dst_points[2] != [0, 0]:
-                    print("go3")
-                    self.gimbal.set(
-                        self.gimbal_laser.dst_points[2][0],
-                        self.gimbal_laser.dst_points[2][1],
-                    )
-                    self.gimbal.sendcmd()
-                else:
-                    print("go3 not set")
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_cali["go4"]):
-                if self.gimbal_laser.dst_points[3] != [0, 0]:
-                    print("go4")
-                    self.gimbal.set(
-                        self.gimbal_laser.dst_points[3][0],
-                        self.gimbal_laser.dst_points[3][1],
-                    )
-                    self.gimbal.sendcmd()
-                else:
-                    print("go4 not set")
-                time.sleep(0.05)
-        elif self.state.workmode == "setp":
-            if self.inbutton(x, y, self.button_setp["back"]):
-                print("back")
-                self.state.workmode = "cali"
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["save"]):
-                self.gimbal_laser.calibration_mode = True  # 开启标定
-                print("save")
-                self.state.workmode = "cali"
-                self.gimbal_laser.calibrate_gimbal()  # 执行标定
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["x-100"]):
-                print("x-100")
-                self.gimbal.set(self.gimbal.yaw - 100, self.gimbal.pitch)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["x-10"]):
-                print("x-10")
-                self.gimbal.set(self.gimbal.yaw - 10, self.gimbal.pitch)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["x-1"]):
-                print("x-1")
-                self.gimbal.set(self.gimbal.yaw - 1, self.gimbal.pitch)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["x+1"]):
-                print("x+1")
-                self.gimbal.set(self.gimbal.yaw + 1, self.gimbal.pitch)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["x+10"]):
-                print("x+10")
-                self.gimbal.set(self.gimbal.yaw + 10, self.gimbal.pitch)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["x+100"]):
-                print("x+100")
-                self.gimbal.set(self.gimbal.yaw + 100, self.gimbal.pitch)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["y+100"]):
-                print("y+100")
-                self.gimbal.set(self.gimbal.yaw, self.gimbal.pitch + 100)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["y+10"]):
-                print("y+10")
-                self.gimbal.set(self.gimbal.yaw, self.gimbal.pitch + 10)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["y+1"]):
-                print("y+1")
-                self.gimbal.set(self.gimbal.yaw, self.gimbal.pitch + 1)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["y-1"]):
-                print("y-1")
-                self.gimbal.set(self.gimbal.yaw, self.gimbal.pitch - 1)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["y-10"]):
-                print("y-10")
-                self.gimbal.set(self.gimbal.yaw, self.gimbal.pitch - 10)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
-            elif self.inbutton(x, y, self.button_setp["y-100"]):
-                print("y-100")
-                self.gimbal.set(self.gimbal.yaw, self.gimbal.pitch - 100)
-                self.gimbal.sendcmd()
-                time.sleep(0.05)
+        finally:
+            self.need_camera = False
+        if result is None:
+            return
+        dst_points, H, G = result
+        self.gimbal_laser.dst_points = dst_points
+        self.gimbal_laser.H = H
+        self.gimbal_laser.calibration_step = "Finished"
+        self.tracker.set_camera_model(G)
+        if self.param_controller is not None:
+            self.param_controller.camera_model = G
+            if samples is not None:
+                self.param_controller.grid = CalibrationGrid.fit(
+                    samples, dst_points, src_points=self.gimbal_laser.src_points
+                )
+            self.param_controller.save_parameters()
+
+    def on_lag(self):
+        print("lag")
+        self.executor.submit(self.identify_lag)
+
+    def identify_lag(self, cancel):
+        """
+        辨识舵机滞后模型并保存，之后的绘制按模型做前馈补偿
+
+        已标定相机模型时以相机观测的光斑为响应，否则使用下位机状态帧
+        """
+        if self.tracker.G is not None and self.frame_source is not None:
+
+            def measure():
+                # 以帧的采集时刻为采样时刻，而不是发出请求的时刻
+                frame = self.frame_source(time.monotonic(), stamped=True)
+                if frame is None:
+                    return None
+                img, stamp = frame
+                angles = self.tracker.measure(img)
+                return None if angles is None else (stamp, *angles)
+
+        elif self.gimbal.feedback is not None:
+            measure = servo_lag.gimbal_feedback(self.gimbal)
+        else:
+            print("lag identification unavailable")
+            return
+        self.need_camera = True
+        try:
+            models = servo_lag.identify_servo(self.gimbal, measure, cancel=cancel)
+        finally:
+            self.need_camera = False
+        if models is not None and self.param_controller is not None:
+            self.param_controller.lag = models
+            self.param_controller.save_parameters()
+
+    def on_setp_back(self):
+        print("back")
+        self.state.workmode = "cali"
+
+    def on_save(self):
+        self.gimbal_laser.calibration_mode = True  # 开启标定
+        print("save")
+        self.state.workmode = "cali"
+        self.gimbal_laser.calibrate_gimbal()  # 执行标定
+        # 标定结果立即落盘，不等到程序正常退出
+        if self.param_controller is not None:
+            self.param_controller.save_parameters()
+
+    def on_nudge(self, dx, dy):
+        print(f"x{dx:+d}" if dx else f"y{dy:+d}")
+        command = self.gimbal.command  # 读取一次快照，yaw与pitch来自同一次发布
+        self.gimbal.publish(command.yaw + dx, command.pitch + dy)
+
+    def build_overlay(self, width, height):
+        """
+        预计算当前workmode在给定分辨率下的按钮绘制参数
+
+        输入参数:
+            width, height: 目标图像尺寸
+
+        输出: [(矩形参数, 文字参数)]，按(workmode, 分辨率)缓存
+        """
+        key = (self.state.workmode, width, height)
+        ops = self.overlays.get(key)
+        if ops is None:
+            zoom_kx = width / SCR_SIZE[0]
+            zoom_ky = height / SCR_SIZE[1]
+            ops = []
+            for butstr, but in self.buttons[self.state.workmode].items():
+                x = round(but[0] * zoom_kx)
+                y = round(but[1] * zoom_ky)
+                rect = (x, y, round(but[2] * zoom_kx), round(but[3] * zoom_ky))
+                ops.append((rect, (x, y + 10, butstr)))
+            self.overlays[key] = ops
+        return ops
 
     def draw_button(self, img=None):
         if img is None:
+            # 无相机画面的模式：整帧只渲染一次，之后直接复用
+            img = self.frames.get(self.state.workmode)
+            if img is not None:
+                return img
             img = image.Image(SCR_SIZE[0], SCR_SIZE[1])
-            # img.draw_rect(0, 0, SCR_SIZE[0], SCR_SIZE[1], image.COLOR_WHITE,thickness=-1)
-        zoom_kx = img.width() / SCR_SIZE[0]
-        zoom_ky = img.height() / SCR_SIZE[1]
-        if self.state.workmode == "init":
-            butlist = self.button_init
-        elif self.state.workmode == "cali":
-            butlist = self.button_cali
-        elif self.state.workmode == "setp":
-            butlist = self.button_setp
-
-        for butstr in butlist:
-            but = butlist[butstr]
             img.draw_rect(
-                round(but[0] * zoom_kx),
-                round(but[1] * zoom_ky),
-                round(but[2] * zoom_kx),
-                round(but[3] * zoom_ky),
-                image.COLOR_RED,
-                thickness=-1,
-            )
-            img.draw_string(
-                round(but[0] * zoom_kx),
-                round(but[1] * zoom_ky) + 10,
-                butstr,
-                image.COLOR_WHITE,
-                scale=1.5,
-                thickness=2,
+                0, 0, SCR_SIZE[0], SCR_SIZE[1], image.COLOR_BLACK, thickness=-1
             )
+            self.frames[self.state.workmode] = img
+            self.frame_labels[self.state.workmode] = None
+        for rect, text in self.build_overlay(img.width(), img.height()):
+            img.draw_rect(*rect, image.COLOR_RED, thickness=-1)
+            img.draw_string(*text, image.COLOR_WHITE, scale=1.5, thickness=2)
+        return img
+
+    def draw_status(self, img, yaw, pitch):
+        """
+        在图像上显示yaw和pitch
+
+        输入参数:
+            img: draw_button返回的图像
+            yaw, pitch: 当前云台角度
+
+        输出: 带状态文字的图像；复用的整帧在文字变化时换成新的副本，
+            调用方应使用返回值
+
+        调用场景: 主循环每帧调用；文字只在角度变化时重新生成，
+        复用的整帧图像只在变化时复制一份再擦除并重绘文字区域，
+        显示线程可能仍在显示旧的那一份，不能原地修改
+        """
+        if (yaw, pitch) != self.label_value:
+            self.label_value = (yaw, pitch)
+            self.label_text = f"Yaw: {yaw}, Pitch: {pitch}"
+        mode = self.state.workmode
+        if img is self.frames.get(mode):
+            if self.frame_labels[mode] == self.label_value:
+                return img
+            img = img.copy()
+            self.frames[mode] = img
+            img.draw_rect(*LABEL_RECT, image.COLOR_BLACK, thickness=-1)
+            self.frame_labels[mode] = self.label_value
+        img.draw_string(
+            LABEL_RECT[0],
+            LABEL_RECT[1],
+            self.label_text,
+            color=LABEL_COLOR,
+            scale=2,
+            thickness=1,
+        )
         return img
 
     def inbutton(self, x, y, button):
@@ -0,0 +1,438 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+import trajectory
+from gimbal_control import YAWLIM, PITCHLIM
+
+LAG_DT = 0.005  # 辨识时指令与响应的重采样周期（秒）
+MAX_DELAY = 0.1  # 辨识时搜索的最大纯延迟（秒）
+FF_PERIOD = 0.01  # 前馈补偿后轨迹的发送周期（秒）
+LOOKAHEAD = 0.0  # 在模型延迟之外额外提前的时间（秒）
+MAX_BOOST = 1000  # 前馈对指令的最大修正量（舵机单位），避免尖角处指令过冲
+EXCITE_AMPLITUDE = 400  # 辨识激励的阶跃幅度（舵机单位）
+EXCITE_HOLD = (0.08, 0.3)  # 辨识激励每个阶跃的保持时间范围（秒）
+
+
+class LagModel:
+    """
+    单轴舵机滞后模型：纯延迟 + 一阶或二阶单位增益环节
+
+    一阶: tau·y' + y = u(t - delay)
+    二阶: y'' + 2·zeta·wn·y' + wn²·y = wn²·u(t - delay)
+    离散形式（采样周期dt，指令零阶保持的精确离散化，D为延迟步数）：
+        y[k+1] = a1·y[k] + a2·y[k-1] + b1·u[k-D] + b2·u[k-1-D]
+    单位增益：a1 + a2 + b1 + b2 = 1；一阶时a2 = b2 = 0
+    """
+
+    def __init__(self, order=1, tau=0.05, wn=30.0, zeta=1.0, delay=0.0) -> None:
+        self.order = int(order)
+        self.tau = float(tau)  # 一阶时间常数（秒）
+        self.wn = float(wn)  # 二阶固有频率（rad/s）
+        self.zeta = float(zeta)  # 二阶阻尼比
+        self.delay = float(delay)  # 纯延迟（秒）
+
+    def coefficients(self, dt):
+        """离散系数(a1, a2, b1, b2)"""
+        if self.order == 1:
+            a = float(np.exp(-dt / self.tau))
+            return a, 0.0, 1.0 - a, 0.0
+        w2 = self.wn**2
+        # 状态x = (y, y')，增广矩阵的指数同时给出Ad与Bd
+        M = np.zeros((3, 3))
+        M[0, 1] = 1.0
+        M[1] = -w2, -2 * self.zeta * self.wn, w2
+        E = _expm(M * dt)
+        (a, b), (c, d) = E[:2, :2]
+        p, q = E[:2, 2]
+        return a + d, b * c - a * d, p, b * q - d * p
+
+    def delay_steps(self, dt):
+        return int(round(self.delay / dt))
+
+    def simulate(self, u, dt, y0=None):
+        """
+        仿真舵机响应
+
+        输入参数:
+            u: 等间隔采样的指令序列（零阶保持）
+            dt: 采样周期
+            y0: 初始位置，默认u[0]（静止）
+
+        输出: 与u等长的响应序列
+        """
+        u = np.asarray(u, dtype=np.float64)
+        a1, a2, b1, b2 = self.coefficients(dt)
+        d = self.delay_steps(dt)
+        prev = cur = u[0] if y0 is None else float(y0)
+        # 开始前静止在y0
+        ud = np.concatenate((np.full(d + 1, cur), u))[: len(u) + 1]
+        y = np.empty(len(u))
+        for k in range(len(u)):
+            y[k] = cur
+            cur, prev = a1 * cur + a2 * prev + b1 * ud[k + 1] + b2 * ud[k], cur
+        return y
+
+    def inverse(self, r, dt):
+        """
+        逆模型：使响应跟随r所需的指令（未含延迟补偿）
+
+        输入参数:
+            r: 等间隔采样的期望位置
+            dt: 采样周期
+
+        输出: 指令序列
+
+        零阶保持在二阶模型中引入接近-1的采样零点，直接求逆会得到逐点正负交替的指令；
+        这里只对极点求逆，零点以反转的零相位形式补偿（ZPETC），
+        r到y为零相位、低频单位增益
+        """
+        r = np.asarray(r, dtype=np.float64)
+        a1, a2, b1, b2 = self.coefficients(dt)
+        r_next = np.concatenate((r[1:], r[-1:]))
+        r_prev = np.concatenate((r[:1], r[:-1]))
+        v = r_next - a1 * r - a2 * r_prev
+        if not b2:
+            return v / b1
+        v_next = np.concatenate((v[1:], v[-1:]))
+        return (b1 * v + b2 * v_next) / (b1 + b2) ** 2
+
+    def to_row(self):
+        """保存到配置的一行: [阶数, tau, wn, zeta, delay]"""
+        return [self.order, self.tau, self.wn, self.zeta, self.delay]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def __repr__(self) -> str:
+        if self.order == 1:
+            shape = f"tau={self.tau * 1e3:.1f}ms"
+        else:
+            shape = f"wn={self.wn:.1f}rad/s, zeta={self.zeta:.2f}"
+        return f"LagModel({shape}, delay={self.delay * 1e3:.0f}ms)"
+
+
+def identify(u, y, dt, order=1, max_delay=MAX_DELAY):
+    """
+    由等间隔采样的指令与响应辨识单轴滞后模型
+
+    输入参数:
+        u: 指令序列（零阶保持）
+        y: 实测响应序列
+        dt: 采样周期
+        order: 模型阶数，1或2
+        max_delay: 搜索的最大纯延迟（秒）
+
+    输出: (LagModel, 仿真输出误差均方根)
+
+    异常: ValueError，数据不足或拟合得到不稳定的模型
+
+    先对每个候选延迟做线性最小二乘（方程误差，单位增益约束下一阶1个、二阶3个未知数）
+    得到初值；测量稀疏（相机帧率、状态帧周期）或有噪声时方程误差有偏，
+    再以仿真输出与实测之差为目标做坐标搜索细化
+    """
+    u = np.asarray(u, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    max_d = int(round(max_delay / dt))
+    if len(u) < max_d + 10:
+        raise ValueError("辨识数据过短")
+    model = _fit_arx(u, y, dt, order, max_d)
+
+    def cost(params):
+        candidate = LagModel(order, *params)
+        return float(np.sqrt(np.mean((candidate.simulate(u, dt, y[0]) - y) ** 2)))
+
+    # 坐标搜索：tau、wn按比例，zeta按绝对值，延迟按采样周期调整；无改进时步长减半
+    params = [model.tau, model.wn, model.zeta, model.delay]
+    steps = {1: 0.2, 2: 0.1} if order == 2 else {0: 0.2}
+    best = cost(params)
+    while max(steps.values()) > 0.005:
+        improved = False
+        for i in (*steps, 3):
+            for sign in (1, -1):
+                trial = list(params)
+                if i == 3:
+                    trial[3] += sign * dt
+                elif i == 2:
+                    trial[2] += sign * steps[2]
+                else:
+                    trial[i] *= 1 + sign * steps[i]
+                if trial[2] <= 0 or not 0 <= trial[3] <= max_delay + 1e-9:
+                    continue
+                value = cost(trial)
+                if value < best:
+                    params, best, improved = trial, value, True
+        if not improved:
+            steps = {i: step / 2 for i, step in steps.items()}
+    return LagModel(order, *params), best
+
+
+def _fit_arx(u, y, dt, order, max_d):
+    """方程误差最小二乘，返回残差最小的延迟对应的模型"""
+    best = None
+    for d in range(max_d + 1):
+        ud = np.concatenate((np.full(d, u[0]), u))[: len(u)]
+        k = np.arange(d + 1, len(u) - 1)
+        if order == 1:
+            target = y[k + 1] - ud[k]
+            A = (y[k] - ud[k])[:, None]
+        else:
+            # 消去b2 = 1 - a1 - a2 - b1后对(a1, a2, b1)线性
+            base = ud[k - 1]
+            target = y[k + 1] - base
+            A = np.column_stack((y[k] - base, y[k - 1] - base, ud[k] - base))
+        coef, *_ = np.linalg.lstsq(A, target, rcond=None)
+        rms = float(np.sqrt(np.mean((A @ coef - target) ** 2)))
+        if best is None or rms < best[0]:
+            best = (rms, d, coef)
+    rms, d, coef = best
+    if order == 1:
+        a = coef[0]
+        if not 0 < a < 1:
+            raise ValueError(f"一阶模型不稳定: a={a:.3f}")
+        return LagModel(1, tau=-dt / np.log(a), delay=d * dt)
+    z = np.roots([1.0, -coef[0], -coef[1]]).astype(complex)
+    if np.any(np.abs(z) >= 1) or np.any(np.abs(z) == 0):
+        raise ValueError(f"二阶模型不稳定: 极点{z}")
+    s = np.log(z) / dt
+    wn = float(np.sqrt((s[0] * s[1]).real))
+    zeta = float(-(s[0] + s[1]).real / (2 * wn))
+    return LagModel(2, wn=wn, zeta=zeta, delay=d * dt)
+
+
+def _expm(M, terms=16):
+    """小矩阵的指数（缩放-平方 + 泰勒级数）"""
+    norm = np.abs(M).sum(axis=1).max()
+    scale = max(0, int(np.ceil(np.log2(norm))) + 1) if norm > 0 else 0
+    A = M / 2**scale
+    E = term = np.eye(len(M))
+    for n in range(1, terms):
+        term = term @ A / n
+        E = E + term
+    for _ in range(scale):
+        E = E @ E
+    return E
+
+
+def resample(t_cmd, u_cmd, t_meas, y_meas, dt=LAG_DT):
+    """
+    将发送记录与测量记录重采样到同一等间隔时间轴
+
+    输入参数:
+        t_cmd: 各指令的发送时刻
+        u_cmd: 指令值，N或Nx2
+        t_meas: 各测量的时刻
+        y_meas: 测量值，M或Mx2
+
+    输出: (u, y)，指令按零阶保持、测量按线性插值
+    """
+    t_cmd = np.asarray(t_cmd, dtype=np.float64)
+    t_meas = np.asarray(t_meas, dtype=np.float64)
+    start = max(t_cmd[0], t_meas[0])
+    grid = np.arange(start, t_meas[-1], dt)
+    idx = np.clip(np.searchsorted(t_cmd, grid, "right") - 1, 0, len(t_cmd) - 1)
+    u = np.asarray(u_cmd, dtype=np.float64)[idx]
+    y_meas = np.asarray(y_meas, dtype=np.float64)
+    if y_meas.ndim == 1:
+        return u, np.interp(grid, t_meas, y_meas)
+    y = np.column_stack([np.interp(grid, t_meas, c) for c in y_meas.T])
+    return u, y
+
+
+def excitation(duration, amplitude=EXCITE_AMPLITUDE, hold=EXCITE_HOLD, seed=0):
+    """
+    辨识用的随机阶跃激励（两轴独立）
+
+    输出: (yaw, pitch, t)，可直接交给play_realtime
+    """
+    rng = np.random.default_rng(seed)
+    t = [0.0]
+    while t[-1] < duration:
+        t.append(t[-1] + rng.uniform(*hold))
+    n = len(t)
+    yaw = 5000 + rng.uniform(-amplitude, amplitude, n)
+    pitch = 5000 + rng.uniform(-amplitude, amplitude, n)
+    yaw[0] = pitch[0] = 5000
+    return yaw.astype(np.int16), pitch.astype(np.int16), np.array(t)
+
+
+def identify_servo(gimbal, measure, duration=4.0, order=2, dt=LAG_DT, cancel=None):
+    """
+    播放激励并记录响应，辨识两轴滞后模型
+
+    输入参数:
+        gimbal: GIMBAL_CONTROL对象
+        measure: 无参函数，返回(时刻, yaw, pitch)或None，可以阻塞（如等待相机帧）；
+            数据来源为下位机状态帧（gimbal_feedback）或相机光斑（经相机模型换算为角度）
+        duration: 激励时长（秒）
+        order: 模型阶数
+        dt: 重采样周期
+        cancel: 可选的取消标志
+
+    输出: (yaw模型, pitch模型)，被取消或数据不足返回None
+
+    调用场景: 标定界面"lag"按钮，更换舵机或负载后重新辨识
+    """
+    yaw, pitch, t = excitation(duration)
+    stamps = np.zeros(len(yaw))
+    samples = []
+    done = threading.Event()
+
+    def sample():
+        last = None
+        while not done.is_set():
+            m = measure()
+            if m is not None and m[0] != last:
+                last = m[0]
+                samples.append(m)
+            else:
+                time.sleep(dt / 2)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        gimbal.publish(yaw[0], pitch[0])
+        time.sleep(0.5)
+        completed = gimbal.play_realtime(
+            yaw, pitch, t, cancel, stamps=stamps, start=time.monotonic() + 0.05
+        )
+        time.sleep(0.5)
+    finally:
+        done.set()
+        sampler.join()
+    if not completed or len(samples) < 10:
+        print(f"[LAG] 辨识中止，测量{len(samples)}个")
+        return None
+    meas = np.array(samples, dtype=np.float64)
+    u, y = resample(stamps, np.column_stack((yaw, pitch)), meas[:, 0], meas[:, 1:], dt)
+    models = []
+    for axis, name in enumerate(("yaw", "pitch")):
+        try:
+            model, rms = identify(u[:, axis], y[:, axis], dt, order)
+        except ValueError as e:
+            print(f"[LAG] {name}辨识失败: {e}")
+            return None
+        print(f"[LAG] {name}: {model}, 残差{rms:.1f}, 测量{len(samples)}个")
+        models.append(model)
+    return tuple(models)
+
+
+def gimbal_feedback(gimbal):
+    """下位机状态帧作为测量来源"""
+
+    def measure():
+        if gimbal.feedback is None:
+            return None
+        return (gimbal.feedback_time, *gimbal.feedback)
+
+    return measure
+
+
+def feedforward(
+    yaw,
+    pitch,
+    t,
+    models,
+    led=None,
+    lookahead=LOOKAHEAD,
+    period=FF_PERIOD,
+    max_boost=MAX_BOOST,
+):
+    """
+    前馈补偿：按滞后模型加强指令，使舵机实际位置跟随规划的轨迹
+
+    输入参数:
+        yaw, pitch, t: 规划好的轨迹（MotionPlanner.plan的时间戳）
+        models: (yaw模型, pitch模型)
+        led: 可选的逐点激光器状态
+        lookahead: 在模型延迟之外额外提前的时间（秒）
+        period: 输出轨迹的发送周期
+        max_boost: 指令相对期望位置的最大修正量
+
+    输出: (yaw, pitch, t, led)，按period等间隔重采样后的指令；
+        led为None时返回None
+
+    指令比舵机实际位置超前delay + lookahead：整条轨迹的指令都保留（舵机起步不丢点），
+    激光器开启相应推迟，与舵机实际到达的位置对齐；两轴延迟不同时延迟小的一轴推迟发送
+
+    调用场景: 透视变换、简化、时间规划之后，播放之前
+    """
+    t = np.asarray(t, dtype=np.float64)
+    n = int(np.ceil(t[-1] / period)) + 1
+    grid = np.arange(n) * period
+    knots, values = t, (np.asarray(yaw), np.asarray(pitch))
+    if led is not None:
+        # 关闭激光的点是空行程的目标：期望位置在该点时刻跳变（与逐点发送一致），
+        # 不与前一点插值，否则激光关闭前光斑已开始移动
+        jump = np.flatnonzero(~np.asarray(led, dtype=bool)[1:]) + 1
+        knots = np.insert(t, jump, np.maximum(t[jump] - 1e-6, t[jump - 1]))
+        values = tuple(np.insert(v, jump, v[jump - 1]) for v in values)
+    shifts = [int(round((m.delay + lookahead) / period)) for m in models]
+    lead = max(shifts)
+    out = []
+    for v, model, shift, lim in zip(values, models, shifts, (YAWLIM, PITCHLIM)):
+        r = np.interp(grid, knots, v.astype(np.float64))
+        u = r + np.clip(model.inverse(r, period) - r, -max_boost, max_boost)
+        u = np.concatenate((np.full(lead - shift, r[0]), u, np.full(shift, r[-1])))
+        out.append(np.clip(np.rint(u), lim[0], lim[1]).astype(np.int16))
+    if led is not None:
+        idx = np.clip(np.searchsorted(t, grid, "right") - 1, 0, len(t) - 1)
+        led = np.asarray(led, dtype=bool)[idx]
+        # 开启推迟到舵机实际到达；关闭不推迟，零相位补偿下舵机在跳变前已开始加速
+        delayed = np.concatenate((np.full(lead, led[0]), led))
+        led = delayed & np.concatenate((led, np.full(lead, led[-1])))
+    return out[0], out[1], np.arange(n + lead) * period, led
+
+
+def path_deviation(points, reference):
+    """
+    实际路径相对期望路径的几何误差
+
+    输入参数:
+        points: Nx2实际位置
+        reference: Mx2期望路径折线
+
+    输出: (最大值, 均方根)，每个实际点到期望折线的最近距离
+    """
+    p = np.asarray(points, dtype=np.float64)[:, None, :]
+    ref = np.asarray(reference, dtype=np.float64)
+    d = trajectory.segment_distance(p, ref[None, :-1], ref[None, 1:]).min(axis=1)
+    return float(d.max()), float(np.sqrt(np.mean(d**2)))
+
+
+class LaggingServo:
+    """
+    滞后舵机仿真 - 供LowerControllerSim使用，状态帧上报滞后后的位置
+
+    advance(yaw, pitch, ms)按当前指令推进，position为当前位置
+    """
+
+    def __init__(self, models, dt=0.001, position=(5000, 5000)) -> None:
+        self.dt = dt
+        self.models = models
+        self.coef = [m.coefficients(dt) for m in models]
+        # 每轴最近delay_steps + 2个指令，history[0]为u[k-1-D]，history[1]为u[k-D]
+        self.history = [
+            deque([float(p)] * (m.delay_steps(dt) + 2), maxlen=m.delay_steps(dt) + 2)
+            for m, p in zip(models, position)
+        ]
+        self.state = [[float(p), float(p)] for p in position]  # (y[k], y[k-1])
+        self.carry = 0.0
+
+    @property
+    def position(self):
+        return tuple(s[0] for s in self.state)
+
+    def advance(self, yaw, pitch, ms):
+        """以当前指令推进ms毫秒"""
+        self.carry += ms / 1000.0
+        while self.carry >= self.dt:
+            self.carry -= self.dt
+            for axis, u in enumerate((yaw, pitch)):
+                a1, a2, b1, b2 = self.coef[axis]
+                history = self.history[axis]
+                history.append(float(u))
+                y, y_prev = self.state[axis]
+                y_next = a1 * y + a2 * y_prev + b1 * history[1] + b2 * history[0]
+                self.state[axis] = [y_next, y]
@@ -0,0 +1,133 @@
+import numpy as np
+from trajectory import segment_distance
+
+SIMPLIFY_TOL = 1.0  # 简化容差（舵机单位，舵机分辨率）
+CORNER_ANGLE = 60.0  # 转角超过该值（度）的顶点视为尖角
+CORNER_DWELL = 0.03  # 原地折返（180度）时的停留时间（秒），按转角线性缩放
+# 保留点之间的最大间距（舵机单位）：两轴舵机各自按最大速度走向目标时路径会弯曲，
+# 长直线上需要保留中间点引导
+MAX_SEGMENT = 100.0
+
+
+def rdp_mask(points, tolerance=SIMPLIFY_TOL, keep=None, max_segment=MAX_SEGMENT):
+    """
+    Ramer–Douglas–Peucker简化，每一轮同时处理所有待细分的区间
+
+    输入参数:
+        points: Nx2点序列（舵机坐标）
+        tolerance: 容差，被删除的点到简化折线的距离不超过该值
+        keep: 可选的bool数组，为True的点必须保留（如激光开关切换处）
+        max_segment: 保留点之间的最大间距，超过时在区间中点处再保留一个点
+
+    输出: bool数组，True为保留的点（首尾总是保留）
+    """
+    p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(p)
+    mask = np.zeros(n, dtype=bool)
+    if n == 0:
+        return mask
+    mask[0] = mask[-1] = True
+    if keep is not None:
+        mask |= np.asarray(keep, dtype=bool)
+    anchors = np.flatnonzero(mask)
+    a, b = anchors[:-1], anchors[1:]
+    while True:
+        inner = b - a > 1
+        a, b = a[inner], b[inner]
+        if not len(a):
+            break
+        counts = b - a - 1
+        group = np.repeat(np.arange(len(a)), counts)
+        offsets = np.cumsum(counts) - counts
+        idx = np.arange(counts.sum()) + np.repeat(a + 1 - offsets, counts)
+        dist = segment_distance(p[idx], p[a[group]], p[b[group]])
+        dmax = np.maximum.reduceat(dist, offsets)
+        # 每个区间中距离最大的点（取第一个）
+        hits = np.flatnonzero(dist == dmax[group])
+        _, first = np.unique(group[hits], return_index=True)
+        far = dmax > tolerance
+        d = p[b] - p[a]
+        split = far | (np.hypot(d[:, 0], d[:, 1]) > max_segment)
+        m = np.where(far, idx[hits[first]], (a + b) // 2)[split]
+        mask[m] = True
+        a, b = np.concatenate((a[split], m)), np.concatenate((m, b[split]))
+    return mask
+
+
+def max_deviation(points, mask):
+    """被删除的点到简化折线的最大距离"""
+    p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    anchors = np.flatnonzero(mask)
+    if len(anchors) < 2:
+        return 0.0
+    seg = np.searchsorted(anchors, np.arange(len(p)), "right") - 1
+    seg = np.clip(seg, 0, len(anchors) - 2)
+    dist = segment_distance(p, p[anchors[seg]], p[anchors[seg + 1]])
+    return float(dist.max())
+
+
+def corner_dwells(points, angle=CORNER_ANGLE, dwell=CORNER_DWELL):
+    """
+    尖角处的停留时间
+
+    输入参数:
+        points: Nx2简化后的点序列（舵机坐标）
+        angle: 尖角阈值（度）
+        dwell: 180度折返时的停留时间（秒）
+
+    输出: 每个点的停留时间（秒），非尖角及首尾点为0
+
+    调用场景: 舵机在尖角处需要稳定后再离开，否则拐角被削圆
+    """
+    p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    out = np.zeros(len(p))
+    if len(p) < 3:
+        return out
+    d_in, d_out = p[1:-1] - p[:-2], p[2:] - p[1:-1]
+    norm = np.hypot(*d_in.T) * np.hypot(*d_out.T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos = np.where(norm > 0, (d_in * d_out).sum(axis=1) / norm, 1.0)
+    turn = np.arccos(np.clip(cos, -1, 1))
+    sharp = turn > np.radians(angle)
+    out[1:-1] = np.where(sharp, dwell * turn / np.pi, 0.0)
+    return out
+
+
+def apply_dwells(t, dwell):
+    """把各点的停留时间加到时间戳上：第i点停留dwell[i]，之后的点整体推迟"""
+    t = np.asarray(t, dtype=np.float64)
+    return t + np.concatenate(([0.0], np.cumsum(dwell)[:-1]))
+
+
+def simplify(
+    yaw,
+    pitch,
+    tolerance=SIMPLIFY_TOL,
+    keep=None,
+    dwell=CORNER_DWELL,
+    max_segment=MAX_SEGMENT,
+):
+    """
+    轨迹简化：RDP删除近似共线的点，再在尖角处加入停留
+
+    输入参数:
+        yaw, pitch: 角度序列（map_points的输出）
+        tolerance: 容差（舵机单位）
+        keep: 可选的必须保留的点
+        dwell: 180度折返的停留时间，0表示不加停留
+        max_segment: 保留点之间的最大间距（舵机单位）
+
+    输出: (index, dwells)，保留点的下标与各保留点的停留时间（秒）；
+        调用方用index取yaw/pitch（及led）子序列，规划时间后用apply_dwells加入停留
+
+    调用场景: 透视变换之后、播放之前，减少串口帧数与绘制时间
+    """
+    p = np.column_stack((yaw, pitch)).astype(np.float64)
+    mask = rdp_mask(p, tolerance, keep, max_segment)
+    index = np.flatnonzero(mask)
+    dwells = corner_dwells(p[index], dwell=dwell) if dwell else np.zeros(len(index))
+    print(
+        f"[SIMPLIFY] {len(p)} -> {len(index)}点，最大偏差{max_deviation(p, mask):.2f}，"
+        f"尖角{int(np.count_nonzero(dwells))}个"
+    )
+    return index, dwells
@@ -0,0 +1,200 @@
+import threading
+import numpy as np
+from hal import image
+
+ROI_SIZE = 48  # 跟踪窗口边长（像素）
+SEARCH_STEP = 4  # 全图搜索时的降采样步长
+MIN_SCORE = 60  # 光斑像素的最小红色优势
+CORRECTION_GAIN = 0.05  # 每帧误差积分增益
+CORRECTION_LIMIT = 150  # 修正量上限（舵机单位）
+# 名义目标速度超过该值（舵机单位/秒）时不积分：舵机滞后会被当作稳态偏差累积
+MAX_TRACK_SPEED = 1000
+
+
+def frame_array(img):
+    """获取相机帧的HxWx3 RGB numpy视图（不复制）"""
+    if isinstance(img, np.ndarray):
+        return img
+    return image.image2cv(img, False, False)
+
+
+def red_score(rgb):
+    """红色激光光斑得分：R减去G、B的较大值"""
+    r = rgb[..., 0].astype(np.int16)
+    gb = np.maximum(rgb[..., 1], rgb[..., 2]).astype(np.int16)
+    return r - gb
+
+
+def apply_homography(G, x, y):
+    """用3x3矩阵映射单个点"""
+    p = G @ np.array([x, y, 1.0])
+    return p[0] / p[2], p[1] / p[2]
+
+
+def render_spot(img, x, y, radius=3, color=(255, 40, 40)):
+    """
+    在图像上绘制模拟激光光斑
+
+    输入参数:
+        img: numpy数组或带draw_circle的图像对象
+        x, y: 光斑中心（像素）
+        radius: 半径
+        color: RGB颜色
+
+    输出: 无
+
+    调用场景: 用合成画面测试光斑检测与闭环修正
+    """
+    if isinstance(img, np.ndarray):
+        yy, xx = np.ogrid[: img.shape[0], : img.shape[1]]
+        img[(xx - x) ** 2 + (yy - y) ** 2 <= radius * radius] = color
+    else:
+        img.draw_circle(int(round(x)), int(round(y)), radius, color, thickness=-1)
+
+
+class SpotTracker:
+    """
+    激光光斑跟踪与闭环修正
+
+    主要功能：
+    - 按名义目标角度预测光斑位置，只在小窗口内检测
+    - 窗口内丢失时降采样全图搜索重新捕获
+    - 检测结果换算回舵机角度，与名义目标的误差积分为修正量
+    - offset供GIMBAL_CONTROL.play_trajectory叠加到指令上
+    """
+
+    def __init__(self, G=None, roi_size: int = ROI_SIZE) -> None:
+        """
+        输入参数:
+            G: 3x3矩阵，舵机角度(yaw, pitch) -> 相机像素(x, y)，None表示未标定
+            roi_size: 跟踪窗口边长
+        """
+        self.roi_size = roi_size
+        self.G = None
+        self.Ginv = None
+        self.spot = None  # 最近一次检测到的光斑像素坐标
+        self.offset = (0, 0)  # 当前修正量(dyaw, dpitch)
+        self.integral = np.zeros(2)
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.tracked = 0
+        self.reacquired = 0
+        self.lost = 0
+        if G is not None:
+            self.set_camera_model(G)
+
+    def set_camera_model(self, G):
+        """设置舵机角度到相机像素的映射"""
+        self.G = np.asarray(G, dtype=np.float64)
+        self.Ginv = np.linalg.inv(self.G)
+
+    def reset(self):
+        """清除修正量与跟踪状态（新图形开始时）"""
+        with self.lock:
+            self.integral[:] = 0
+            self.offset = (0, 0)
+            self.spot = None
+
+    def locate(self, rgb, x0, y0, x1, y1, step=1):
+        """在窗口内检测光斑，返回亚像素质心或None"""
+        h, w = rgb.shape[:2]
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(w, int(x1)), min(h, int(y1))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        score = red_score(rgb[y0:y1:step, x0:x1:step])
+        peak = score.max()
+        if peak < MIN_SCORE:
+            return None
+        # 以峰值一半为阈值计算加权质心
+        weight = np.clip(score - peak // 2, 0, None).astype(np.float32)
+        total = weight.sum()
+        ys, xs = np.indices(weight.shape, dtype=np.float32)
+        cx = x0 + step * (weight * xs).sum() / total
+        cy = y0 + step * (weight * ys).sum() / total
+        return cx, cy
+
+    def detect(self, img, predict=None):
+        """
+        检测光斑
+
+        输入参数:
+            img: 相机帧（maix图像或numpy数组）
+            predict: 预测的光斑像素坐标，None时使用上次位置
+
+        输出: 光斑像素坐标(x, y)，未检测到返回None
+        """
+        rgb = frame_array(img)
+        center = predict if predict is not None else self.spot
+        spot = None
+        if center is not None:
+            half = self.roi_size // 2
+            x, y = center
+            spot = self.locate(rgb, x - half, y - half, x + half, y + half)
+            if spot is not None:
+                self.tracked += 1
+        if spot is None:
+            # 全图降采样搜索，再在小窗口内精确定位
+            coarse = self.locate(rgb, 0, 0, rgb.shape[1], rgb.shape[0], SEARCH_STEP)
+            if coarse is not None:
+                half = 2 * SEARCH_STEP
+                spot = self.locate(
+                    rgb,
+                    coarse[0] - half,
+                    coarse[1] - half,
+                    coarse[0] + half + 1,
+                    coarse[1] + half + 1,
+                )
+                self.reacquired += 1
+            else:
+                self.lost += 1
+        self.spot = spot
+        return spot
+
+    def measure(self, img):
+        """
+        光斑对应的舵机角度
+
+        输入参数:
+            img: 相机帧
+
+        输出: (yaw, pitch)，未标定相机模型或未检测到光斑返回None
+
+        调用场景: 舵机滞后辨识，以相机观测的实际位置作为响应
+        """
+        if self.G is None:
+            return None
+        spot = self.detect(img)
+        if spot is None:
+            return None
+        return apply_homography(self.Ginv, *spot)
+
+    def update(self, img, target, speed=0.0):
+        """
+        处理一帧：检测光斑并更新修正量
+
+        输入参数:
+            img: 相机帧
+            target: 该帧采集时刻的名义指令角度(yaw, pitch)（未叠加修正量），
+                由GIMBAL_CONTROL.target_at查找
+            speed: 该时刻名义目标的速度，超过MAX_TRACK_SPEED时只检测不积分
+
+        输出: 当前修正量(dyaw, dpitch)
+
+        调用场景: 主循环渲染阶段，激光开启且已标定相机模型时
+        """
+        if self.G is None or not self.enabled:
+            return self.offset
+        # 修正生效时光斑应落在名义目标对应的位置
+        spot = self.detect(img, apply_homography(self.G, *target))
+        if spot is None or speed > MAX_TRACK_SPEED:
+            return self.offset
+        # 光斑对应的角度与名义目标之差，积分为修正量
+        measured = apply_homography(self.Ginv, *spot)
+        error = np.array(target, dtype=np.float64) - measured
+        with self.lock:
+            self.integral += CORRECTION_GAIN * error
+            limit = CORRECTION_LIMIT
+            np.clip(self.integral, -limit, limit, out=self.integral)
+            self.offset = (int(round(self.integral[0])), int(round(self.integral[1])))
+        return self.offset
@@ -0,0 +1,95 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """
+    启动计时 - 记录各初始化阶段的起止时间，输出启动报告
+
+    主要功能：
+    - phase(name)：with语句记录一个阶段，可在多个线程中同时使用
+    - mark(name)：记录一个时间点（如第一帧显示、可以操作）
+    - 时间均相对于计时器创建时刻（main.py开始执行）
+    """
+
+    def __init__(self) -> None:
+        self.t0 = time.monotonic()
+        self.phases = []  # (名称, 开始, 结束, 线程名)
+        self.marks = {}
+        self.lock = threading.Lock()
+
+    def now(self):
+        return time.monotonic() - self.t0
+
+    @contextmanager
+    def phase(self, name):
+        start = self.now()
+        try:
+            yield
+        finally:
+            end = self.now()
+            with self.lock:
+                self.phases.append(
+                    (name, start, end, threading.current_thread().name)
+                )
+
+    def mark(self, name):
+        """记录时间点，同名只保留第一次"""
+        with self.lock:
+            self.marks.setdefault(name, self.now())
+
+    def report(self):
+        """打印启动报告，返回{阶段或时间点: 秒}"""
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+            marks = sorted(self.marks.items(), key=lambda m: m[1])
+        result = {}
+        for name, start, end, thread in phases:
+            print(
+                f"[STARTUP] {name:<10} {start:6.3f}-{end:6.3f}s "
+                f"({end - start:.3f}s, {thread})"
+            )
+            result[name] = end - start
+        for name, at in marks:
+            print(f"[STARTUP] {name:<10} {at:6.3f}s")
+            result[name] = at
+        return result
+
+
+def run_parallel(timer, tasks):
+    """
+    并行执行若干初始化任务，每个任务计为一个阶段
+
+    输入参数:
+        timer: StartupTimer
+        tasks: {名称: 无参函数}，第一个任务在调用线程执行，其余各开一个线程
+
+    输出: {名称: 返回值}
+
+    异常: 任一任务出错时，等所有任务结束后重新抛出第一个异常
+    """
+    results = {}
+    errors = []
+
+    def run(name, func):
+        try:
+            with timer.phase(name):
+                results[name] = func()
+        except BaseException as e:
+            errors.append(e)
+
+    items = list(tasks.items())
+    threads = [
+        threading.Thread(target=run, args=item, name=item[0], daemon=True)
+        for item in items[1:]
+    ]
+    for thread in threads:
+        thread.start()
+    if items:
+        run(*items[0])
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
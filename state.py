@@ -1,8 +1,74 @@
 class STATE:
+    __slots__ = (
+        "workmode",
+        "lock",
+        "connected",
+        "sleep",
+        "running",
+        "gimbal",
+        "_speaker",
+    )
+
     def __init__(self) -> None:
         self.workmode: str = "init"
         self.lock: bool = True
-        self.speaker: bool = False
         self.connected: bool = False
         self.sleep: bool = False
         self.running: bool = True
+        self.gimbal = None  # 绑定的GIMBAL_CONTROL，由其初始化时设置
+        self._speaker: bool = False  # 绑定云台之前设置的蜂鸣器状态
+
+    @property
+    def speaker(self) -> bool:
+        """
+        蜂鸣器状态（兼容旧接口）
+
+        蜂鸣器状态已移入云台指令记录；读取返回当前指令中的状态，
+        赋值等同于GIMBAL_CONTROL.publish(speaker=...)，立即发送
+        """
+        if self.gimbal is None:
+            return self._speaker
+        return self.gimbal.command.speaker
+
+    @speaker.setter
+    def speaker(self, value) -> None:
+        self._speaker = bool(value)
+        if self.gimbal is not None:
+            self.gimbal.publish(speaker=self._speaker)
+
+
+class Command:
+    """
+    云台指令记录 - 发布后不再修改，更新时整体替换
+
+    读者只需读取一次引用即可得到一致的(yaw, pitch, led, speaker)，不加锁、不阻塞
+    seq随每次发布递增，可用于判断指令是否变化
+    """
+
+    __slots__ = ("yaw", "pitch", "led", "speaker", "seq")
+
+    def __init__(self, yaw=5000, pitch=5000, led=False, speaker=False, seq=0):
+        self.yaw: int = yaw
+        self.pitch: int = pitch
+        self.led: bool = led
+        self.speaker: bool = speaker
+        self.seq: int = seq
+
+    def replace(self, yaw=None, pitch=None, led=None, speaker=None):
+        """返回修改了部分字段的新记录，None表示保持原值"""
+        return Command(
+            self.yaw if yaw is None else yaw,
+            self.pitch if pitch is None else pitch,
+            self.led if led is None else led,
+            self.speaker if speaker is None else speaker,
+            self.seq + 1,
+        )
+
+    def __iter__(self):
+        return iter((self.yaw, self.pitch, self.led, self.speaker))
+
+    def __repr__(self):
+        return (
+            f"Command(yaw={self.yaw}, pitch={self.pitch}, led={self.led}, "
+            f"speaker={self.speaker}, seq={self.seq})"
+        )
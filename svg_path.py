@@ -0,0 +1,513 @@
+import re
+import xml.etree.ElementTree as ET
+import numpy as np
+import trajectory
+
+FLATTEN_TOL = 1.0  # 曲线展平容差（舵机单位，H变换之后）
+MAX_DEPTH = 16  # 单段曲线最大细分层数
+PROBES = (0.25, 0.5, 0.75)  # 每个区间内检查误差的参数位置
+FIT_MARGIN = 0.05  # 图形缩放到屏幕时四周留出的边距（归一化）
+
+_COMMAND_RE = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]")
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TOKEN_RE = re.compile(_COMMAND_RE.pattern + "|" + _NUMBER_RE.pattern)
+_FLAG_RE = re.compile(r"[01]")
+_ARC_FLAGS = (3, 4)  # 圆弧参数中large-arc与sweep标志的位置
+# 每个命令一次消耗的参数个数
+_ARITY = {
+    "M": 2,
+    "L": 2,
+    "H": 1,
+    "V": 1,
+    "C": 6,
+    "S": 4,
+    "Q": 4,
+    "T": 2,
+    "A": 7,
+    "Z": 0,
+}
+
+
+class Subpath:
+    """
+    一条连续的子路径（激光开启期间不中断）
+
+    segments中每段为(类型, 控制点数组)：
+        ("L", [p0, p1])、("Q", [p0, c, p1])、("C", [p0, c1, c2, p1])、
+        ("A", [center, radii, (phi, theta0), (dtheta, 0)])
+    """
+
+    def __init__(self, start) -> None:
+        self.start = np.asarray(start, dtype=np.float64)
+        self.segments = []
+        self.closed = False
+
+    def end(self):
+        """子路径终点"""
+        if not self.segments:
+            return self.start
+        kind, ctrl = self.segments[-1]
+        if kind == "A":
+            return _eval_segment(kind, ctrl, np.ones(1))[0]
+        return ctrl[-1]
+
+    def transform(self, scale, offset):
+        """坐标缩放平移 p * scale + offset（原地修改）"""
+        self.start = self.start * scale + offset
+        for i, (kind, ctrl) in enumerate(self.segments):
+            ctrl = np.array(ctrl)
+            if kind == "A":
+                ctrl[0] = ctrl[0] * scale + offset
+                ctrl[1] = ctrl[1] * scale
+            else:
+                ctrl = ctrl * scale + offset
+            self.segments[i] = (kind, ctrl)
+
+
+def _tokens(d):
+    """
+    路径数据 -> 命令字母与数值的序列
+
+    圆弧的两个标志各只占一个字符，可与后面的数值连写（如"a10 10 0 0120 0"）
+    """
+    pos = 0
+    arc = None  # 当前圆弧命令已读的参数个数，不在圆弧命令中为None
+    while pos < len(d):
+        match = None
+        if arc is not None and arc % 7 in _ARC_FLAGS:
+            match = _FLAG_RE.match(d, pos)
+        match = match or _TOKEN_RE.match(d, pos)
+        if match is None:
+            pos += 1  # 分隔符（空白、逗号）
+            continue
+        pos = match.end()
+        token = match.group()
+        if _COMMAND_RE.fullmatch(token):
+            arc = 0 if token in "Aa" else None
+            yield token
+        else:
+            if arc is not None:
+                arc += 1
+            yield float(token)
+
+
+def _arc_center(p0, p1, rx, ry, phi, large, sweep):
+    """
+    SVG端点参数化圆弧 -> 中心参数化（SVG规范F.6.5）
+
+    输出: (center, radii, theta0, dtheta)，半径过小时按规范放大
+    """
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    dx, dy = (p0 - p1) / 2
+    x1 = cos_phi * dx + sin_phi * dy
+    y1 = -sin_phi * dx + cos_phi * dy
+    rx, ry = abs(rx), abs(ry)
+    scale = x1 * x1 / (rx * rx) + y1 * y1 / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * np.sqrt(scale), ry * np.sqrt(scale)
+    num = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    den = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    coef = np.sqrt(max(0.0, num / den)) if den else 0.0
+    if large == sweep:
+        coef = -coef
+    cx1, cy1 = coef * rx * y1 / ry, -coef * ry * x1 / rx
+    center = np.array(
+        [
+            cos_phi * cx1 - sin_phi * cy1 + (p0[0] + p1[0]) / 2,
+            sin_phi * cx1 + cos_phi * cy1 + (p0[1] + p1[1]) / 2,
+        ]
+    )
+    theta0 = np.arctan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    theta1 = np.arctan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+    dtheta = theta1 - theta0
+    if sweep and dtheta < 0:
+        dtheta += 2 * np.pi
+    elif not sweep and dtheta > 0:
+        dtheta -= 2 * np.pi
+    return center, np.array([rx, ry]), theta0, dtheta
+
+
+def parse_path(d):
+    """
+    解析SVG路径数据（path元素的d属性）
+
+    输入参数:
+        d: 路径字符串，支持M L H V C S Q T A Z及其相对坐标形式
+
+    输出: Subpath列表（SVG坐标）
+
+    异常: ValueError，路径格式错误
+    """
+    subpaths = []
+    current = None
+    pos = np.zeros(2)
+    start = np.zeros(2)
+    last_ctrl = None  # 上一段的第二控制点，用于S/T的反射
+    last_kind = None
+    command = None
+    tokens = list(_tokens(d))
+    i = 0
+    while i < len(tokens):
+        if isinstance(tokens[i], str):
+            command = tokens[i]
+            i += 1
+        elif command is None or command in "Zz":
+            raise ValueError(f"路径数据缺少命令: {d[:32]!r}")
+        upper = command.upper()
+        relative = command != upper
+        arity = _ARITY[upper]
+        args = tokens[i : i + arity]
+        if len(args) < arity or any(isinstance(a, str) for a in args):
+            raise ValueError(f"命令{command}参数不足")
+        i += arity
+        base = pos if relative else np.zeros(2)
+
+        if upper == "Z":
+            if current is not None:
+                if np.any(pos != start):
+                    current.segments.append(("L", np.array([pos, start])))
+                current.closed = True
+            pos = start.copy()
+            current = None
+            last_kind = upper
+            continue
+        if upper == "M":
+            pos = base + args
+            start = pos.copy()
+            current = Subpath(pos)
+            subpaths.append(current)
+            # M之后的隐式坐标按L处理
+            command = "l" if relative else "L"
+            last_kind = upper
+            continue
+        if current is None:
+            current = Subpath(pos)
+            subpaths.append(current)
+            start = pos.copy()
+
+        if upper == "L" or upper == "H" or upper == "V":
+            if upper == "H":
+                end = np.array([base[0] + args[0], pos[1]])
+            elif upper == "V":
+                end = np.array([pos[0], base[1] + args[0]])
+            else:
+                end = base + args
+            current.segments.append(("L", np.array([pos, end])))
+        elif upper == "C" or upper == "S":
+            if upper == "S":
+                c1 = 2 * pos - last_ctrl if last_kind in ("C", "S") else pos
+                c2, end = base + args[0:2], base + args[2:4]
+            else:
+                c1, c2, end = base + args[0:2], base + args[2:4], base + args[4:6]
+            current.segments.append(("C", np.array([pos, c1, c2, end])))
+            last_ctrl = c2
+        elif upper == "Q" or upper == "T":
+            if upper == "T":
+                c = 2 * pos - last_ctrl if last_kind in ("Q", "T") else pos
+                end = base + args[0:2]
+            else:
+                c, end = base + args[0:2], base + args[2:4]
+            current.segments.append(("Q", np.array([pos, c, end])))
+            last_ctrl = c
+        else:
+            rx, ry, angle, large, sweep = args[:5]
+            end = base + args[5:7]
+            if rx == 0 or ry == 0:
+                current.segments.append(("L", np.array([pos, end])))
+            elif np.any(end != pos):
+                phi = np.radians(angle)
+                center, radii, theta0, dtheta = _arc_center(
+                    pos, end, rx, ry, phi, bool(large), bool(sweep)
+                )
+                ctrl = np.array([center, radii, [phi, theta0], [dtheta, 0.0]])
+                current.segments.append(("A", ctrl))
+        pos = end
+        last_kind = upper
+    return [s for s in subpaths if s.segments]
+
+
+def parse_points(text, closed=False):
+    """
+    解析polyline/polygon的points属性
+
+    输入参数:
+        text: "x1,y1 x2,y2 ..."
+        closed: 是否闭合（polygon）
+
+    输出: Subpath，点数不足两个返回None
+    """
+    values = np.array([float(v) for v in _NUMBER_RE.findall(text)])
+    pts = values[: len(values) // 2 * 2].reshape(-1, 2)
+    if len(pts) < 2:
+        return None
+    subpath = Subpath(pts[0])
+    if closed and np.any(pts[-1] != pts[0]):
+        pts = np.vstack((pts, pts[:1]))
+    subpath.segments = [("L", pts[i : i + 2]) for i in range(len(pts) - 1)]
+    subpath.closed = closed
+    return subpath
+
+
+def _local(tag):
+    """去掉XML命名空间"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def load_svg(path, fit=True, margin=FIT_MARGIN):
+    """
+    读取SVG文件中的path、polyline、polygon、line元素
+
+    输入参数:
+        path: SVG文件路径
+        fit: 是否按viewBox（没有时按图形外接框）等比缩放到归一化屏幕坐标[0, 1]
+        margin: 缩放时四周留出的边距
+
+    输出: Subpath列表
+
+    元素的transform属性与样式不处理，按原始坐标读取
+    """
+    root = ET.parse(path).getroot()
+    subpaths = []
+    for element in root.iter():
+        tag = _local(element.tag)
+        if tag == "path":
+            subpaths.extend(parse_path(element.get("d", "")))
+        elif tag in ("polyline", "polygon"):
+            subpath = parse_points(element.get("points", ""), tag == "polygon")
+            if subpath is not None:
+                subpaths.append(subpath)
+        elif tag == "line":
+            x1, y1, x2, y2 = (
+                float(element.get(k, 0)) for k in ("x1", "y1", "x2", "y2")
+            )
+            subpaths.append(parse_points(f"{x1},{y1} {x2},{y2}"))
+    if fit and subpaths:
+        box = root.get("viewBox")
+        if box:
+            x, y, w, h = (float(v) for v in _NUMBER_RE.findall(box)[:4])
+            lo, size = np.array([x, y]), np.array([w, h])
+        else:
+            corners = np.vstack([bounds(s) for s in subpaths])
+            lo = corners.min(axis=0)
+            size = corners.max(axis=0) - lo
+        scale = (1 - 2 * margin) / max(size.max(), 1e-9)
+        offset = margin + ((1 - 2 * margin) - size * scale) / 2 - lo * scale
+        for subpath in subpaths:
+            subpath.transform(scale, offset)
+    return subpaths
+
+
+def bounds(subpath, samples=16):
+    """子路径的近似外接框，输出2x2 [[xmin, ymin], [xmax, ymax]]"""
+    t = np.linspace(0, 1, samples)
+    pts = np.vstack(
+        [subpath.start] + [_eval_segment(k, c, t) for k, c in subpath.segments]
+    )
+    return np.vstack((pts.min(axis=0), pts.max(axis=0)))
+
+
+def _eval_segment(kind, ctrl, t):
+    """在参数t（0..1数组）处计算线段/曲线上的点，输出Nx2"""
+    t = t[:, None]
+    s = 1 - t
+    if kind == "L":
+        return s * ctrl[0] + t * ctrl[1]
+    if kind == "Q":
+        return s * s * ctrl[0] + 2 * s * t * ctrl[1] + t * t * ctrl[2]
+    if kind == "C":
+        return (
+            s**3 * ctrl[0]
+            + 3 * s * s * t * ctrl[1]
+            + 3 * s * t * t * ctrl[2]
+            + t**3 * ctrl[3]
+        )
+    center, radii, (phi, theta0), (dtheta, _) = ctrl
+    theta = theta0 + dtheta * t[:, 0]
+    x, y = radii[0] * np.cos(theta), radii[1] * np.sin(theta)
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    return np.column_stack(
+        (
+            center[0] + cos_phi * x - sin_phi * y,
+            center[1] + sin_phi * x + cos_phi * y,
+        )
+    )
+
+
+def servo_mapper(H, grid=None):
+    """
+    返回归一化屏幕坐标 -> 舵机角度（浮点，未取整）的映射函数
+
+    输入参数:
+        H: 3x3透视变换矩阵
+        grid: 可选的多点标定模型
+
+    输出: 函数f(points) -> Nx2 float64
+    """
+    if grid is not None:
+        return lambda pts: np.column_stack(grid.lookup(pts)).astype(np.float64)
+    H = np.asarray(H, dtype=np.float64)
+
+    def mapper(pts):
+        p = np.asarray(pts, dtype=np.float64) @ H[:, :2].T + H[:, 2]
+        return p[:, :2] / p[:, 2:]
+
+    return mapper
+
+
+def flatten_segment(kind, ctrl, mapper, tolerance=FLATTEN_TOL, max_depth=MAX_DEPTH):
+    """
+    自适应展平一段曲线：在映射后的舵机坐标中，区间内的检查点偏离弦线超过容差时二分
+
+    输入参数:
+        kind, ctrl: Subpath中的一段
+        mapper: servo_mapper返回的映射函数
+        tolerance: 容差（舵机单位）
+        max_depth: 最大细分层数
+
+    输出: 参数t的升序数组（不含0，含1）
+
+    调用场景: 点数随曲线复杂度和屏幕上的实际尺寸变化，直线段（透视变换下）只保留端点
+    """
+    # 圆弧先按不超过90度切分，避免检查点恰好落在弦上
+    pieces = 1
+    if kind == "A":
+        pieces = max(1, int(np.ceil(abs(ctrl[3][0]) / (np.pi / 2))))
+    edges = np.linspace(0.0, 1.0, pieces + 1)
+    a, b = edges[:-1], edges[1:]
+    probes = np.array(PROBES)
+    accepted = []
+    for depth in range(max_depth + 1):
+        ts = np.concatenate((a, b, (a[:, None] + (b - a)[:, None] * probes).ravel()))
+        mapped = mapper(_eval_segment(kind, ctrl, ts))
+        n = len(a)
+        pa, pb = mapped[:n], mapped[n : 2 * n]
+        pm = mapped[2 * n :].reshape(n, len(probes), 2)
+        err = trajectory.segment_distance(pm, pa[:, None], pb[:, None]).max(axis=1)
+        split = (err > tolerance) if depth < max_depth else np.zeros(n, dtype=bool)
+        accepted.append(b[~split])
+        if not split.any():
+            break
+        a, b = a[split], b[split]
+        m = (a + b) / 2
+        a, b = np.concatenate((a, m)), np.concatenate((m, b))
+    return np.sort(np.concatenate(accepted))
+
+
+def flatten(subpath, mapper, tolerance=FLATTEN_TOL):
+    """
+    展平整条子路径
+
+    输出: float32 Nx2归一化屏幕坐标，首点为子路径起点
+    """
+    parts = [subpath.start[None]]
+    for kind, ctrl in subpath.segments:
+        t = flatten_segment(kind, ctrl, mapper, tolerance)
+        parts.append(_eval_segment(kind, ctrl, t))
+    return trajectory._as_points(np.vstack(parts))
+
+
+def order_paths(paths, mapper, start=None):
+    """
+    排列子路径顺序以缩短激光关闭时的空行程（贪心最近邻）
+
+    输入参数:
+        paths: [(Nx2点数组, 是否闭合)]
+        mapper: 映射函数，在舵机坐标中计算距离
+        start: 起始位置（舵机坐标），None表示从第一条子路径开始
+
+    输出: 排好序的点数组列表；开放路径可反向绘制，闭合路径可从任一顶点开始
+
+    调用场景: 含多个不相连笔画的图形（文字、图标）
+    """
+    mapped = [mapper(pts) for pts, _ in paths]
+    remaining = list(range(len(paths)))
+    ordered = []
+    pos = None if start is None else np.asarray(start, dtype=np.float64)
+    while remaining:
+        best = None
+        for j in remaining:
+            pts, closed = paths[j]
+            m = mapped[j]
+            if pos is None:
+                candidate = (0.0, j, 0, False)
+            elif closed:
+                d = np.hypot(*(m - pos).T)
+                k = int(np.argmin(d))
+                candidate = (d[k], j, k, False)
+            else:
+                d0, d1 = np.hypot(*(m[0] - pos)), np.hypot(*(m[-1] - pos))
+                candidate = (d1, j, 0, True) if d1 < d0 else (d0, j, 0, False)
+            if best is None or candidate[0] < best[0]:
+                best = candidate
+        _, j, k, reverse = best
+        pts, closed = paths[j]
+        m = mapped[j]
+        if reverse:
+            pts, m = pts[::-1], m[::-1]
+        elif k:
+            # 闭合路径首尾重合，去掉末点后旋转再闭合
+            pts = np.vstack((pts[k:-1], pts[: k + 1]))
+            m = np.vstack((m[k:-1], m[: k + 1]))
+        ordered.append(pts)
+        pos = m[-1]
+        remaining.remove(j)
+    return ordered
+
+
+def compile_paths(subpaths, H, grid=None, tolerance=FLATTEN_TOL, start=None):
+    """
+    编译矢量图形为可直接发送的舵机轨迹
+
+    输入参数:
+        subpaths: Subpath列表（归一化屏幕坐标）
+        H: 3x3透视变换矩阵
+        grid: 可选的多点标定模型
+        tolerance: 展平容差（舵机单位）
+        start: 当前云台位置(yaw, pitch)，用于选择第一条子路径
+
+    输出: (yaw, pitch, led)，int16角度数组与激光开关数组；
+        子路径之间插入两个激光关闭的点：先在上一条的终点关闭激光，再移动到下一条的起点；
+        时间戳由playlist.retime_blanks调整（关闭后再移动，到位并稳定后再开启）
+
+    调用场景: 屏幕"file"按钮选择.svg文件
+    """
+    mapper = servo_mapper(H, grid)
+    paths = [(flatten(s, mapper, tolerance), s.closed) for s in subpaths]
+    ordered = order_paths(paths, mapper, start)
+    parts = []
+    led = []
+    for i, pts in enumerate(ordered):
+        if i:
+            parts.append(np.vstack((parts[-1][-1:], pts[:1])))
+            led.append([False, False])
+        parts.append(pts)
+        led.append(np.ones(len(pts), dtype=bool))
+    if not parts:
+        empty = np.zeros(0, dtype=np.int16)
+        return empty, empty, np.zeros(0, dtype=bool)
+    yaw, pitch = trajectory.map_points(H, np.vstack(parts), grid)
+    return yaw, pitch, np.concatenate(led)
+
+
+def blank_travel(yaw, pitch, led):
+    """激光关闭时的移动距离之和（舵机单位），用于比较子路径排序效果"""
+    p = np.column_stack((yaw, pitch)).astype(np.float64)
+    d = np.hypot(*np.diff(p, axis=0).T)
+    return float(d[~np.asarray(led[1:], dtype=bool)].sum())
+
+
+def compile_svg(path, H, grid=None, tolerance=FLATTEN_TOL, start=None):
+    """
+    读取SVG文件并编译为舵机轨迹
+
+    输入参数:
+        path: SVG文件路径
+        其余参数同compile_paths
+
+    输出: (yaw, pitch, led)
+    """
+    yaw, pitch, led = compile_paths(load_svg(path), H, grid, tolerance, start)
+    print(
+        f"[SVG] {path}: {len(yaw)}点，空行程{blank_travel(yaw, pitch, led):.0f}"
+    )
+    return yaw, pitch, led
@@ -0,0 +1,216 @@
+import itertools
+import time
+from array import array
+
+# 事件类型
+EV_TOUCH = 0  # 触摸屏按下（SCREEN.listen）
+EV_JOB_START = 1  # 绘制任务开始执行
+EV_PLAY_START = 2  # 轨迹播放开始
+EV_POINT = 3  # 轨迹点发送（value为计划发送时间，纳秒）
+EV_SENDCMD = 4  # sendcmd调用
+EV_UART_WRITE = 5  # 发送线程写串口
+EV_FRAME = 6  # 主循环显示一帧
+EVENT_NAMES = [
+    "touch",
+    "job_start",
+    "play_start",
+    "point",
+    "sendcmd",
+    "uart_write",
+    "frame",
+]
+
+# 直方图分桶（毫秒）
+HIST_BINS_MS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class Telemetry:
+    """
+    低开销时间戳记录器
+
+    主要功能：
+    - 单调时钟时间戳写入预分配的环形缓冲区，记录时不分配内存
+    - 关闭时热路径只多一次属性判断（调用方先检查enabled）
+    - 统计各阶段延迟直方图、帧间抖动、实际与计划点速率
+    - 导出CSV便于离线分析
+    """
+
+    def __init__(self, size: int = 65536) -> None:
+        self.size = size
+        self.enabled = False
+        self.event = array("b", bytes(size))
+        self.stamp = array("q", bytes(8 * size))
+        self.value = array("q", bytes(8 * size))
+        # 每个槽位记录的序号+1，最后写入：读者据此判断记录是否完整
+        self.seq = array("q", bytes(8 * size))
+        self.counter = itertools.count()  # next()在CPython下是原子操作
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.counter = itertools.count()
+        self.seq = array("q", bytes(8 * self.size))
+
+    @property
+    def total(self):
+        """已记录的事件总数（并发写入时取已完成的最大序号，不会倒退）"""
+        return max(self.seq)
+
+    def mark(self, event, value=0):
+        """记录一个事件，调用前应先检查enabled"""
+        n = next(self.counter)
+        i = n % self.size
+        self.event[i] = event
+        self.stamp[i] = time.monotonic_ns()
+        self.value[i] = value
+        self.seq[i] = n + 1
+
+    def records(self):
+        """
+        按时间顺序返回[(event, stamp_ns, value)]，只包含环形缓冲区中仍保留的记录
+
+        正在写入或已被新记录覆盖的槽位（序号不符）跳过
+        """
+        total = self.total
+        start = max(0, total - self.size)
+        seq = self.seq
+        out = []
+        for n in range(start, total):
+            i = n % self.size
+            if seq[i] == n + 1:
+                out.append((self.event[i], self.stamp[i], self.value[i]))
+        out.sort(key=lambda r: r[1])
+        return out
+
+    @staticmethod
+    def summarize(samples_ms):
+        """统计一组毫秒数据：分位数与直方图"""
+        if not samples_ms:
+            return {"count": 0}
+        data = sorted(samples_ms)
+        count = len(data)
+
+        def pct(p):
+            return data[min(count - 1, int(p * count))]
+
+        hist = [0] * (len(HIST_BINS_MS) + 1)
+        for v in data:
+            k = 0
+            while k < len(HIST_BINS_MS) and v > HIST_BINS_MS[k]:
+                k += 1
+            hist[k] += 1
+        return {
+            "count": count,
+            "mean": sum(data) / count,
+            "p50": pct(0.5),
+            "p90": pct(0.9),
+            "p99": pct(0.99),
+            "max": data[-1],
+            "bins_ms": HIST_BINS_MS,
+            "hist": hist,
+        }
+
+    def report(self):
+        """
+        生成统计报告
+
+        输入参数: 无
+
+        输出: 字典，包含各阶段延迟、各事件的间隔抖动、轨迹播放的实际/计划点速率
+
+        调用场景: 运行一段时间后查看时间都花在哪里
+        """
+        recs = self.records()
+        by_event = {name: [] for name in EVENT_NAMES}
+        for ev, stamp, value in recs:
+            by_event[EVENT_NAMES[ev]].append(stamp)
+
+        def intervals(stamps):
+            return [(b - a) / 1e6 for a, b in zip(stamps, stamps[1:])]
+
+        # 阶段延迟：触摸 -> 任务开始 -> 播放开始 -> 第一个点
+        stages = {
+            "touch_to_job": (EV_TOUCH, EV_JOB_START),
+            "job_to_play": (EV_JOB_START, EV_PLAY_START),
+            "play_to_first_point": (EV_PLAY_START, EV_POINT),
+            "touch_to_first_point": (EV_TOUCH, EV_POINT),
+        }
+        latency = {}
+        for name, (a, b) in stages.items():
+            samples = []
+            pending = None
+            for ev, stamp, _ in recs:
+                if ev == a:
+                    pending = stamp
+                elif ev == b and pending is not None:
+                    samples.append((stamp - pending) / 1e6)
+                    pending = None
+            latency[name] = self.summarize(samples)
+
+        # 播放：实际点速率与计划点速率，及相对计划时间的滞后
+        plays = []
+        current = None
+        for ev, stamp, value in recs:
+            if ev == EV_PLAY_START:
+                current = {"start": stamp, "points": []}
+                plays.append(current)
+            elif ev == EV_POINT and current is not None:
+                current["points"].append((stamp - current["start"], value))
+        playback = []
+        lateness = []
+        for play in plays:
+            pts = play["points"]
+            if len(pts) < 2:
+                continue
+            actual = (pts[-1][0] - pts[0][0]) / 1e9
+            planned = (pts[-1][1] - pts[0][1]) / 1e9
+            playback.append(
+                {
+                    "points": len(pts),
+                    "achieved_rate": (len(pts) - 1) / actual if actual else 0.0,
+                    "planned_rate": (len(pts) - 1) / planned if planned else 0.0,
+                }
+            )
+            lateness += [(t - p) / 1e6 for t, p in pts]
+
+        return {
+            "records": len(recs),
+            "dropped": max(0, self.total - self.size),
+            "latency_ms": latency,
+            "interval_ms": {
+                name: self.summarize(intervals(stamps))
+                for name, stamps in by_event.items()
+                if len(stamps) > 1
+            },
+            "playback": playback,
+            "point_lateness_ms": self.summarize(lateness),
+        }
+
+    def dump(self, path):
+        """
+        导出原始记录为CSV（event,stamp_ns,value）
+
+        输入参数:
+            path: 输出文件路径
+
+        输出: 是否成功
+        """
+        try:
+            recs = self.records()
+            with open(path, "w") as file:
+                file.write("event,stamp_ns,value\n")
+                for ev, stamp, value in recs:
+                    file.write(f"{EVENT_NAMES[ev]},{stamp},{value}\n")
+            print(f"[TELEMETRY] 已导出{len(recs)}条记录: {path}")
+            return True
+        except Exception as e:
+            print(f"[TELEMETRY] 导出失败: {e}")
+            return False
+
+
+# 全局实例，运行时通过TELEMETRY.enable()/disable()开关
+TELEMETRY = Telemetry()
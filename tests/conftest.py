@@ -0,0 +1,13 @@
+"""
+测试公共配置：使用模拟硬件，gimbal_laser_control不可用时以hal.SimGimbalLaser代替
+"""
+
+import os
+import sys
+
+os.environ.setdefault("GIMBAL_HAL", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hal  # noqa: E402
+
+hal.install_sim_gimbal_laser()
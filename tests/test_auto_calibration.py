@@ -0,0 +1,89 @@
+"""
+自动标定测试：模拟相机按已知的相机模型G渲染目标框与激光光斑，
+验证AutoCalibrator.run恢复的dst_points与H，以及粗扫描中的误检被剔除
+"""
+
+import cv2
+import numpy as np
+
+from auto_calibration import AutoCalibrator, order_corners
+from gimbal_control import GIMBAL_CONTROL
+from hal import SimImage
+from spot_tracker import apply_homography, render_spot
+from state import STATE
+from trajectory import perspective_transform
+
+SRC = [[0, 0], [1, 0], [1, 1], [0, 1]]
+# 舵机角度 -> 相机像素，带轻微透视
+G = np.array([[0.3, 0.01, -1180.0], [0.005, 0.22, -860.0], [0.0, 0.0, 1.0]])
+DST = [[4400, 4300], [5600, 4350], [5650, 5700], [4350, 5650]]  # 真实的角点角度
+OUTLIER_CALL = 8  # 第8次取帧（粗扫描中）出现误检光斑
+
+
+class Cancel:
+    """不取消，等待立即返回（模拟舵机瞬间到位）"""
+
+    cancelled = False
+
+    def sleep(self, seconds):
+        return False
+
+
+class Scene:
+    """浅色背景上的深色目标框，激光开启时在G(当前角度)处绘制光斑"""
+
+    def __init__(self, gimbal):
+        self.gimbal = gimbal
+        self.calls = 0
+        corners = [apply_homography(G, *d) for d in DST]
+        self.background = np.full((480, 640, 3), 200, dtype=np.uint8)
+        cv2.fillPoly(self.background, [np.rint(corners).astype(np.int32)], (30,) * 3)
+
+    def grab(self, after, timeout=1.0):
+        self.calls += 1
+        img = SimImage(0, 0, data=self.background.copy())
+        command = self.gimbal.command
+        if command.led:
+            if self.calls == OUTLIER_CALL:
+                render_spot(img.data, 600.0, 30.0)
+            else:
+                render_spot(img.data, *apply_homography(G, command.yaw, command.pitch))
+        return img
+
+
+def test_run_recovers_calibration():
+    gimbal = GIMBAL_CONTROL(STATE(), port="/dev/sim", async_chime=True)
+    scene = Scene(gimbal)
+    calibrator = AutoCalibrator(gimbal, scene.grab)
+    guess = [[4450, 4350], [5550, 4400], [5600, 5650], [4400, 5600]]
+    result = calibrator.run(SRC, guess, Cancel())
+    assert result is not None
+    dst, H, G_fit = result
+    np.testing.assert_allclose(dst, DST, atol=4)
+    expected = perspective_transform(SRC, DST)
+    for u, v in [(0, 0), (1, 1), (0.5, 0.5), (0.25, 0.75)]:
+        np.testing.assert_allclose(
+            apply_homography(H, u, v), apply_homography(expected, u, v), atol=4
+        )
+    # 误检的光斑不影响相机模型
+    assert scene.calls > OUTLIER_CALL
+    np.testing.assert_allclose(
+        apply_homography(G_fit, 5000, 5000), apply_homography(G, 5000, 5000), atol=1
+    )
+
+
+def test_order_corners_rotated_square():
+    diamond = [[300, 100], [500, 300], [300, 500], [100, 300]]
+    ordered = order_corners(diamond[::-1], SRC)
+    assert len({tuple(p) for p in ordered.tolist()}) == 4
+    # 顺序沿边界一圈（相邻角点相邻），不会出现对角交叉
+    for i in range(4):
+        a, b = ordered[i], ordered[(i + 1) % 4]
+        assert np.hypot(*(a - b)) < 300
+
+
+def test_order_corners_axis_aligned():
+    ordered = order_corners([[510, 400], [100, 90], [90, 410], [500, 100]], SRC)
+    np.testing.assert_array_equal(
+        ordered, [[100, 90], [500, 100], [510, 400], [90, 410]]
+    )
@@ -0,0 +1,50 @@
+"""
+多点标定模型测试：非线性的屏幕->角度映射下，网格模型比四角透视变换更准，
+边缘测量点缺失时查找表仍覆盖整个标定区域
+"""
+
+import numpy as np
+
+from calibration_grid import CalibrationGrid
+from trajectory import perspective_transform, transform_points
+
+SRC = [[0, 0], [1, 0], [1, 1], [0, 1]]
+
+
+def truth(u, v):
+    """舵机与镜头的非线性：四角准确，中间向外弯曲80个单位"""
+    yaw = 4000 + 2000 * u + 80 * np.sin(np.pi * v)
+    pitch = 4000 + 2000 * v + 80 * np.sin(np.pi * u)
+    return yaw, pitch
+
+
+DST = [[int(round(a)), int(round(b))] for a, b in (truth(*p) for p in SRC)]
+g = np.linspace(0, 1, 5)
+U, V = (a.ravel() for a in np.meshgrid(g, g))
+SAMPLES = np.column_stack((U, V, *truth(U, V)))
+d = np.linspace(0, 1, 41)
+POINTS = np.column_stack([a.ravel() for a in np.meshgrid(d, d)])
+
+
+def max_error(yaw, pitch):
+    yaw_true, pitch_true = truth(POINTS[:, 0], POINTS[:, 1])
+    return np.hypot(yaw - yaw_true, pitch - pitch_true).max()
+
+
+def test_grid_beats_homography():
+    H = perspective_transform(SRC, DST)
+    homography = max_error(*transform_points(H, POINTS))
+    grid = max_error(*CalibrationGrid.fit(SAMPLES, DST).lookup(POINTS))
+    assert homography > 100
+    assert grid < 5
+
+
+def test_missing_edge_row_does_not_shrink_domain():
+    partial = SAMPLES[SAMPLES[:, 1] > 0]  # 上边一行测量失败
+    grid = CalibrationGrid.fit(partial, DST, src_points=SRC)
+    np.testing.assert_allclose(grid.lo, (0, 0))
+    np.testing.assert_allclose(grid.hi, (1, 1))
+    # 上边缘的点按模型外推，而不是被压到第二行上
+    _, pitch = grid.lookup([[0.5, 0.0]])
+    assert abs(pitch[0] - truth(0.5, 0.0)[1]) < 30
+    assert max_error(*grid.lookup(POINTS)) < 60
@@ -0,0 +1,28 @@
+"""
+文本点文件解析测试：逐行两个数值，注释与空行跳过，格式错误报告行号
+"""
+
+import numpy as np
+import pytest
+
+import point_file
+
+
+def parse(path, text):
+    path.write_text(text)
+    return np.concatenate(list(point_file.iter_text_chunks(str(path))))
+
+
+def test_comments_and_blank_lines_are_skipped(tmp_path):
+    pts = parse(tmp_path / "a.txt", "# x,y\n\n0.1,0.2\n0.3 0.4\n\n0.5,0.6")
+    np.testing.assert_allclose(pts, [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]], rtol=1e-6)
+
+
+def test_odd_line_reports_line_number(tmp_path):
+    with pytest.raises(ValueError, match="第3行"):
+        parse(tmp_path / "b.txt", "0.1,0.2\n\n0.3\n0.5,0.6\n")
+
+
+def test_header_line_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="第1行"):
+        parse(tmp_path / "c.txt", "x,y\n0.5,0.6\n")
@@ -0,0 +1,84 @@
+"""
+舵机滞后测试：轨迹经块帧上传到带LaggingServo的LowerControllerSim，
+由状态帧上报的位置辨识模型，并验证前馈补偿后倍速绘制的路径误差更小
+"""
+
+import numpy as np
+import pytest
+
+import servo_lag
+import trajectory
+from gimbal_control import GIMBAL_CONTROL, LowerControllerSim
+from motion_planner import MotionPlanner
+from servo_lag import LaggingServo, LagModel
+from state import STATE
+
+TRUE = (
+    LagModel(2, wn=40.0, zeta=0.8, delay=0.02),
+    LagModel(2, wn=34.0, zeta=0.8, delay=0.02),
+)
+H = np.array([[1000.0, 0, 4500], [0, 1000.0, 4500], [0, 0, 1]])
+TAIL_MS = 300  # 最后一点之后继续记录，舵机稳定
+STATUS_MS = 10  # 状态帧周期，采样率需远高于舵机带宽（约6Hz）
+
+
+def run(gimbal, yaw, pitch, t):
+    """
+    换上新的带滞后舵机的模拟下位机，上传轨迹并按1ms推进模拟时钟，
+    返回状态帧的(时刻, yaw, pitch)序列
+    """
+    servo = LaggingServo(TRUE, position=(yaw[0], pitch[0]))
+    sim = LowerControllerSim(len(yaw), STATUS_MS, servo)
+    gimbal.ser.sim = sim
+    ms = np.rint(np.asarray(t) * 1000).astype(int)
+    gimbal.upload_trajectory(yaw, pitch, np.diff(ms, prepend=0).tolist())
+    samples = []
+    for _ in range(ms[-1] + TAIL_MS):
+        sim.step(1)
+        stamp = gimbal.feedback_time
+        gimbal.feed(sim.read())
+        if gimbal.feedback_time != stamp:  # 收到状态帧（块应答不带位置）
+            samples.append((sim.clock / 1000, *gimbal.feedback))
+    return np.array(samples, dtype=np.float64)
+
+
+@pytest.fixture(scope="module")
+def gimbal():
+    gimbal = GIMBAL_CONTROL(STATE(), port="/dev/sim", async_chime=True)
+    gimbal.wait_chime()  # 提示音结束后再换模拟器，避免单点帧混入
+    return gimbal
+
+
+@pytest.fixture(scope="module")
+def models(gimbal):
+    yaw, pitch, t = servo_lag.excitation(4.0)
+    meas = run(gimbal, yaw, pitch, t)
+    u, y = servo_lag.resample(
+        t, np.column_stack((yaw, pitch)), meas[:, 0], meas[:, 1:]
+    )
+    return tuple(
+        servo_lag.identify(u[:, axis], y[:, axis], servo_lag.LAG_DT, order=2)[0]
+        for axis in range(2)
+    )
+
+
+def test_identify_recovers_model(models):
+    for model, true in zip(models, TRUE):
+        assert model.wn == pytest.approx(true.wn, rel=0.15)
+        assert model.zeta == pytest.approx(true.zeta, abs=0.15)
+        # 延迟按LAG_DT步长搜索，允许相差一步
+        assert model.delay == pytest.approx(true.delay, abs=1.5 * servo_lag.LAG_DT)
+
+
+@pytest.mark.parametrize("shape", ["rectangle", "circle"])
+def test_feedforward_at_double_speed_beats_plain(gimbal, models, shape):
+    points = trajectory.SHAPES[shape](*trajectory.SHAPE_PARAMS[shape])
+    yaw, pitch = trajectory.map_points(H, points)
+    t = MotionPlanner().plan(yaw, pitch)
+    reference = np.column_stack((yaw, pitch))
+    plain = servo_lag.path_deviation(run(gimbal, yaw, pitch, t)[:, 1:], reference)
+    fast = servo_lag.feedforward(yaw, pitch, t / 2, models)
+    compensated = servo_lag.path_deviation(run(gimbal, *fast[:3])[:, 1:], reference)
+    assert fast[2][-1] < t[-1]  # 确实更快
+    assert compensated[0] < plain[0]
+    assert compensated[1] < plain[1]
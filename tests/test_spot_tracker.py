@@ -0,0 +1,62 @@
+"""
+激光光斑跟踪测试：在合成的SimImage画面上绘制光斑，
+验证窗口内检测、跳变后的全图重新捕获与修正量的方向和大小
+"""
+
+import numpy as np
+
+from hal import SimImage
+from spot_tracker import (
+    CORRECTION_GAIN,
+    MAX_TRACK_SPEED,
+    SpotTracker,
+    apply_homography,
+    render_spot,
+)
+
+# 舵机角度 -> 相机像素：3000-7000映射到640x480画面
+G = np.array([[0.16, 0.0, -480.0], [0.0, 0.12, -360.0], [0.0, 0.0, 1.0]])
+TARGET = (5000, 5000)  # 对应像素(320, 240)
+
+
+def frame(*spots):
+    img = SimImage(640, 480)
+    img.data[:] = np.linspace(0, 64, 640, dtype=np.uint8)[None, :, None]
+    for x, y in spots:
+        render_spot(img, x, y)
+    return img
+
+
+def test_spot_found_in_roi():
+    tracker = SpotTracker(G)
+    spot = tracker.detect(frame((324, 237)), apply_homography(G, *TARGET))
+    assert tracker.tracked == 1 and tracker.reacquired == 0
+    np.testing.assert_allclose(spot, (324, 237), atol=0.5)
+
+
+def test_reacquire_after_jump():
+    tracker = SpotTracker(G)
+    tracker.detect(frame((320, 240)))
+    assert tracker.reacquired == 1  # 首帧没有预测位置，全图搜索
+    spot = tracker.detect(frame((100, 400)))  # 远离上次位置，窗口内找不到
+    assert tracker.reacquired == 2 and tracker.tracked == 0
+    np.testing.assert_allclose(spot, (100, 400), atol=1.0)
+    tracker.detect(frame((102, 401)))
+    assert tracker.tracked == 1  # 之后回到窗口内跟踪
+
+
+def test_correction_opposes_offset():
+    tracker = SpotTracker(G)
+    # 光斑比名义目标偏yaw+25、pitch-25（像素+4, -3）
+    img = frame((324, 237))
+    updates = 8
+    for _ in range(updates):
+        offset = tracker.update(img, TARGET)
+    expected = round(updates * CORRECTION_GAIN * 25)
+    assert offset == (-expected, expected)
+
+
+def test_fast_target_is_not_integrated():
+    tracker = SpotTracker(G)
+    assert tracker.update(frame((324, 237)), TARGET, MAX_TRACK_SPEED + 1) == (0, 0)
+    assert tracker.spot is not None  # 仍然检测，只是不积分
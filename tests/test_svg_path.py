@@ -0,0 +1,33 @@
+"""
+SVG路径解析测试：圆弧标志可与后面的数值连写，与带分隔符的写法解析结果一致
+"""
+
+import numpy as np
+import pytest
+
+from svg_path import parse_path
+
+
+def arc_end(d):
+    (subpath,) = parse_path(d)
+    return subpath.end()
+
+
+def test_compact_arc_flags():
+    np.testing.assert_allclose(arc_end("M0 0 a10 10 0 0120 0"), (20, 0), atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "compact, spaced",
+    [
+        ("M0 0 a10 10 0 0120 0", "M0 0 a10 10 0 0 1 20 0"),
+        ("M0 0A10,10,0,1,0,20,0", "M0 0 A10 10 0 1 0 20 0"),
+        ("M0 0a10 10 0 1 1.5.5", "M0 0 a10 10 0 1 1 .5 .5"),
+        ("M0 0a5 5 30 00-1 1", "M0 0 a5 5 30 0 0 -1 1"),
+    ],
+)
+def test_compact_arc_matches_spaced(compact, spaced):
+    a, b = parse_path(compact), parse_path(spaced)
+    assert [kind for kind, _ in a[0].segments] == [kind for kind, _ in b[0].segments]
+    for (_, ca), (_, cb) in zip(a[0].segments, b[0].segments):
+        np.testing.assert_allclose(ca, cb)
@@ -0,0 +1,132 @@
+"""
+按下位机队列空间流控的轨迹上传测试
+
+经hal.PtyUART（pty + LowerControllerSim）上传多块轨迹，
+验证接收线程的流控不使下位机队列溢出，且所有点都被确认并回放；
+在模拟器入口破坏或丢弃块帧，验证重传、重传上限与超时
+"""
+
+import time
+
+import pytest
+
+from gimbal_control import BLOCK_MAXPTS, BLOCK_RETRIES, BLOCK_TYPE, GIMBAL_CONTROL
+from state import STATE
+
+POINTS = 2000
+DT_MS = 1  # 每点1ms，2000点约2秒回放完
+
+
+def test_paced_upload_without_overflow():
+    gimbal = GIMBAL_CONTROL(STATE(), port="/dev/pty", reader=True, async_chime=True)
+    sim = gimbal.ser.sim
+    try:
+        gimbal.wait_chime()
+        played = len(sim.trace)
+        yaw = [4000 + i % 2000 for i in range(POINTS)]
+        pitch = [6000 - i % 2000 for i in range(POINTS)]
+
+        blocks = gimbal.upload_trajectory(yaw, pitch, DT_MS)
+
+        assert blocks == -(-POINTS // BLOCK_MAXPTS)
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline:
+            with gimbal._rx_cond:
+                acked = not gimbal._inflight
+            if acked and len(sim.trace) - played >= POINTS:
+                break
+            time.sleep(0.05)
+        assert acked
+        assert sim.overflows == 0
+        assert sim.seq_errors == 0
+        assert sim.checksum_errors == 0
+        assert gimbal.nacks == 0
+        trace = sim.trace[played:]
+        assert len(trace) == POINTS
+        assert [p[1] for p in trace] == yaw
+        assert [p[2] for p in trace] == pitch
+    finally:
+        gimbal.stop_reader()
+        gimbal.ser.close()
+
+
+def intercept(sim, action):
+    """在模拟器解析块帧前调用action(seq)：返回"corrupt"破坏校验，"drop"丢弃"""
+    handle = sim._handle
+
+    def wrapped(frame):
+        if frame[1] == BLOCK_TYPE:
+            result = action(frame[2])
+            if result == "drop":
+                return
+            if result == "corrupt":
+                frame = bytearray(frame)
+                frame[-2] ^= 0xFF
+        handle(frame)
+
+    sim._handle = wrapped
+
+
+def paced_gimbal():
+    gimbal = GIMBAL_CONTROL(STATE(), port="/dev/pty", reader=True, async_chime=True)
+    gimbal.wait_chime()
+    return gimbal, gimbal.ser.sim
+
+
+def test_rejected_block_is_resent():
+    gimbal, sim = paced_gimbal()
+    corrupted = []
+
+    def corrupt_once(seq):
+        if seq == 5 and not corrupted:
+            corrupted.append(seq)
+            return "corrupt"
+
+    try:
+        intercept(sim, corrupt_once)
+        played = len(sim.trace)
+        yaw = [4000 + i for i in range(POINTS)]
+        pitch = [6000 - i for i in range(POINTS)]
+
+        gimbal.upload_trajectory(yaw, pitch, DT_MS)
+
+        assert corrupted and sim.checksum_errors == 1
+        assert gimbal.nacks >= 1 and not gimbal._inflight
+        deadline = time.monotonic() + 5.0
+        while len(sim.trace) - played < POINTS and time.monotonic() < deadline:
+            time.sleep(0.05)
+        trace = sim.trace[played:]
+        assert [p[1] for p in trace] == yaw  # 重传后按原顺序完整回放
+        assert [p[2] for p in trace] == pitch
+    finally:
+        gimbal.stop_reader()
+        gimbal.ser.close()
+
+
+def test_block_rejected_every_time_raises():
+    gimbal, sim = paced_gimbal()
+    try:
+        intercept(sim, lambda seq: "corrupt" if seq == 3 else None)
+        with pytest.raises(RuntimeError, match="重传"):
+            gimbal.upload_trajectory([5000] * 200, [5000] * 200, DT_MS)
+        assert sim.checksum_errors == BLOCK_RETRIES + 1
+    finally:
+        gimbal.stop_reader()
+        gimbal.ser.close()
+
+
+def test_credit_timeout_raises_and_keeps_sent_command():
+    gimbal, sim = paced_gimbal()
+    try:
+        # 第2块之后下位机不再应答，未确认的块占满队列空间
+        intercept(sim, lambda seq: "drop" if seq >= 2 else None)
+        yaw = [3500 + i for i in range(POINTS)]
+        with pytest.raises(TimeoutError):
+            gimbal.upload_trajectory(yaw, [5000] * POINTS, DT_MS)
+        sent = len(gimbal._inflight) + 2
+        assert sent * BLOCK_MAXPTS < POINTS
+        # 命令镜像停在实际发送的最后一点，而不是轨迹终点
+        assert gimbal.command.yaw == yaw[sent * BLOCK_MAXPTS - 1]
+    finally:
+        gimbal.stop_reader()
+        gimbal.ser.close()
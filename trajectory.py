@@ -0,0 +1,263 @@
+import numpy as np
+from gimbal_control import YAWLIM, PITCHLIM
+
+# 默认每个图形的点数
+DEFAULT_POINTS = 200
+# 正弦等曲线在重采样前的过采样倍数
+OVERSAMPLE = 8
+# 角度查找表默认网格分辨率
+LUT_SIZE = 256
+
+
+def _point_count(length, n, spacing):
+    """根据目标点数或点间距确定点数"""
+    if spacing:
+        return max(2, int(np.ceil(length / spacing)) + 1)
+    return max(2, int(n or DEFAULT_POINTS))
+
+
+def _as_points(points):
+    """转换为连续的float32 Nx2数组"""
+    return np.ascontiguousarray(np.asarray(points).reshape(-1, 2), dtype=np.float32)
+
+
+def resample_by_arclength(points, n=None, spacing=None):
+    """
+    按弧长均匀重采样曲线
+
+    输入参数:
+        points: Nx2点序列（归一化屏幕坐标）
+        n: 目标点数，默认DEFAULT_POINTS
+        spacing: 目标点间距，给出时优先于n
+
+    输出: float32 Nx2数组，相邻点弧长相等
+
+    调用场景: 让激光沿曲线匀速运动，避免点在局部扎堆浪费串口带宽
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    seg = np.hypot(*np.diff(pts, axis=0).T)
+    # 去掉零长度线段，保证弧长严格递增
+    keep = np.concatenate(([True], seg > 0))
+    pts = pts[keep]
+    s = np.concatenate(([0.0], np.cumsum(seg[seg > 0])))
+    count = _point_count(s[-1], n, spacing)
+    if s[-1] == 0:
+        return _as_points(np.repeat(pts[:1], count, axis=0))
+    t = np.linspace(0.0, s[-1], count)
+    x = np.interp(t, s, pts[:, 0])
+    y = np.interp(t, s, pts[:, 1])
+    return _as_points(np.column_stack((x, y)))
+
+
+def resample_polyline(vertices, n=None, spacing=None, closed=True):
+    """
+    折线按弧长均匀重采样，并保留所有顶点
+
+    输入参数:
+        vertices: 折线顶点序列
+        n: 目标点数（近似），默认DEFAULT_POINTS
+        spacing: 目标点间距，给出时优先于n
+        closed: 是否闭合（末点回到起点）
+
+    输出: float32 Nx2数组，各边按长度分配点数，拐角处不被削圆
+
+    调用场景: 三角形、矩形等多边形轨迹生成
+    """
+    v = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    if closed:
+        v = np.vstack((v, v[:1]))
+    d = np.diff(v, axis=0)
+    seg = np.hypot(d[:, 0], d[:, 1])
+    total = seg.sum()
+    if total == 0:
+        return _as_points(v[:1])
+    count = _point_count(total, n, spacing)
+    # 每条边分到的点数（不含终点），至少为1以保留顶点
+    counts = np.maximum(1, np.round(seg / total * (count - 1)).astype(np.int64))
+    starts = np.cumsum(counts) - counts
+    idx = np.repeat(np.arange(len(seg)), counts)
+    frac = np.arange(counts.sum()) - np.repeat(starts, counts)
+    frac = frac / np.repeat(counts, counts)
+    pts = v[idx] + frac[:, None] * d[idx]
+    return _as_points(np.vstack((pts, v[-1:])))
+
+
+def generate_sine_wave_points(
+    center_y, amplitude, cycles, x0=0.0, x1=1.0, n=None, spacing=None
+):
+    """
+    生成正弦波轨迹点
+
+    输入参数:
+        center_y: 正弦波中心线纵坐标（归一化）
+        amplitude: 振幅（归一化）
+        cycles: x0到x1之间的周期数
+        x0, x1: 横向起止坐标
+        n: 目标点数
+        spacing: 目标点间距
+
+    输出: float32 Nx2数组，按弧长均匀分布
+
+    调用场景: 屏幕"sine"按钮
+    """
+    dense = OVERSAMPLE * max(int(n or 0), DEFAULT_POINTS)
+    x = np.linspace(x0, x1, dense)
+    y = center_y + amplitude * np.sin(2 * np.pi * cycles * (x - x0) / (x1 - x0))
+    return resample_by_arclength(np.column_stack((x, y)), n, spacing)
+
+
+def generate_triangle_points(x1, y1, x2, y2, x3, y3, n=None, spacing=None):
+    """生成三角形轨迹点（闭合），输出float32 Nx2数组"""
+    return resample_polyline([[x1, y1], [x2, y2], [x3, y3]], n, spacing)
+
+
+def generate_rectangle_points(x1, y1, x2, y2, n=None, spacing=None):
+    """生成矩形轨迹点（闭合），(x1, y1)和(x2, y2)为对角顶点，输出float32 Nx2数组"""
+    return resample_polyline([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], n, spacing)
+
+
+def generate_circle_points(cx, cy, r, n=None, spacing=None):
+    """生成圆形轨迹点（闭合），等角度采样即为等弧长，输出float32 Nx2数组"""
+    count = _point_count(2 * np.pi * r, n, spacing)
+    t = np.linspace(0.0, 2 * np.pi, count)
+    return _as_points(np.column_stack((cx + r * np.cos(t), cy + r * np.sin(t))))
+
+
+# 图形名称 -> 生成函数
+SHAPES = {
+    "sine": generate_sine_wave_points,
+    "triangle": generate_triangle_points,
+    "rectangle": generate_rectangle_points,
+    "circle": generate_circle_points,
+}
+# 屏幕图形按钮使用的参数（归一化屏幕坐标）
+SHAPE_PARAMS = {
+    "sine": (0.5, 0.5, 1),
+    "triangle": (0.2, 0.2, 0.8, 0.2, 0.5, 0.8),
+    "rectangle": (0.2, 0.2, 0.8, 0.8),
+    "circle": (0.5, 0.5, 0.4),
+}
+
+
+def segment_distance(p, a, b):
+    """点p到线段ab的距离（按最后一维逐点计算，可广播），a、b重合时为到该点的距离"""
+    d = b - a
+    length2 = (d * d).sum(axis=-1)
+    t = ((p - a) * d).sum(axis=-1) / np.maximum(length2, 1e-30)
+    t = np.clip(np.where(length2 > 0, t, 0), 0, 1)
+    e = a + t[..., None] * d - p
+    return np.hypot(e[..., 0], e[..., 1])
+
+
+def perspective_transform(src, dst):
+    """
+    由四组对应点求透视变换矩阵（结果与cv2.getPerspectiveTransform一致）
+
+    输入参数:
+        src: 4x2源点
+        dst: 4x2目标点
+
+    输出: 3x3 float64矩阵，H[2, 2] = 1
+
+    异常: np.linalg.LinAlgError，点退化（如重合或三点共线）
+    """
+    src = np.asarray(src, dtype=np.float64).reshape(4, 2)
+    dst = np.asarray(dst, dtype=np.float64).reshape(4, 2)
+    A = np.zeros((8, 8))
+    b = dst.reshape(-1)
+    for i, ((x, y), (u, v)) in enumerate(zip(src, dst)):
+        A[2 * i] = x, y, 1, 0, 0, 0, -u * x, -u * y
+        A[2 * i + 1] = 0, 0, 0, x, y, 1, -v * x, -v * y
+    return np.append(np.linalg.solve(A, b), 1.0).reshape(3, 3)
+
+
+def transform_points(H, points):
+    """
+    批量透视变换：归一化屏幕坐标 -> 云台角度
+
+    输入参数:
+        H: 3x3透视变换矩阵
+        points: Nx2点数组
+
+    输出: (yaw, pitch)，均为已限幅的int16数组，可直接发送
+
+    调用场景: 替代逐点变换，一次矩阵乘法完成整条轨迹
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    H = np.asarray(H, dtype=np.float64)
+    p = pts @ H[:, :2].T + H[:, 2]
+    yaw = np.clip(np.rint(p[:, 0] / p[:, 2]), YAWLIM[0], YAWLIM[1])
+    pitch = np.clip(np.rint(p[:, 1] / p[:, 2]), PITCHLIM[0], PITCHLIM[1])
+    return yaw.astype(np.int16), pitch.astype(np.int16)
+
+
+def map_points(H, points, grid=None):
+    """
+    屏幕坐标 -> 云台角度，有多点标定模型时使用模型，否则使用透视变换
+
+    输入参数:
+        H: 3x3透视变换矩阵
+        points: Nx2点数组
+        grid: 可选的calibration_grid.CalibrationGrid
+
+    输出: (yaw, pitch)，均为已限幅的int16数组
+    """
+    if grid is not None:
+        return grid.transform(points)
+    return transform_points(H, points)
+
+
+class AngleLUT:
+    """
+    预计算角度查找表 - 将归一化屏幕坐标网格预先变换为云台角度
+
+    H变化时自动重建，查表为O(1)索引，无逐点矩阵运算
+    适用于实时或流式点源
+    """
+
+    def __init__(self, size: int = LUT_SIZE, lo: float = 0.0, hi: float = 1.0):
+        self.size = size  # 每个维度的网格点数
+        self.lo = lo  # 网格覆盖的坐标范围
+        self.hi = hi
+        self.H = None
+        self.yaw = None  # size x size，按[y, x]索引
+        self.pitch = None
+
+    def update(self, H):
+        """
+        H变化时重建查找表
+
+        输入参数:
+            H: 3x3透视变换矩阵
+
+        输出: 是否发生了重建
+        """
+        if self.H is not None and np.array_equal(self.H, H):
+            return False
+        self.H = np.array(H, dtype=np.float64)
+        axis = np.linspace(self.lo, self.hi, self.size)
+        gx, gy = np.meshgrid(axis, axis)
+        yaw, pitch = transform_points(self.H, np.column_stack((gx.ravel(), gy.ravel())))
+        self.yaw = yaw.reshape(self.size, self.size)
+        self.pitch = pitch.reshape(self.size, self.size)
+        return True
+
+    def lookup(self, points, H=None):
+        """
+        查表获得云台角度
+
+        输入参数:
+            points: Nx2点数组（超出网格范围的点被限制在边界）
+            H: 当前透视变换矩阵，给出时先检查是否需要重建
+
+        输出: (yaw, pitch) int16数组
+
+        调用场景: 流式点源逐块映射
+        """
+        if H is not None:
+            self.update(H)
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        scale = (self.size - 1) / (self.hi - self.lo)
+        idx = np.rint((pts - self.lo) * scale).astype(np.intp)
+        np.clip(idx, 0, self.size - 1, out=idx)
+        return self.yaw[idx[:, 1], idx[:, 0]], self.pitch[idx[:, 1], idx[:, 0]]
@@ -0,0 +1,133 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import trajectory
+
+
+def calibration_hash(H, grid=None) -> str:
+    """计算标定（透视变换矩阵及多点标定模型）的哈希，作为缓存键的一部分"""
+    sha = hashlib.sha1(np.asarray(H, dtype=np.float64).tobytes())
+    if grid is not None:
+        sha.update(grid.hash.encode())
+    return sha.hexdigest()[:16]
+
+
+class TrajectoryCache:
+    """
+    编译后轨迹缓存 - 保存最终的yaw/pitch数组
+
+    主要功能：
+    - 内存LRU缓存，重复绘制无需计算
+    - 磁盘.npy缓存（内存映射读取），重启后仍可直接使用
+    - 键为(图形, 参数, 标定哈希)，标定变化时自动清除旧标定下的缓存
+    """
+
+    def __init__(self, cache_dir="/root/user/trajectory_cache", maxsize: int = 16):
+        self.cache_dir = cache_dir
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.calib = None  # 当前缓存对应的H哈希
+        self.lock = threading.Lock()
+
+    def _path(self, calib, shape, params):
+        key = hashlib.sha1(repr((shape, tuple(params))).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{calib}_{shape}_{key}.npy")
+
+    def invalidate(self, calib=None):
+        """
+        清除缓存
+
+        输入参数:
+            calib: 保留的H哈希，None表示全部清除
+
+        输出: 无
+
+        调用场景: 标定完成或参数重新加载导致H变化时
+        """
+        self.memory.clear()
+        self.calib = calib
+        try:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npy") and not (calib and name.startswith(calib)):
+                    os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def get(self, shape, params, H, grid=None):
+        """
+        查询缓存
+
+        输入参数:
+            shape: 图形名称
+            params: 图形参数
+            H: 当前透视变换矩阵
+            grid: 当前多点标定模型，None表示只用透视变换
+
+        输出: (yaw, pitch) int16数组，未命中返回None
+        """
+        calib = calibration_hash(H, grid)
+        key = (shape, tuple(params))
+        with self.lock:
+            if calib != self.calib:
+                self.invalidate(calib)
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+            path = self._path(calib, shape, params)
+            if not os.path.exists(path):
+                return None
+            try:
+                arr = np.load(path, mmap_mode="r")
+            except Exception as e:
+                print(f"[CACHE] 读取轨迹缓存失败: {e}")
+                return None
+            result = (arr[0], arr[1])
+            self._remember(key, result)
+            return result
+
+    def put(self, shape, params, H, yaw, pitch, grid=None):
+        """写入缓存（内存及磁盘），磁盘写入先写临时文件再重命名"""
+        calib = calibration_hash(H, grid)
+        key = (shape, tuple(params))
+        with self.lock:
+            if calib != self.calib:
+                self.invalidate(calib)
+            self._remember(key, (yaw, pitch))
+            path = self._path(calib, shape, params)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as file:
+                    np.save(file, np.vstack((yaw, pitch)).astype(np.int16))
+                os.replace(tmp, path)
+            except Exception as e:
+                print(f"[CACHE] 保存轨迹缓存失败: {e}")
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def shape(self, shape, params, H, grid=None):
+        """
+        获取图形的最终角度数组，未命中时生成并缓存
+
+        输入参数:
+            shape: 图形名称（trajectory.SHAPES中的键）
+            params: 图形生成函数的参数
+            H: 当前透视变换矩阵
+            grid: 当前多点标定模型，None表示只用透视变换
+
+        输出: (yaw, pitch) int16数组
+
+        调用场景: 屏幕按下图形按钮
+        """
+        result = self.get(shape, params, H, grid)
+        if result is None:
+            points = trajectory.SHAPES[shape](*params)
+            result = trajectory.map_points(H, points, grid)
+            self.put(shape, params, H, *result, grid=grid)
+        return result